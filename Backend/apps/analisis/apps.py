@@ -8,3 +8,7 @@ class AnalisisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.analisis'
     verbose_name = "Análisis Urbanístico"
+
+    def ready(self):
+        """Importar signals cuando la app esté lista"""
+        import apps.analisis.signals  # noqa
@@ -0,0 +1,311 @@
+"""
+Ejecución en segundo plano de análisis con IA.
+
+`generar_ia` ya no bloquea un worker de gunicorn durante toda la llamada a
+Gemini: encola un TrabajoAnalisisIA y responde de inmediato. Los trabajos se
+ejecutan en un pool de hilos del propio proceso (ANALISIS_IA_INLINE=True) o
+en un proceso dedicado con `python manage.py procesar_trabajos_ia`.
+
+Un trabajo 'ejecutando' cuyo latido (heartbeat, renovado con cada fragmento
+persistido) tiene más de ANALISIS_IA_STALE_MINUTES se da por abandonado
+(worker caído o reiniciado) y se marca como fallido.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+import logging
+import threading
+import time
+
+from .models import RespuestaIA, TrabajoAnalisisIA
+
+logger = logging.getLogger(__name__)
+
+
+class AnalisisCancelado(Exception):
+    """El trabajo fue cancelado mientras se generaba la respuesta"""
+
+
+class AnalisisIAJobRunner:
+    """
+    Cola de trabajos de IA respaldada en base de datos.
+
+    El estado de cada trabajo vive en TrabajoAnalisisIA, por lo que varios
+    procesos pueden compartir la cola: un trabajo solo se ejecuta si se
+    reclama con éxito (en_cola → ejecutando).
+    """
+
+    # Cada cuánto persistir el texto parcial y revisar cancelaciones
+    FLUSH_INTERVAL = 1.0
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls):
+        """Pool de hilos compartido por el proceso"""
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    max_workers = getattr(settings, 'ANALISIS_IA_WORKERS', 2)
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=max_workers,
+                        thread_name_prefix='analisis-ia'
+                    )
+                    logger.info(f"🧵 Pool de trabajos IA iniciado ({max_workers} workers)")
+        return cls._executor
+
+    @staticmethod
+    def _q_abandonados():
+        """
+        Trabajos 'ejecutando' sin latido dentro del umbral y trabajos
+        'en_cola' que ningún worker tomó en ese tiempo (proceso reiniciado
+        antes de enviarlo al pool, o sin `procesar_trabajos_ia` en marcha)
+        """
+        limite = timezone.now() - timedelta(minutes=getattr(settings, 'ANALISIS_IA_STALE_MINUTES', 10))
+        return (
+            Q(estado='ejecutando') & (
+                Q(heartbeat__lt=limite) | Q(heartbeat__isnull=True, fecha_inicio__lt=limite)
+            )
+        ) | Q(estado='en_cola', created_at__lt=limite)
+
+    @classmethod
+    def marcar_abandonados(cls, analisis=None):
+        """
+        Marcar como fallidos los trabajos abandonados y borrar su respuesta
+        parcial.
+
+        Args:
+            analisis: limitar a un análisis (opcional)
+
+        Returns:
+            int: trabajos marcados
+        """
+        abandonados = TrabajoAnalisisIA.objects.filter(cls._q_abandonados())
+        if analisis is not None:
+            abandonados = abandonados.filter(analisis=analisis)
+
+        filas = list(abandonados.values_list('id', 'respuesta_ia_id'))
+        if not filas:
+            return 0
+
+        # El filtro se repite en el UPDATE: un trabajo que volvió a latir no se toca
+        marcados = TrabajoAnalisisIA.objects.filter(
+            cls._q_abandonados(),
+            pk__in=[trabajo_id for trabajo_id, _ in filas]
+        ).update(
+            estado='fallido',
+            error='Trabajo abandonado: sin actividad del worker',
+            fecha_fin=timezone.now()
+        )
+        RespuestaIA.objects.filter(
+            pk__in=[respuesta_id for _, respuesta_id in filas if respuesta_id],
+            trabajo__estado='fallido'
+        ).delete()
+
+        if marcados:
+            logger.warning(f"⚠️ {marcados} trabajos IA abandonados marcados como fallidos")
+        return marcados
+
+    @classmethod
+    def enqueue(cls, analisis, user=None):
+        """
+        Encolar la generación de IA para un análisis.
+
+        Si ya hay un trabajo activo (y no abandonado) para el análisis se
+        reutiliza.
+
+        Returns:
+            TrabajoAnalisisIA
+        """
+        cls.marcar_abandonados(analisis)
+
+        activo = TrabajoAnalisisIA.objects.filter(
+            analisis=analisis,
+            estado__in=['en_cola', 'ejecutando']
+        ).first()
+        if activo:
+            logger.info(f"♻️ Reutilizando trabajo IA activo {activo.id} para {analisis.id}")
+            return activo
+
+        try:
+            with transaction.atomic():
+                trabajo = TrabajoAnalisisIA.objects.create(
+                    analisis=analisis,
+                    solicitado_por=user
+                )
+        except IntegrityError:
+            # ✅ Otra petición encoló al mismo tiempo (trabajo_ia_activo_unico)
+            activo = TrabajoAnalisisIA.objects.filter(
+                analisis=analisis,
+                estado__in=['en_cola', 'ejecutando']
+            ).first()
+            if activo is None:
+                raise
+            logger.info(f"♻️ Reutilizando trabajo IA activo {activo.id} para {analisis.id}")
+            return activo
+
+        logger.info(f"📥 Trabajo IA {trabajo.id} encolado para análisis {analisis.id}")
+
+        if getattr(settings, 'ANALISIS_IA_INLINE', True):
+            transaction.on_commit(
+                lambda: cls.get_executor().submit(cls.run_in_thread, trabajo.id)
+            )
+
+        return trabajo
+
+    @classmethod
+    def cancel(cls, trabajo):
+        """
+        Cancelar un trabajo. Los trabajos en cola se cancelan de inmediato;
+        los que se están ejecutando se detienen en el siguiente fragmento.
+        """
+        if trabajo.esta_finalizado:
+            return trabajo
+
+        cancelados = TrabajoAnalisisIA.objects.filter(
+            pk=trabajo.pk, estado='en_cola'
+        ).update(
+            estado='cancelado',
+            cancelacion_solicitada=True,
+            fecha_fin=timezone.now()
+        )
+        if not cancelados:
+            TrabajoAnalisisIA.objects.filter(pk=trabajo.pk).update(
+                cancelacion_solicitada=True
+            )
+
+        trabajo.refresh_from_db()
+        logger.info(f"🛑 Cancelación solicitada para trabajo IA {trabajo.id}")
+        return trabajo
+
+    @classmethod
+    def claim(cls, trabajo_id):
+        """Reclamar un trabajo en cola. Retorna False si otro worker lo tomó."""
+        ahora = timezone.now()
+        return TrabajoAnalisisIA.objects.filter(
+            pk=trabajo_id, estado='en_cola'
+        ).update(
+            estado='ejecutando',
+            fecha_inicio=ahora,
+            heartbeat=ahora
+        ) == 1
+
+    @classmethod
+    def claim_next(cls):
+        """Reclamar el trabajo en cola más antiguo (usado por el comando)"""
+        with transaction.atomic():
+            trabajo = (
+                TrabajoAnalisisIA.objects.select_for_update(skip_locked=True)
+                .filter(estado='en_cola')
+                .order_by('created_at')
+                .first()
+            )
+            if trabajo is None:
+                return None
+            trabajo.estado = 'ejecutando'
+            trabajo.fecha_inicio = trabajo.heartbeat = timezone.now()
+            trabajo.save(update_fields=['estado', 'fecha_inicio', 'heartbeat'])
+        return trabajo.id
+
+    @classmethod
+    def run_in_thread(cls, trabajo_id):
+        """Punto de entrada del pool: maneja las conexiones del hilo"""
+        close_old_connections()
+        try:
+            if cls.claim(trabajo_id):
+                cls.execute(trabajo_id)
+        except Exception as e:
+            logger.error(f"❌ Error inesperado en trabajo IA {trabajo_id}: {str(e)}", exc_info=True)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def execute(cls, trabajo_id, service=None):
+        """
+        Ejecutar un trabajo ya reclamado.
+
+        Args:
+            trabajo_id: ID del TrabajoAnalisisIA en estado 'ejecutando'
+            service: GeminiAnalysisService a usar (opcional, para pruebas)
+        """
+        from .services import GeminiAnalysisService
+
+        trabajo = TrabajoAnalisisIA.objects.select_related(
+            'analisis', 'analisis__lote', 'analisis__solicitante', 'solicitado_por'
+        ).get(pk=trabajo_id)
+        analisis = trabajo.analisis
+
+        respuesta_ia = RespuestaIA.objects.create(
+            analisis=analisis,
+            prompt='',
+            respuesta=''
+        )
+        trabajo.respuesta_ia = respuesta_ia
+        trabajo.save(update_fields=['respuesta_ia'])
+        respuesta_ia_id = respuesta_ia.pk
+
+        ultimo_flush = [0.0]
+
+        def on_chunk(texto):
+            """Persistir texto parcial, renovar el latido y revisar cancelación"""
+            ahora = time.monotonic()
+            if ahora - ultimo_flush[0] < cls.FLUSH_INTERVAL:
+                return
+            ultimo_flush[0] = ahora
+
+            RespuestaIA.objects.filter(pk=respuesta_ia_id).update(respuesta=texto)
+            # Sin filas: cancelación solicitada o trabajo dado por abandonado
+            activo = TrabajoAnalisisIA.objects.filter(
+                pk=trabajo_id, estado='ejecutando', cancelacion_solicitada=False
+            ).update(
+                caracteres_generados=len(texto),
+                heartbeat=timezone.now()
+            )
+            if not activo:
+                raise AnalisisCancelado()
+
+        try:
+            service = service or GeminiAnalysisService()
+            respuesta_ia = service.generar_analisis(
+                analisis,
+                respuesta_ia=respuesta_ia,
+                on_chunk=on_chunk,
+                usuario=trabajo.solicitado_por
+            )
+
+            completado = TrabajoAnalisisIA.objects.filter(pk=trabajo_id, estado='ejecutando').update(
+                estado='completado',
+                caracteres_generados=len(respuesta_ia.respuesta),
+                fecha_fin=timezone.now()
+            )
+            if completado:
+                logger.info(f"✅ Trabajo IA {trabajo_id} completado")
+            else:
+                cls._descartar_respuesta(respuesta_ia_id)
+                logger.warning(f"⚠️ Trabajo IA {trabajo_id} terminó después de darse por abandonado")
+
+        except AnalisisCancelado:
+            TrabajoAnalisisIA.objects.filter(pk=trabajo_id, estado='ejecutando').update(
+                estado='cancelado',
+                fecha_fin=timezone.now()
+            )
+            cls._descartar_respuesta(respuesta_ia_id)
+            logger.info(f"🛑 Trabajo IA {trabajo_id} cancelado")
+
+        except Exception as e:
+            TrabajoAnalisisIA.objects.filter(pk=trabajo_id, estado='ejecutando').update(
+                estado='fallido',
+                error=str(e),
+                fecha_fin=timezone.now()
+            )
+            cls._descartar_respuesta(respuesta_ia_id)
+            logger.error(f"❌ Trabajo IA {trabajo_id} fallido: {str(e)}")
+
+    @staticmethod
+    def _descartar_respuesta(respuesta_ia_id):
+        """Borrar la respuesta parcial de un trabajo que no se completó"""
+        RespuestaIA.objects.filter(pk=respuesta_ia_id).delete()
@@ -0,0 +1,67 @@
+"""
+Worker dedicado para los trabajos de análisis con IA.
+
+Uso:
+    python manage.py procesar_trabajos_ia
+    python manage.py procesar_trabajos_ia --workers 4 --once
+
+Al iniciar y cada SWEEP_INTERVAL segundos marca como fallidos los trabajos
+abandonados por workers caídos (AnalisisIAJobRunner.marcar_abandonados).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from apps.analisis.jobs import AnalisisIAJobRunner
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de análisis con IA que están en cola'
+
+    SWEEP_INTERVAL = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Trabajos simultáneos')
+        parser.add_argument('--poll', type=float, default=2.0, help='Segundos entre consultas a la cola')
+        parser.add_argument('--once', action='store_true', help='Vaciar la cola y terminar')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write(f"🤖 Procesando trabajos IA con {workers} workers...")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analisis-ia') as executor:
+            en_curso = set()
+            ultimo_barrido = None
+            while True:
+                en_curso = {future for future in en_curso if not future.done()}
+
+                if ultimo_barrido is None or time.monotonic() - ultimo_barrido >= self.SWEEP_INTERVAL:
+                    close_old_connections()
+                    AnalisisIAJobRunner.marcar_abandonados()
+                    ultimo_barrido = time.monotonic()
+
+                trabajo_id = None
+                if len(en_curso) < workers:
+                    close_old_connections()
+                    trabajo_id = AnalisisIAJobRunner.claim_next()
+
+                if trabajo_id:
+                    self.stdout.write(f"▶️ Trabajo {trabajo_id}")
+                    en_curso.add(executor.submit(self._ejecutar, trabajo_id))
+                    continue
+
+                if options['once'] and not en_curso:
+                    break
+
+                time.sleep(options['poll'])
+
+        self.stdout.write(self.style.SUCCESS("✅ Cola de trabajos IA vacía"))
+
+    @staticmethod
+    def _ejecutar(trabajo_id):
+        close_old_connections()
+        try:
+            AnalisisIAJobRunner.execute(trabajo_id)
+        finally:
+            close_old_connections()
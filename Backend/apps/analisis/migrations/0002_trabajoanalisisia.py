@@ -0,0 +1,121 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("analisis", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrabajoAnalisisIA",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("en_cola", "En Cola"),
+                            ("ejecutando", "Ejecutando"),
+                            ("completado", "Completado"),
+                            ("fallido", "Fallido"),
+                            ("cancelado", "Cancelado"),
+                        ],
+                        db_index=True,
+                        default="en_cola",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "caracteres_generados",
+                    models.IntegerField(default=0, verbose_name="Caracteres Generados"),
+                ),
+                (
+                    "cancelacion_solicitada",
+                    models.BooleanField(
+                        default=False, verbose_name="Cancelación Solicitada"
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(blank=True, null=True, verbose_name="Error"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "fecha_inicio",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de Inicio"
+                    ),
+                ),
+                (
+                    "fecha_fin",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de Finalización"
+                    ),
+                ),
+                (
+                    "analisis",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trabajos_ia",
+                        to="analisis.analisisurbanistico",
+                        verbose_name="Análisis",
+                    ),
+                ),
+                (
+                    "respuesta_ia",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="trabajo",
+                        to="analisis.respuestaia",
+                        verbose_name="Respuesta IA",
+                    ),
+                ),
+                (
+                    "solicitado_por",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="trabajos_ia_solicitados",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitado Por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trabajo de Análisis IA",
+                "verbose_name_plural": "Trabajos de Análisis IA",
+                "db_table": "analisis_trabajo_ia",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "created_at"],
+                        name="analisis_tr_estado_b29105_idx",
+                    ),
+                    models.Index(
+                        fields=["analisis", "-created_at"],
+                        name="analisis_tr_analisi_d0fda3_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
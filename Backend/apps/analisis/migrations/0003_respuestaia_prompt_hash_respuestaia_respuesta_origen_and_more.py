@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analisis", "0002_trabajoanalisisia"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="respuestaia",
+            name="prompt_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                max_length=64,
+                verbose_name="Hash del Prompt",
+            ),
+        ),
+        migrations.AddField(
+            model_name="respuestaia",
+            name="respuesta_origen",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Respuesta previa de la que se tomó el texto (cache hit)",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="reutilizaciones",
+                to="analisis.respuestaia",
+                verbose_name="Respuesta Reutilizada",
+            ),
+        ),
+        migrations.AddField(
+            model_name="respuestaia",
+            name="version_parametros",
+            field=models.IntegerField(
+                blank=True, null=True, verbose_name="Versión de Parámetros"
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "analisis",
+            "0003_respuestaia_prompt_hash_respuestaia_respuesta_origen_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotParametros",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveIntegerField(unique=True, verbose_name="Versión"),
+                ),
+                (
+                    "texto",
+                    models.TextField(
+                        blank=True, verbose_name="Contexto para el Prompt"
+                    ),
+                ),
+                (
+                    "agrupados",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        verbose_name="Parámetros por Categoría",
+                    ),
+                ),
+                (
+                    "total",
+                    models.IntegerField(default=0, verbose_name="Total de Parámetros"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Snapshot de Parámetros",
+                "verbose_name_plural": "Snapshots de Parámetros",
+                "db_table": "analisis_snapshot_parametros",
+                "ordering": ["-version"],
+            },
+        ),
+    ]
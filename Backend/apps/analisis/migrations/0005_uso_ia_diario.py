@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("analisis", "0004_snapshotparametros"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UsoIADiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField(db_index=True, verbose_name="Fecha")),
+                ("llamadas", models.IntegerField(default=0, verbose_name="Llamadas")),
+                ("tokens", models.BigIntegerField(default=0, verbose_name="Tokens")),
+                (
+                    "tiempo_total",
+                    models.FloatField(
+                        default=0, verbose_name="Tiempo Total (segundos)"
+                    ),
+                ),
+                (
+                    "aciertos_cache",
+                    models.IntegerField(default=0, verbose_name="Aciertos de Cache"),
+                ),
+                ("errores", models.IntegerField(default=0, verbose_name="Errores")),
+                (
+                    "histograma_latencia",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Cantidad de llamadas por bucket de latencia (límite superior en segundos)",
+                        verbose_name="Histograma de Latencia",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="uso_ia_diario",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Uso Diario de IA",
+                "verbose_name_plural": "Uso Diario de IA",
+                "db_table": "analisis_uso_ia_diario",
+                "ordering": ["-fecha"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="usoiadiario",
+            constraint=models.UniqueConstraint(
+                fields=("fecha", "usuario"), name="uso_ia_fecha_usuario_unico"
+            ),
+        ),
+    ]
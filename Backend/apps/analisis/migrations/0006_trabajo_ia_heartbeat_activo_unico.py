@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:35
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def cerrar_trabajos_duplicados(apps, schema_editor):
+    """Dejar un solo trabajo activo (el más reciente) por análisis"""
+    TrabajoAnalisisIA = apps.get_model("analisis", "TrabajoAnalisisIA")
+    vistos = set()
+    duplicados = []
+    for trabajo_id, analisis_id in (
+        TrabajoAnalisisIA.objects.filter(estado__in=["en_cola", "ejecutando"])
+        .order_by("analisis_id", "-created_at")
+        .values_list("id", "analisis_id")
+    ):
+        if analisis_id in vistos:
+            duplicados.append(trabajo_id)
+        vistos.add(analisis_id)
+
+    TrabajoAnalisisIA.objects.filter(pk__in=duplicados).update(
+        estado="fallido",
+        error="Trabajo duplicado cerrado por migración",
+        fecha_fin=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analisis", "0005_uso_ia_diario"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trabajoanalisisia",
+            name="heartbeat",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Último Latido"
+            ),
+        ),
+        migrations.RunPython(cerrar_trabajos_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="trabajoanalisisia",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("estado__in", ["en_cola", "ejecutando"])),
+                fields=("analisis",),
+                name="trabajo_ia_activo_unico",
+            ),
+        ),
+    ]
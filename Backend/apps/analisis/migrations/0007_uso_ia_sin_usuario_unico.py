@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+CONTADORES = ("llamadas", "tokens", "tiempo_total", "aciertos_cache", "errores")
+
+
+def fusionar_duplicados_sin_usuario(apps, schema_editor):
+    """Sumar en una sola fila los registros sin usuario de un mismo día"""
+    UsoIADiario = apps.get_model("analisis", "UsoIADiario")
+    por_fecha = {}
+    for uso in UsoIADiario.objects.filter(usuario__isnull=True).order_by("fecha", "id"):
+        principal = por_fecha.setdefault(uso.fecha, uso)
+        if principal is uso:
+            continue
+        for campo in CONTADORES:
+            setattr(principal, campo, getattr(principal, campo) + getattr(uso, campo))
+        for bucket, cantidad in (uso.histograma_latencia or {}).items():
+            principal.histograma_latencia[bucket] = principal.histograma_latencia.get(bucket, 0) + cantidad
+        principal.save()
+        uso.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analisis", "0006_trabajo_ia_heartbeat_activo_unico"),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados_sin_usuario, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="usoiadiario",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("usuario__isnull", True)),
+                fields=("fecha",),
+                name="uso_ia_fecha_sin_usuario_unico",
+            ),
+        ),
+    ]
@@ -287,6 +287,38 @@ class ParametroUrbanistico(models.Model):
         return f"{self.get_categoria_display()} - {self.nombre}"
 
 
+class SnapshotParametros(models.Model):
+    """
+    Versión precompilada del conjunto de parámetros urbanísticos activos.
+    
+    Guarda el bloque de texto que se inserta en el prompt y el JSON agrupado
+    por categoría que devuelven los endpoints de parámetros. Se reconstruye
+    solo cuando se guarda o elimina un ParametroUrbanistico.
+    """
+    version = models.PositiveIntegerField(unique=True, verbose_name='Versión')
+    texto = models.TextField(blank=True, verbose_name='Contexto para el Prompt')
+    agrupados = models.JSONField(default=dict, blank=True, verbose_name='Parámetros por Categoría')
+    total = models.IntegerField(default=0, verbose_name='Total de Parámetros')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Snapshot de Parámetros'
+        verbose_name_plural = 'Snapshots de Parámetros'
+        ordering = ['-version']
+        db_table = 'analisis_snapshot_parametros'
+    
+    def __str__(self):
+        return f"Parámetros v{self.version} ({self.total})"
+    
+    def as_dict(self):
+        return {
+            'version': self.version,
+            'texto': self.texto,
+            'agrupados': self.agrupados,
+            'total': self.total,
+        }
+
+
 class RespuestaIA(models.Model):
     """
     Respuestas generadas por IA para análisis
@@ -321,6 +353,29 @@ class RespuestaIA(models.Model):
         verbose_name='Tiempo de Respuesta (segundos)'
     )
     
+    # Cache de respuestas (apps.analisis.services.PromptResponseCache)
+    prompt_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        db_index=True,
+        verbose_name='Hash del Prompt'
+    )
+    version_parametros = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Versión de Parámetros'
+    )
+    respuesta_origen = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reutilizaciones',
+        verbose_name='Respuesta Reutilizada',
+        help_text='Respuesta previa de la que se tomó el texto (cache hit)'
+    )
+    
     # Validación manual
     revisado_por = models.ForeignKey(
         'users.User',
@@ -351,3 +406,151 @@ class RespuestaIA(models.Model):
     
     def __str__(self):
         return f"IA - {self.analisis.tipo_analisis} - {self.created_at.strftime('%Y-%m-%d')}"
+    
+    @property
+    def desde_cache(self):
+        """Indica si el texto se reutilizó de otra respuesta"""
+        return self.respuesta_origen_id is not None
+
+
+class TrabajoAnalisisIA(models.Model):
+    """
+    Trabajo en segundo plano para generar una respuesta de IA.
+    
+    La generación se ejecuta fuera del ciclo request/response; el texto
+    parcial se va guardando en la RespuestaIA asociada para poder
+    consultarlo mientras el trabajo avanza.
+    """
+    ESTADO_CHOICES = [
+        ('en_cola', 'En Cola'),
+        ('ejecutando', 'Ejecutando'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+        ('cancelado', 'Cancelado'),
+    ]
+    
+    ESTADOS_FINALES = ('completado', 'fallido', 'cancelado')
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    analisis = models.ForeignKey(
+        AnalisisUrbanistico,
+        on_delete=models.CASCADE,
+        related_name='trabajos_ia',
+        verbose_name='Análisis'
+    )
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajos_ia_solicitados',
+        verbose_name='Solicitado Por'
+    )
+    respuesta_ia = models.OneToOneField(
+        RespuestaIA,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajo',
+        verbose_name='Respuesta IA'
+    )
+    
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='en_cola',
+        db_index=True,
+        verbose_name='Estado'
+    )
+    caracteres_generados = models.IntegerField(
+        default=0,
+        verbose_name='Caracteres Generados'
+    )
+    cancelacion_solicitada = models.BooleanField(
+        default=False,
+        verbose_name='Cancelación Solicitada'
+    )
+    error = models.TextField(blank=True, null=True, verbose_name='Error')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Inicio')
+    # Se renueva en cada fragmento persistido; sin renovarse el trabajo se da por abandonado
+    heartbeat = models.DateTimeField(null=True, blank=True, verbose_name='Último Latido')
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Finalización')
+    
+    class Meta:
+        verbose_name = 'Trabajo de Análisis IA'
+        verbose_name_plural = 'Trabajos de Análisis IA'
+        ordering = ['-created_at']
+        db_table = 'analisis_trabajo_ia'
+        indexes = [
+            models.Index(fields=['estado', 'created_at']),
+            models.Index(fields=['analisis', '-created_at']),
+        ]
+        constraints = [
+            # ✅ Un solo trabajo activo por análisis
+            models.UniqueConstraint(
+                fields=['analisis'],
+                condition=models.Q(estado__in=['en_cola', 'ejecutando']),
+                name='trabajo_ia_activo_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Trabajo IA {self.id} - {self.get_estado_display()}"
+    
+    @property
+    def esta_finalizado(self):
+        return self.estado in self.ESTADOS_FINALES
+
+
+class UsoIADiario(models.Model):
+    """
+    Consumo agregado de Gemini por día y usuario.
+    
+    Se actualiza en cada llamada (apps.analisis.usage.GeminiUsageLedger) y
+    permite consultar tokens, latencias y aciertos de cache sin recorrer
+    todas las RespuestaIA.
+    """
+    fecha = models.DateField(db_index=True, verbose_name='Fecha')
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='uso_ia_diario',
+        verbose_name='Usuario'
+    )
+    
+    llamadas = models.IntegerField(default=0, verbose_name='Llamadas')
+    tokens = models.BigIntegerField(default=0, verbose_name='Tokens')
+    tiempo_total = models.FloatField(default=0, verbose_name='Tiempo Total (segundos)')
+    aciertos_cache = models.IntegerField(default=0, verbose_name='Aciertos de Cache')
+    errores = models.IntegerField(default=0, verbose_name='Errores')
+    histograma_latencia = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Histograma de Latencia',
+        help_text='Cantidad de llamadas por bucket de latencia (límite superior en segundos)'
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Uso Diario de IA'
+        verbose_name_plural = 'Uso Diario de IA'
+        ordering = ['-fecha']
+        db_table = 'analisis_uso_ia_diario'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'usuario'], name='uso_ia_fecha_usuario_unico'),
+            # ✅ NULL no es igual a NULL: la restricción anterior no cubre las llamadas sin usuario
+            models.UniqueConstraint(
+                fields=['fecha'],
+                condition=models.Q(usuario__isnull=True),
+                name='uso_ia_fecha_sin_usuario_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Uso IA {self.fecha} - {self.usuario_id or 'sistema'}"
@@ -2,7 +2,7 @@
 Serializadores para análisis urbanístico
 """
 from rest_framework import serializers
-from .models import AnalisisUrbanistico
+from .models import AnalisisUrbanistico, TrabajoAnalisisIA
 from apps.users.serializers import UserSimpleSerializer
 import logging
 
@@ -154,3 +154,40 @@ class CompletarAnalisisSerializer(serializers.Serializer):
 class RechazarAnalisisSerializer(serializers.Serializer):
     """Serializer para rechazar análisis"""
     motivo = serializers.CharField(required=True, min_length=10)
+
+
+class TrabajoAnalisisIASerializer(serializers.ModelSerializer):
+    """Serializer para consultar el estado de un trabajo de IA"""
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    esta_finalizado = serializers.BooleanField(read_only=True)
+    respuesta = serializers.SerializerMethodField()
+    modelo = serializers.SerializerMethodField()
+    tokens_usados = serializers.SerializerMethodField()
+    tiempo_respuesta = serializers.SerializerMethodField()
+    desde_cache = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TrabajoAnalisisIA
+        fields = [
+            'id', 'analisis', 'estado', 'estado_display', 'esta_finalizado',
+            'caracteres_generados', 'cancelacion_solicitada', 'error',
+            'respuesta', 'modelo', 'tokens_usados', 'tiempo_respuesta',
+            'desde_cache', 'created_at', 'fecha_inicio', 'fecha_fin'
+        ]
+        read_only_fields = fields
+    
+    def get_respuesta(self, obj):
+        """Texto generado hasta ahora (parcial mientras se ejecuta)"""
+        return obj.respuesta_ia.respuesta if obj.respuesta_ia else ''
+    
+    def get_modelo(self, obj):
+        return obj.respuesta_ia.modelo_ia if obj.respuesta_ia else None
+    
+    def get_tokens_usados(self, obj):
+        return obj.respuesta_ia.tokens_usados if obj.respuesta_ia else None
+    
+    def get_tiempo_respuesta(self, obj):
+        return obj.respuesta_ia.tiempo_respuesta if obj.respuesta_ia else None
+    
+    def get_desde_cache(self, obj):
+        return obj.respuesta_ia.desde_cache if obj.respuesta_ia else False
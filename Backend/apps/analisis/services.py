@@ -3,60 +3,501 @@ Servicios para análisis urbanístico con IA
 """
 import google.generativeai as genai
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Aggregate
+import hashlib
 import logging
+import threading
 import time
 from decimal import Decimal
+from types import SimpleNamespace
+
+from apps.common.cache import CacheService
+from .jobs import AnalisisCancelado
+from .usage import GeminiRateLimiter, GeminiUsageLedger
 
 logger = logging.getLogger(__name__)
 
 
+class FakeGenerativeModel:
+    """
+    Modelo local que imita la interfaz de genai.GenerativeModel.
+    
+    Se activa con GEMINI_USE_FAKE_MODEL=True para desarrollo y pruebas:
+    no llama a la API y devuelve un texto determinista, por fragmentos
+    si se usa stream=True.
+    """
+    
+    _model_name = 'fake-gemini'
+    
+    def __init__(self, respuesta=None, chunk_size=200, delay=0.0):
+        self.respuesta = respuesta
+        self.chunk_size = chunk_size
+        self.delay = delay
+    
+    def _texto(self, prompt):
+        if self.respuesta is not None:
+            return self.respuesta
+        return (
+            "# ANÁLISIS URBANÍSTICO (modelo local)\n\n"
+            "## VIABILIDAD NORMATIVA\n- Respuesta generada sin conexión a Gemini.\n\n"
+            f"## CONTEXTO\n- Longitud del prompt: {len(prompt)} caracteres.\n"
+        )
+    
+    def _usage(self, prompt, texto):
+        return SimpleNamespace(
+            prompt_token_count=len(prompt.split()),
+            candidates_token_count=len(texto.split())
+        )
+    
+    def generate_content(self, prompt, stream=False, **kwargs):
+        texto = self._texto(prompt)
+        usage = self._usage(prompt, texto)
+        
+        if not stream:
+            if self.delay:
+                time.sleep(self.delay)
+            return SimpleNamespace(text=texto, usage_metadata=usage)
+        
+        def chunks():
+            for i in range(0, len(texto), self.chunk_size):
+                if self.delay:
+                    time.sleep(self.delay)
+                yield SimpleNamespace(text=texto[i:i + self.chunk_size], usage_metadata=usage)
+        
+        return chunks()
+
+
+class ParametrosSnapshotService:
+    """
+    Snapshot compilado y versionado de los parámetros urbanísticos.
+    
+    El prompt y los endpoints de parámetros leen el snapshot desde cache,
+    sin consultar la BD. Solo `rebuild()` (disparado por las señales de
+    ParametroUrbanistico) recorre y formatea los parámetros.
+    """
+    
+    CACHE_KEY = 'parametros_snapshot'
+    
+    @staticmethod
+    def render_parametro(param):
+        """Bloque de texto de un parámetro para el prompt"""
+        return (
+            f"## {param.get_categoria_display()} - {param.nombre}\n"
+            f"{param.descripcion}\n"
+            f"Artículo: {param.articulo_pot or 'N/A'}\n"
+            f"Datos: {param.datos}\n"
+        )
+    
+    @classmethod
+    def compilar(cls):
+        """Compilar texto y JSON agrupado a partir de los parámetros activos"""
+        from .models import ParametroUrbanistico
+        
+        parametros = ParametroUrbanistico.objects.filter(activo=True).order_by('categoria', 'orden')
+        
+        bloques = []
+        agrupados = {}
+        for param in parametros:
+            bloques.append(cls.render_parametro(param))
+            agrupados.setdefault(param.get_categoria_display(), []).append({
+                'id': str(param.id),
+                'nombre': param.nombre,
+                'descripcion': param.descripcion,
+                'articulo_pot': param.articulo_pot,
+                'datos': param.datos,
+                'orden': param.orden
+            })
+        
+        return {
+            'texto': chr(10).join(bloques),
+            'agrupados': agrupados,
+            'total': len(bloques),
+        }
+    
+    @classmethod
+    def rebuild(cls):
+        """Crear una nueva versión del snapshot y publicarla en cache"""
+        from .models import SnapshotParametros
+        
+        compilado = cls.compilar()
+        
+        for _ in range(3):
+            try:
+                with transaction.atomic():
+                    ultimo = SnapshotParametros.objects.select_for_update().order_by('-version').first()
+                    snapshot = SnapshotParametros.objects.create(
+                        version=(ultimo.version + 1) if ultimo else 1,
+                        **compilado
+                    )
+                break
+            except IntegrityError:
+                # Otro proceso creó la misma versión; reintentar con la siguiente
+                continue
+        else:
+            raise RuntimeError("No se pudo crear el snapshot de parámetros")
+        
+        data = snapshot.as_dict()
+        CacheService.set(cls.CACHE_KEY, data, timeout=None)
+        logger.info(f"📚 Snapshot de parámetros v{snapshot.version} ({snapshot.total} parámetros)")
+        return data
+    
+    @classmethod
+    def get_snapshot(cls):
+        """
+        Snapshot vigente: desde cache, o desde la última versión en BD si el
+        cache está vacío. Solo se compila si nunca se ha creado uno.
+        """
+        from .models import SnapshotParametros
+        
+        data = CacheService.get(cls.CACHE_KEY)
+        if data is not None:
+            return data
+        
+        snapshot = SnapshotParametros.objects.order_by('-version').first()
+        if snapshot is None:
+            return cls.rebuild()
+        
+        data = snapshot.as_dict()
+        CacheService.set(cls.CACHE_KEY, data, timeout=None)
+        return data
+
+
+class PercentilCont(Aggregate):
+    """percentile_cont de PostgreSQL (misma interpolación lineal que percentil())"""
+    function = 'percentile_cont'
+    template = '%(function)s(%(fraccion)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    
+    def __init__(self, expression, fraccion, **extra):
+        super().__init__(expression, fraccion=float(fraccion), **extra)
+
+
+class AnalisisEstadisticasService:
+    """
+    Estadísticas agregadas de análisis urbanísticos.
+    
+    Conteos por estado y tipo en una sola consulta agrupada, más tiempos de
+    procesamiento (fecha_inicio_proceso → fecha_completado) y de respuesta de
+    la IA. El resultado se cachea con una clave versionada; las señales de
+    AnalisisUrbanistico y RespuestaIA incrementan la generación para
+    invalidarlo.
+    
+    En PostgreSQL los tiempos se agregan en SQL (percentile_cont); en otros
+    motores se resumen en Python sobre las MUESTRA_MAX filas más recientes.
+    """
+    
+    CACHE_NAMESPACE = 'analisis_estadisticas'
+    CACHE_TIMEOUT = 600
+    PERCENTILES = (50, 90, 95)
+    MUESTRA_MAX = 5000
+    
+    @staticmethod
+    def percentil(valores, p):
+        """Percentil con interpolación lineal sobre una lista ordenada"""
+        if not valores:
+            return None
+        if len(valores) == 1:
+            return valores[0]
+        posicion = (len(valores) - 1) * p / 100
+        inferior = int(posicion)
+        superior = min(inferior + 1, len(valores) - 1)
+        return valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior)
+    
+    @classmethod
+    def resumir_tiempos(cls, valores):
+        """Promedio, percentiles y máximo (segundos) de una serie de tiempos"""
+        valores = sorted(valores)
+        resumen = {
+            'muestras': len(valores),
+            'promedio': round(sum(valores) / len(valores), 2) if valores else None,
+            'maximo': round(valores[-1], 2) if valores else None,
+        }
+        for p in cls.PERCENTILES:
+            valor = cls.percentil(valores, p)
+            resumen[f'p{p}'] = round(valor, 2) if valor is not None else None
+        return resumen
+    
+    @classmethod
+    def resumir_tiempos_sql(cls, queryset, expresion, output_field):
+        """Igual que resumir_tiempos(), agregado en PostgreSQL (1 consulta)"""
+        from django.db.models import Avg, Count, Max
+        
+        agregados = {
+            'muestras': Count(expresion),
+            'promedio': Avg(expresion, output_field=output_field),
+            'maximo': Max(expresion, output_field=output_field),
+        }
+        for p in cls.PERCENTILES:
+            agregados[f'p{p}'] = PercentilCont(expresion, p / 100, output_field=output_field)
+        fila = queryset.aggregate(**agregados)
+        
+        resumen = {'muestras': fila.pop('muestras')}
+        for campo, valor in fila.items():
+            if hasattr(valor, 'total_seconds'):
+                valor = valor.total_seconds()
+            resumen[campo] = round(float(valor), 2) if valor is not None else None
+        return resumen
+    
+    @classmethod
+    def calcular(cls):
+        """Calcular las estadísticas (3 consultas, sin importar los tipos)"""
+        from django.db.models import Count, DurationField, ExpressionWrapper, F, FloatField
+        from .models import AnalisisUrbanistico, RespuestaIA
+        
+        por_estado = {key: 0 for key, _ in AnalisisUrbanistico.ESTADO_CHOICES}
+        por_tipo = {
+            key: {'label': label, 'count': 0}
+            for key, label in AnalisisUrbanistico.TIPO_ANALISIS_CHOICES
+        }
+        
+        # ✅ Una sola consulta agrupada por estado y tipo
+        grupos = (
+            AnalisisUrbanistico.objects
+            .order_by()
+            .values_list('estado', 'tipo_analisis')
+            .annotate(count=Count('id'))
+        )
+        total = 0
+        for estado, tipo, count in grupos:
+            total += count
+            por_estado[estado] = por_estado.get(estado, 0) + count
+            if tipo in por_tipo:
+                por_tipo[tipo]['count'] += count
+        
+        procesados = AnalisisUrbanistico.objects.filter(
+            fecha_inicio_proceso__isnull=False, fecha_completado__isnull=False
+        )
+        duracion = ExpressionWrapper(
+            F('fecha_completado') - F('fecha_inicio_proceso'),
+            output_field=DurationField()
+        )
+        # Solo llamadas reales a Gemini (los aciertos de cache tardan 0s)
+        llamadas_ia = RespuestaIA.objects.filter(tiempo_respuesta__gt=0, respuesta_origen__isnull=True)
+        
+        if connection.vendor == 'postgresql':
+            tiempos = {
+                'procesamiento': cls.resumir_tiempos_sql(procesados, duracion, DurationField()),
+                'respuesta_ia': cls.resumir_tiempos_sql(llamadas_ia, F('tiempo_respuesta'), FloatField()),
+            }
+        else:
+            # ✅ Sin percentile_cont: solo las filas más recientes, nunca la tabla completa
+            duraciones = (
+                procesados.annotate(duracion=duracion)
+                .order_by('-fecha_completado')
+                .values_list('duracion', flat=True)[:cls.MUESTRA_MAX]
+            )
+            tiempos_ia = llamadas_ia.order_by('-created_at').values_list(
+                'tiempo_respuesta', flat=True
+            )[:cls.MUESTRA_MAX]
+            tiempos = {
+                'procesamiento': cls.resumir_tiempos([d.total_seconds() for d in duraciones if d is not None]),
+                'respuesta_ia': cls.resumir_tiempos(list(tiempos_ia)),
+            }
+        
+        return {
+            'total': total,
+            'pendientes': por_estado.get('pendiente', 0),
+            'en_proceso': por_estado.get('en_proceso', 0),
+            'completados': por_estado.get('completado', 0),
+            'rechazados': por_estado.get('rechazado', 0),
+            'por_estado': por_estado,
+            'por_tipo': por_tipo,
+            'tiempos': tiempos,
+        }
+    
+    @classmethod
+    def get_estadisticas(cls):
+        """Estadísticas desde cache o recalculadas"""
+        key = CacheService.versioned_key(cls.CACHE_NAMESPACE, 'global')
+        return CacheService.get_or_set(key, cls.calcular, timeout=cls.CACHE_TIMEOUT, raise_errors=True)
+    
+    @classmethod
+    def invalidar(cls):
+        CacheService.bump_generation(cls.CACHE_NAMESPACE)
+
+
+class PromptResponseCache:
+    """
+    Cache de respuestas de Gemini indexado por el contenido del prompt.
+    
+    La clave combina el hash del prompt normalizado con la versión del
+    conjunto de parámetros urbanísticos. Un mismo lote, tipo de análisis y
+    opción VIS produce el mismo prompt, por lo que la respuesta se reutiliza
+    en lugar de volver a llamar a Gemini.
+    """
+    
+    CACHE_PREFIX = 'gemini_respuesta'
+    
+    @staticmethod
+    def get_timeout():
+        """TTL de las respuestas cacheadas (por defecto 7 días)"""
+        return getattr(settings, 'GEMINI_RESPONSE_CACHE_TTL', 7 * 24 * 3600)
+    
+    @staticmethod
+    def normalizar_prompt(prompt):
+        """Colapsar espacios para que diferencias de formato no cambien el hash"""
+        return ' '.join(prompt.split())
+    
+    @classmethod
+    def hash_prompt(cls, prompt):
+        return hashlib.sha256(cls.normalizar_prompt(prompt).encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def get_version_parametros():
+        """Versión del conjunto de parámetros urbanísticos activos"""
+        return ParametrosSnapshotService.get_snapshot()['version']
+    
+    @classmethod
+    def build_key(cls, prompt_hash, version):
+        return f"{cls.CACHE_PREFIX}:v{version}:{prompt_hash}"
+    
+    @classmethod
+    def buscar(cls, prompt_hash, version):
+        """
+        Buscar una respuesta previa para el prompt.
+        
+        Returns:
+            dict con id, respuesta y modelo_ia, o None
+        """
+        if not getattr(settings, 'GEMINI_RESPONSE_CACHE_ENABLED', True):
+            return None
+        
+        key = cls.build_key(prompt_hash, version)
+        cached = CacheService.get(key)
+        if cached is not None:
+            return cached
+        
+        # Respaldo en BD: respuestas generadas (no reutilizadas) con el mismo hash
+        from .models import RespuestaIA
+        
+        respuesta = (
+            RespuestaIA.objects
+            .filter(prompt_hash=prompt_hash, version_parametros=version, respuesta_origen__isnull=True)
+            .exclude(respuesta='')
+            .order_by('-created_at')
+            .values('id', 'respuesta', 'modelo_ia')
+            .first()
+        )
+        if respuesta:
+            CacheService.set(key, respuesta, timeout=cls.get_timeout())
+        return respuesta
+    
+    @classmethod
+    def guardar(cls, respuesta_ia):
+        """Registrar una respuesta generada por Gemini"""
+        if not respuesta_ia.prompt_hash or not respuesta_ia.respuesta:
+            return
+        CacheService.set(
+            cls.build_key(respuesta_ia.prompt_hash, respuesta_ia.version_parametros),
+            {
+                'id': respuesta_ia.id,
+                'respuesta': respuesta_ia.respuesta,
+                'modelo_ia': respuesta_ia.modelo_ia,
+            },
+            timeout=cls.get_timeout()
+        )
+
+
 class GeminiAnalysisService:
     """
     Servicio para generar análisis urbanístico con Gemini AI
     """
     
-    def __init__(self):
+    # ✅ Cliente compartido por todo el proceso (configure + modelo una sola vez)
+    _shared_model = None
+    _shared_model_lock = threading.Lock()
+    
+    def __init__(self, model=None):
         """Inicializar Gemini con API key"""
-        api_key = getattr(settings, 'GEMINI_API_KEY', None)
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY no configurada en settings")
+        # Modelo inyectado (p. ej. FakeGenerativeModel en pruebas)
+        if model is not None:
+            self.model = model
+            return
         
-        genai.configure(api_key=api_key)
+        if getattr(settings, 'GEMINI_USE_FAKE_MODEL', False):
+            self.model = FakeGenerativeModel()
+            logger.info("🤖 Usando modelo local de prueba (GEMINI_USE_FAKE_MODEL)")
+            return
         
-        # ✅ CORREGIDO: Usar modelo actualizado
-        try:
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
-            logger.info("🤖 Modelo Gemini inicializado: gemini-2.5-flash")
-        except Exception as e:
-            logger.warning(f"⚠️ Error con gemini-2.5-flash, intentando gemini-2.5-pro: {e}")
+        self.model = self.get_shared_model()
+    
+    @classmethod
+    def get_shared_model(cls):
+        """
+        Modelo Gemini compartido por el proceso.
+        
+        genai.configure y la creación del GenerativeModel se hacen una sola
+        vez; las instancias del servicio reutilizan el mismo cliente.
+        """
+        if cls._shared_model is not None:
+            return cls._shared_model
+        
+        with cls._shared_model_lock:
+            if cls._shared_model is not None:
+                return cls._shared_model
+            
+            api_key = getattr(settings, 'GEMINI_API_KEY', None)
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY no configurada en settings")
+            
+            genai.configure(api_key=api_key)
+            
+            # ✅ CORREGIDO: Usar modelo actualizado
             try:
-                self.model = genai.GenerativeModel('gemini-2.5-pro')
-                logger.info("🤖 Modelo Gemini inicializado: gemini-2.5-pro")
-            except Exception as e2:
-                logger.error(f"❌ No se pudo inicializar ningún modelo de Gemini: {e2}")
-                raise ValueError(f"No se pudo inicializar Gemini. Error: {e2}")
+                cls._shared_model = genai.GenerativeModel('gemini-2.5-flash')
+                logger.info("🤖 Modelo Gemini inicializado: gemini-2.5-flash")
+            except Exception as e:
+                logger.warning(f"⚠️ Error con gemini-2.5-flash, intentando gemini-2.5-pro: {e}")
+                try:
+                    cls._shared_model = genai.GenerativeModel('gemini-2.5-pro')
+                    logger.info("🤖 Modelo Gemini inicializado: gemini-2.5-pro")
+                except Exception as e2:
+                    logger.error(f"❌ No se pudo inicializar ningún modelo de Gemini: {e2}")
+                    raise ValueError(f"No se pudo inicializar Gemini. Error: {e2}")
+        
+        return cls._shared_model
+    
+    @staticmethod
+    def get_generation_config():
+        """Configuración de generación con parámetros optimizados"""
+        return genai.GenerationConfig(
+            temperature=0.7,
+            top_p=0.95,
+            top_k=40,
+            max_output_tokens=8192,
+        )
+    
+    @staticmethod
+    def get_safety_settings():
+        """Safety settings con nombres correctos"""
+        return {
+            genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
+            genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH: genai.types.HarmBlockThreshold.BLOCK_NONE,
+            genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: genai.types.HarmBlockThreshold.BLOCK_NONE,
+            genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
+        }
+    
+    def get_model_name(self):
+        """Nombre del modelo en uso"""
+        return getattr(self.model, '_model_name', None) or 'gemini-2.5-flash'
+    
+    @staticmethod
+    def contar_tokens(response, prompt, respuesta_texto):
+        """Tokens reales si hay usage_metadata, si no una estimación"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            return usage.prompt_token_count + usage.candidates_token_count
+        return len(prompt.split()) + len(respuesta_texto.split())
     
     @staticmethod
     def construir_prompt(analisis):
         """
         Construir prompt estructurado para Gemini
         """
-        from .models import ParametroUrbanistico
-        
         lote = analisis.lote
         
-        # Obtener parámetros activos
-        parametros = ParametroUrbanistico.objects.filter(activo=True).order_by('categoria', 'orden')
-        
-        # Construir contexto de parámetros
-        contexto_parametros = []
-        for param in parametros:
-            contexto_parametros.append(
-                f"## {param.get_categoria_display()} - {param.nombre}\n"
-                f"{param.descripcion}\n"
-                f"Artículo: {param.articulo_pot or 'N/A'}\n"
-                f"Datos: {param.datos}\n"
-            )
+        # ✅ Contexto de parámetros precompilado (sin consultas a BD)
+        contexto_parametros = ParametrosSnapshotService.get_snapshot()['texto']
         
         prompt = f"""
 Eres un experto urbanista especializado en análisis de aprovechamiento urbanístico en Medellín, Colombia.
@@ -80,7 +521,7 @@ Eres un experto urbanista especializado en análisis de aprovechamiento urbanís
 {analisis.comentarios_solicitante or 'Sin comentarios adicionales'}
 
 # PARÁMETROS URBANÍSTICOS DEL POT DE MEDELLÍN
-{chr(10).join(contexto_parametros)}
+{contexto_parametros}
 
 # INSTRUCCIONES
 Por favor, realiza un análisis urbanístico detallado considerando:
@@ -104,80 +545,122 @@ Sé preciso, profesional y cita artículos del POT cuando aplique.
         
         return prompt
     
-    def generar_analisis(self, analisis):
+    @staticmethod
+    def guardar_respuesta(analisis, respuesta_ia=None, **campos):
+        """Crear la RespuestaIA o actualizar la existente con los campos dados"""
+        from .models import RespuestaIA
+        
+        if respuesta_ia is None:
+            return RespuestaIA.objects.create(analisis=analisis, **campos)
+        
+        for campo, valor in campos.items():
+            setattr(respuesta_ia, campo, valor)
+        respuesta_ia.save()
+        return respuesta_ia
+    
+    def generar_analisis(self, analisis, respuesta_ia=None, on_chunk=None, usar_cache=True, usuario=None):
         """
         Generar análisis con Gemini y guardar respuesta
         
         Args:
             analisis: Instancia de AnalisisUrbanistico
+            respuesta_ia: RespuestaIA existente a completar (opcional)
+            on_chunk: Callback(texto_acumulado) para recibir texto parcial.
+                Si se indica, la generación se hace con stream=True.
+            usar_cache: Reutilizar una respuesta previa para el mismo prompt
+            usuario: Usuario al que se atribuye el consumo (ledger de uso)
             
         Returns:
             RespuestaIA: Respuesta generada
         """
-        from .models import RespuestaIA
-        
         try:
             logger.info(f"🤖 Generando análisis con IA para {analisis.id}")
             
             # Construir prompt
             prompt = self.construir_prompt(analisis)
+            prompt_hash = PromptResponseCache.hash_prompt(prompt)
+            version = PromptResponseCache.get_version_parametros()
             
-            # ✅ NUEVO: Configuración de generación con parámetros optimizados
-            generation_config = genai.GenerationConfig(
-                temperature=0.7,
-                top_p=0.95,
-                top_k=40,
-                max_output_tokens=8192,
-            )
-            
-            # ✅ CRÍTICO: Safety settings con nombres correctos
-            safety_settings = {
-                genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
-                genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH: genai.types.HarmBlockThreshold.BLOCK_NONE,
-                genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: genai.types.HarmBlockThreshold.BLOCK_NONE,
-                genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
-            }
+            # ✅ Prompt idéntico ya respondido: no volver a llamar a Gemini
+            cached = PromptResponseCache.buscar(prompt_hash, version) if usar_cache else None
+            if cached:
+                if on_chunk is not None:
+                    on_chunk(cached['respuesta'])
+                
+                respuesta_ia = self.guardar_respuesta(
+                    analisis, respuesta_ia,
+                    prompt=prompt,
+                    respuesta=cached['respuesta'],
+                    modelo_ia=cached['modelo_ia'],
+                    tokens_usados=0,
+                    tiempo_respuesta=0,
+                    prompt_hash=prompt_hash,
+                    version_parametros=version,
+                    respuesta_origen_id=cached['id']
+                )
+                logger.info(f"♻️ Análisis IA reutilizado desde respuesta {cached['id']}")
+                GeminiUsageLedger.registrar(usuario=usuario, desde_cache=True)
+                return respuesta_ia
             
-            # Generar respuesta
-            start_time = time.time()
+            # ✅ Esperar turno en el limitador compartido antes de llamar a Gemini
+            with GeminiRateLimiter.turno():
+                start_time = time.time()
+                try:
+                    if on_chunk is None:
+                        response = self.model.generate_content(
+                            prompt,
+                            generation_config=self.get_generation_config(),
+                            safety_settings=self.get_safety_settings()
+                        )
+                        respuesta_texto = response.text
+                    else:
+                        # ✅ Streaming: entregar texto parcial a medida que llega
+                        response = None
+                        partes = []
+                        for chunk in self.model.generate_content(
+                            prompt,
+                            generation_config=self.get_generation_config(),
+                            safety_settings=self.get_safety_settings(),
+                            stream=True
+                        ):
+                            response = chunk
+                            partes.append(chunk.text or '')
+                            on_chunk(''.join(partes))
+                        respuesta_texto = ''.join(partes)
+                except AnalisisCancelado:
+                    # Cancelación pedida desde on_chunk: no es un error de Gemini
+                    raise
+                except Exception:
+                    GeminiUsageLedger.registrar(
+                        usuario=usuario,
+                        latencia=time.time() - start_time,
+                        error=True
+                    )
+                    raise
+                
+                tiempo_respuesta = time.time() - start_time
             
-            # ✅ MEJORADO: Usar generate_content con configuración correcta
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config,
-                safety_settings=safety_settings
+            tokens_usados = self.contar_tokens(response, prompt, respuesta_texto)
+            GeminiUsageLedger.registrar(
+                usuario=usuario,
+                tokens=tokens_usados,
+                latencia=tiempo_respuesta
             )
-            
-            tiempo_respuesta = time.time() - start_time
-            
-            # Extraer respuesta
-            respuesta_texto = response.text
-            
-            # ✅ MEJORADO: Contar tokens reales si están disponibles
-            tokens_usados = 0
-            if hasattr(response, 'usage_metadata'):
-                tokens_usados = (
-                    response.usage_metadata.prompt_token_count + 
-                    response.usage_metadata.candidates_token_count
-                )
-            else:
-                # Estimación si no hay metadata
-                tokens_usados = len(prompt.split()) + len(respuesta_texto.split())
-            
-            # ✅ MEJORADO: Detectar modelo usado
-            modelo_usado = 'gemini-2.5-flash'
-            if hasattr(self.model, '_model_name'):
-                modelo_usado = self.model._model_name
+            modelo_usado = self.get_model_name()
             
             # Guardar en BD
-            respuesta_ia = RespuestaIA.objects.create(
-                analisis=analisis,
+            respuesta_ia = self.guardar_respuesta(
+                analisis, respuesta_ia,
                 prompt=prompt,
                 respuesta=respuesta_texto,
                 modelo_ia=modelo_usado,
                 tokens_usados=tokens_usados,
-                tiempo_respuesta=tiempo_respuesta
+                tiempo_respuesta=tiempo_respuesta,
+                prompt_hash=prompt_hash,
+                version_parametros=version,
+                respuesta_origen=None
             )
+            PromptResponseCache.guardar(respuesta_ia)
             
             logger.info(
                 f"✅ Análisis IA generado en {tiempo_respuesta:.2f}s "
@@ -186,11 +669,13 @@ Sé preciso, profesional y cita artículos del POT cuando aplique.
             
             return respuesta_ia
             
+        except AnalisisCancelado:
+            raise
         except Exception as e:
             logger.error(f"❌ Error generando análisis IA: {str(e)}")
             raise
     
-    def regenerar_analisis(self, respuesta_ia, notas_adicionales=None):
+    def regenerar_analisis(self, respuesta_ia, notas_adicionales=None, usuario=None):
         """
         Regenerar análisis con notas adicionales del admin
         """
@@ -202,29 +687,57 @@ Sé preciso, profesional y cita artículos del POT cuando aplique.
         if notas_adicionales:
             prompt_mejorado += f"\n\n# NOTAS ADICIONALES DEL ADMINISTRADOR\n{notas_adicionales}\n"
         
+        prompt_hash = PromptResponseCache.hash_prompt(prompt_mejorado)
+        version = PromptResponseCache.get_version_parametros()
+        
         try:
-            # ✅ CRÍTICO: Safety settings correctos
-            safety_settings = {
-                genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
-                genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH: genai.types.HarmBlockThreshold.BLOCK_NONE,
-                genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: genai.types.HarmBlockThreshold.BLOCK_NONE,
-                genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: genai.types.HarmBlockThreshold.BLOCK_NONE,
-            }
+            # Sin notas nuevas el prompt no cambia: se pide una respuesta nueva
+            cached = PromptResponseCache.buscar(prompt_hash, version) if notas_adicionales else None
             
-            start_time = time.time()
-            response = self.model.generate_content(
-                prompt_mejorado,
-                safety_settings=safety_settings
-            )
-            tiempo_respuesta = time.time() - start_time
+            if cached and cached['id'] != respuesta_ia.id:
+                respuesta_ia.respuesta = cached['respuesta']
+                respuesta_ia.modelo_ia = cached['modelo_ia']
+                respuesta_ia.tiempo_respuesta = 0
+                respuesta_ia.respuesta_origen_id = cached['id']
+                logger.info(f"♻️ Análisis IA regenerado desde respuesta {cached['id']}")
+                GeminiUsageLedger.registrar(usuario=usuario, desde_cache=True)
+            else:
+                with GeminiRateLimiter.turno():
+                    start_time = time.time()
+                    try:
+                        response = self.model.generate_content(
+                            prompt_mejorado,
+                            safety_settings=self.get_safety_settings()
+                        )
+                        respuesta_texto = response.text
+                    except Exception:
+                        GeminiUsageLedger.registrar(
+                            usuario=usuario,
+                            latencia=time.time() - start_time,
+                            error=True
+                        )
+                        raise
+                    tiempo_respuesta = time.time() - start_time
+                
+                respuesta_ia.respuesta = respuesta_texto
+                respuesta_ia.tiempo_respuesta = tiempo_respuesta
+                respuesta_ia.respuesta_origen = None
+                GeminiUsageLedger.registrar(
+                    usuario=usuario,
+                    tokens=self.contar_tokens(response, prompt_mejorado, respuesta_texto),
+                    latencia=tiempo_respuesta
+                )
             
             # Actualizar respuesta existente
             respuesta_ia.prompt = prompt_mejorado
-            respuesta_ia.respuesta = response.text
-            respuesta_ia.tiempo_respuesta = tiempo_respuesta
+            respuesta_ia.prompt_hash = prompt_hash
+            respuesta_ia.version_parametros = version
             respuesta_ia.aprobado = False  # Reset aprobación
             respuesta_ia.save()
             
+            if respuesta_ia.respuesta_origen_id is None:
+                PromptResponseCache.guardar(respuesta_ia)
+            
             logger.info(f"✅ Análisis IA regenerado para {analisis.id}")
             
             return respuesta_ia
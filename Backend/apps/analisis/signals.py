@@ -0,0 +1,44 @@
+"""
+Señales para análisis urbanístico
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+import logging
+
+from .models import AnalisisUrbanistico, ParametroUrbanistico, RespuestaIA
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=ParametroUrbanistico)
+@receiver(post_delete, sender=ParametroUrbanistico)
+def reconstruir_snapshot_parametros(sender, instance, **kwargs):
+    """
+    Nueva versión del snapshot de parámetros. La versión forma parte de la
+    clave del cache de respuestas IA, así que también las invalida.
+    """
+    from .services import ParametrosSnapshotService
+    
+    logger.info(f"🔄 Parámetro urbanístico modificado: {instance.nombre}")
+    transaction.on_commit(ParametrosSnapshotService.rebuild)
+
+
+@receiver(post_save, sender=AnalisisUrbanistico)
+@receiver(post_delete, sender=AnalisisUrbanistico)
+@receiver(post_save, sender=RespuestaIA)
+@receiver(post_delete, sender=RespuestaIA)
+def invalidar_estadisticas_analisis(sender, instance, **kwargs):
+    """Las estadísticas cacheadas dejan de ser válidas al cambiar un análisis o respuesta"""
+    from .services import AnalisisEstadisticasService
+    
+    transaction.on_commit(AnalisisEstadisticasService.invalidar)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def fusionar_uso_ia_usuario(sender, instance, **kwargs):
+    """El uso de IA del usuario pasa a los registros sin usuario antes del SET_NULL"""
+    from .usage import GeminiUsageLedger
+    
+    GeminiUsageLedger.fusionar_sin_usuario(instance)
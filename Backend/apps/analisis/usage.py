@@ -0,0 +1,273 @@
+"""
+Control de consumo de Gemini: limitador de concurrencia/tasa compartido
+entre workers y registro agregado de uso (ledger).
+"""
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import bisect
+import logging
+import random
+import threading
+import time
+import uuid
+
+from apps.common.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiLimiteExcedido(Exception):
+    """No se obtuvo turno para llamar a Gemini dentro del tiempo de espera"""
+
+
+class GeminiRateLimiter:
+    """
+    Limitador para las llamadas a `generate_content`.
+
+    Combina un semáforo de concurrencia (GEMINI_MAX_CONCURRENT) y un cubo de
+    peticiones por minuto (GEMINI_MAX_RPM). Con Redis (django_redis) el estado
+    se comparte entre todos los workers; con otros backends de cache se usa un
+    limitador local al proceso. Las peticiones que no obtienen turno esperan
+    en cola hasta GEMINI_QUEUE_TIMEOUT segundos.
+    """
+
+    SEMAPHORE_KEY = 'lateral360:gemini:semaforo'
+    RPM_KEY = 'lateral360:gemini:rpm'
+
+    # Un turno sin liberar (worker caído) expira tras este tiempo
+    LEASE_SECONDS = 300
+
+    _local_lock = threading.Lock()
+    _local_holders = set()
+    _local_window = {}
+
+    @staticmethod
+    def get_max_concurrent():
+        return getattr(settings, 'GEMINI_MAX_CONCURRENT', 4)
+
+    @staticmethod
+    def get_max_rpm():
+        return getattr(settings, 'GEMINI_MAX_RPM', 30)
+
+    @staticmethod
+    def get_queue_timeout():
+        return getattr(settings, 'GEMINI_QUEUE_TIMEOUT', 120)
+
+    @staticmethod
+    def _redis():
+        """Conexión Redis compartida, o None si el cache no es django_redis"""
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception:
+            return None
+
+    @classmethod
+    def _try_acquire_redis(cls, client, token, now):
+        minute = int(now // 60)
+        rpm_key = f"{cls.RPM_KEY}:{minute}"
+
+        # ✅ INCR primero: el valor retornado es atómico entre workers; si
+        # supera el límite se devuelve la petición reservada
+        pipe = client.pipeline()
+        pipe.incr(rpm_key)
+        pipe.expire(rpm_key, 120)
+        used, _ = pipe.execute()
+        if used > cls.get_max_rpm():
+            client.decr(rpm_key)
+            return False
+
+        pipe = client.pipeline()
+        pipe.zremrangebyscore(cls.SEMAPHORE_KEY, '-inf', now - cls.LEASE_SECONDS)
+        pipe.zadd(cls.SEMAPHORE_KEY, {token: now})
+        pipe.zrank(cls.SEMAPHORE_KEY, token)
+        _, _, rank = pipe.execute()
+
+        if rank is None or rank >= cls.get_max_concurrent():
+            pipe = client.pipeline()
+            pipe.zrem(cls.SEMAPHORE_KEY, token)
+            pipe.decr(rpm_key)
+            pipe.execute()
+            return False
+
+        return True
+
+    @classmethod
+    def _try_acquire_local(cls, token, now):
+        minute = int(now // 60)
+        with cls._local_lock:
+            used = cls._local_window.get(minute, 0)
+            if used >= cls.get_max_rpm() or len(cls._local_holders) >= cls.get_max_concurrent():
+                return False
+            cls._local_holders.add(token)
+            cls._local_window = {minute: used + 1}
+            return True
+
+    @classmethod
+    def _release(cls, client, token):
+        if client is not None:
+            try:
+                client.zrem(cls.SEMAPHORE_KEY, token)
+            except Exception as e:
+                logger.error(f"Error liberando turno Gemini: {str(e)}")
+        else:
+            with cls._local_lock:
+                cls._local_holders.discard(token)
+
+    @classmethod
+    @contextmanager
+    def turno(cls, timeout=None):
+        """
+        Esperar turno para llamar a Gemini y liberarlo al salir.
+
+        Raises:
+            GeminiLimiteExcedido: si no hay turno dentro del timeout
+        """
+        client = cls._redis()
+        token = uuid.uuid4().hex
+        timeout = cls.get_queue_timeout() if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        espera = 0.2
+
+        while True:
+            now = time.time()
+            try:
+                if client is not None:
+                    obtenido = cls._try_acquire_redis(client, token, now)
+                else:
+                    obtenido = cls._try_acquire_local(token, now)
+            except Exception as e:
+                # Redis no disponible: no bloquear la generación
+                logger.error(f"Limitador Gemini sin Redis, continuando: {str(e)}")
+                client = None
+                obtenido = cls._try_acquire_local(token, now)
+
+            if obtenido:
+                break
+
+            if time.monotonic() >= deadline:
+                raise GeminiLimiteExcedido(
+                    "Demasiadas solicitudes a la IA en este momento, intenta de nuevo en unos minutos"
+                )
+
+            # Backoff con jitter para no sincronizar a los workers en espera
+            time.sleep(espera + random.uniform(0, espera))
+            espera = min(espera * 2, 5)
+
+        try:
+            yield
+        finally:
+            cls._release(client, token)
+
+
+class GeminiUsageLedger:
+    """
+    Registro agregado del uso de Gemini por día y usuario (UsoIADiario).
+    """
+
+    # Límites superiores (segundos) de los buckets del histograma de latencia
+    LATENCY_BUCKETS = [1, 2, 5, 10, 20, 30, 60, 120]
+
+    @classmethod
+    def bucket_label(cls, latencia):
+        index = bisect.bisect_left(cls.LATENCY_BUCKETS, latencia)
+        if index >= len(cls.LATENCY_BUCKETS):
+            return '+Inf'
+        return str(cls.LATENCY_BUCKETS[index])
+
+    CONTADORES = ('llamadas', 'tokens', 'tiempo_total', 'aciertos_cache', 'errores')
+
+    @classmethod
+    def registrar(cls, usuario=None, tokens=0, latencia=0.0, desde_cache=False, error=False):
+        """
+        Sumar una llamada al registro del día.
+
+        Los errores del registro nunca interrumpen la generación.
+        """
+        from .models import UsoIADiario
+
+        if not desde_cache:
+            Metrics.observe_outbound('gemini', 'generate_content', latencia or 0, error=error)
+
+        try:
+            with transaction.atomic():
+                uso, _ = UsoIADiario.objects.select_for_update().get_or_create(
+                    fecha=timezone.localdate(),
+                    usuario=usuario
+                )
+                uso.llamadas += 1
+                if desde_cache:
+                    uso.aciertos_cache += 1
+                elif error:
+                    uso.errores += 1
+                else:
+                    uso.tokens += tokens or 0
+                    uso.tiempo_total += latencia or 0
+                    bucket = cls.bucket_label(latencia or 0)
+                    uso.histograma_latencia[bucket] = uso.histograma_latencia.get(bucket, 0) + 1
+                uso.save()
+        except Exception as e:
+            logger.error(f"Error registrando uso de Gemini: {str(e)}")
+
+    @classmethod
+    def fusionar_sin_usuario(cls, usuario):
+        """
+        Sumar los registros de un usuario a los registros sin usuario del
+        mismo día y borrarlos.
+
+        Se usa antes de eliminar un usuario: el SET_NULL dejaría dos filas
+        sin usuario para un mismo día (uso_ia_fecha_sin_usuario_unico).
+        """
+        from .models import UsoIADiario
+
+        for uso in UsoIADiario.objects.filter(usuario=usuario):
+            anonimo, _ = UsoIADiario.objects.select_for_update().get_or_create(
+                fecha=uso.fecha,
+                usuario=None
+            )
+            for campo in cls.CONTADORES:
+                setattr(anonimo, campo, getattr(anonimo, campo) + getattr(uso, campo))
+            for bucket, cantidad in (uso.histograma_latencia or {}).items():
+                anonimo.histograma_latencia[bucket] = anonimo.histograma_latencia.get(bucket, 0) + cantidad
+            anonimo.save()
+            uso.delete()
+
+    @classmethod
+    def resumen(cls, desde, hasta):
+        """
+        Totales por día, por usuario e histograma combinado en un rango.
+        """
+        from django.db.models import Count, Sum
+        from .models import UsoIADiario
+
+        registros = UsoIADiario.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+        campos = dict(
+            llamadas=Sum('llamadas'),
+            tokens=Sum('tokens'),
+            tiempo_total=Sum('tiempo_total'),
+            aciertos_cache=Sum('aciertos_cache'),
+            errores=Sum('errores'),
+        )
+
+        por_dia = list(registros.values('fecha').annotate(**campos).order_by('fecha'))
+        por_usuario = list(
+            registros.values('usuario', 'usuario__email')
+            .annotate(dias=Count('fecha'), **campos)
+            .order_by('-tokens')
+        )
+
+        histograma = {str(b): 0 for b in cls.LATENCY_BUCKETS}
+        histograma['+Inf'] = 0
+        for parcial in registros.values_list('histograma_latencia', flat=True):
+            for bucket, cantidad in (parcial or {}).items():
+                histograma[bucket] = histograma.get(bucket, 0) + cantidad
+
+        return {
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'por_dia': por_dia,
+            'por_usuario': por_usuario,
+            'histograma_latencia': histograma,
+        }
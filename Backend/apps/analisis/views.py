@@ -6,20 +6,24 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
 from django.utils import timezone  # ✅ CRÍTICO: Agregar esta importación
+from datetime import timedelta
 import logging
+import uuid
 
-from .models import AnalisisUrbanistico, ParametroUrbanistico, RespuestaIA
+from .models import AnalisisUrbanistico, ParametroUrbanistico, RespuestaIA, TrabajoAnalisisIA
 from .serializers import (
     AnalisisUrbanisticoSerializer,
     AnalisisCreateSerializer,
     AnalisisUpdateSerializer,
     IniciarProcesoSerializer,
     CompletarAnalisisSerializer,
-    RechazarAnalisisSerializer
+    RechazarAnalisisSerializer,
+    TrabajoAnalisisIASerializer
 )
-from .services import GeminiAnalysisService
+from .jobs import AnalisisIAJobRunner
+from .services import AnalisisEstadisticasService, ParametrosSnapshotService
+from .usage import GeminiUsageLedger
 from apps.notifications.services import NotificationService
 
 logger = logging.getLogger(__name__)
@@ -94,25 +98,8 @@ class AnalisisUrbanisticoViewSet(viewsets.ModelViewSet):
                 'error': 'No tienes permiso para ver estadísticas'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        stats = AnalisisUrbanistico.objects.aggregate(
-            total=Count('id'),
-            pendientes=Count('id', filter=Q(estado='pendiente')),
-            en_proceso=Count('id', filter=Q(estado='en_proceso')),
-            completados=Count('id', filter=Q(estado='completado')),
-            rechazados=Count('id', filter=Q(estado='rechazado'))
-        )
-        
-        # Contar por tipo
-        por_tipo = {}
-        for choice in AnalisisUrbanistico.TIPO_ANALISIS_CHOICES:
-            tipo_key = choice[0]
-            count = AnalisisUrbanistico.objects.filter(tipo_analisis=tipo_key).count()
-            por_tipo[tipo_key] = {
-                'label': choice[1],
-                'count': count
-            }
-        
-        stats['por_tipo'] = por_tipo
+        # ✅ Una consulta agrupada + tiempos, cacheado hasta el siguiente cambio
+        stats = AnalisisEstadisticasService.get_estadisticas()
         
         return Response(stats)
     
@@ -227,7 +214,10 @@ class AnalisisUrbanisticoViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def generar_ia(self, request, pk=None):
         """
-        Generar análisis con IA (NO guarda en BD, solo retorna JSON)
+        Encolar la generación del análisis con IA (NO guarda en resultados).
+        
+        Responde 202 con el trabajo creado; el progreso y el texto parcial
+        se consultan con `estado_ia`.
         """
         analisis = self.get_object()
         
@@ -238,7 +228,7 @@ class AnalisisUrbanisticoViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            logger.info(f"[Analisis] 🤖 Generando IA para análisis {analisis.id}")
+            logger.info(f"[Analisis] 🤖 Encolando IA para análisis {analisis.id}")
             
             # Si está pendiente, cambiar a en_proceso
             if analisis.esta_pendiente:
@@ -246,32 +236,94 @@ class AnalisisUrbanisticoViewSet(viewsets.ModelViewSet):
                 analisis.analista = request.user
                 analisis.save()
             
-            # ✅ CRÍTICO: Generar con IA (SIN guardar)
-            service = GeminiAnalysisService()
-            respuesta_ia = service.generar_analisis(analisis)
-            
-            logger.info(f"[Analisis] ✅ IA generada exitosamente para {analisis.id}")
+            trabajo = AnalisisIAJobRunner.enqueue(analisis, user=request.user)
             
-            # ✅ CRÍTICO: Solo retornar JSON (NO guardar en analisis.resultados)
             return Response({
                 'success': True,
-                'message': 'Análisis generado con IA',
-                'data': {
-                    'respuesta': respuesta_ia.respuesta,
-                    'modelo': respuesta_ia.modelo_ia,
-                    'tokens_usados': respuesta_ia.tokens_usados,
-                    'tiempo_respuesta': respuesta_ia.tiempo_respuesta,
-                    'prompt': respuesta_ia.prompt[:500] + '...'  # Preview del prompt
-                }
-            })
+                'message': 'Generación con IA en curso',
+                'trabajo': TrabajoAnalisisIASerializer(trabajo).data
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
-            logger.error(f"Error generando análisis IA: {str(e)}", exc_info=True)
+            logger.error(f"Error encolando análisis IA: {str(e)}", exc_info=True)
             return Response({
                 'success': False,
                 'error': f'Error al generar análisis: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _get_trabajo_ia(self, request, analisis):
+        """
+        Trabajo indicado en ?trabajo= o el más reciente del análisis.
+        
+        Raises:
+            ValueError: si ?trabajo= no es un UUID válido
+        """
+        trabajos = TrabajoAnalisisIA.objects.select_related('respuesta_ia').filter(analisis=analisis)
+        trabajo_id = request.query_params.get('trabajo') or request.data.get('trabajo')
+        if trabajo_id:
+            return trabajos.filter(pk=uuid.UUID(str(trabajo_id))).first()
+        return trabajos.order_by('-created_at').first()
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def estado_ia(self, request, pk=None):
+        """
+        Consultar el estado de la generación con IA y el texto parcial
+        """
+        analisis = self.get_object()
+        try:
+            trabajo = self._get_trabajo_ia(request, analisis)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'UUID de trabajo inválido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not trabajo:
+            return Response({
+                'success': False,
+                'error': 'No hay generación con IA para este análisis'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'trabajo': TrabajoAnalisisIASerializer(trabajo).data
+        })
+    
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def cancelar_ia(self, request, pk=None):
+        """
+        Cancelar la generación con IA en curso
+        """
+        analisis = self.get_object()
+        try:
+            trabajo = self._get_trabajo_ia(request, analisis)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'UUID de trabajo inválido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not trabajo:
+            return Response({
+                'success': False,
+                'error': 'No hay generación con IA para este análisis'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if trabajo.esta_finalizado:
+            return Response({
+                'success': False,
+                'error': f'La generación ya terminó ({trabajo.get_estado_display()})'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        trabajo = AnalisisIAJobRunner.cancel(trabajo)
+        logger.info(f"[Analisis] 🛑 {request.user.email} canceló IA de {analisis.id}")
+        
+        return Response({
+            'success': True,
+            'message': 'Cancelación solicitada',
+            'trabajo': TrabajoAnalisisIASerializer(trabajo).data
+        })
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def aprobar_ia(self, request, pk=None):
         """
@@ -361,30 +413,15 @@ class AnalisisUrbanisticoViewSet(viewsets.ModelViewSet):
         """
         ✅ NUEVO: Obtener parámetros urbanísticos agrupados por categoría
         """
-        from .models import ParametroUrbanistico
-        
         try:
-            parametros = ParametroUrbanistico.objects.filter(activo=True).order_by('categoria', 'orden')
-            
-            # Agrupar por categoría
-            parametros_agrupados = {}
-            for param in parametros:
-                categoria_display = param.get_categoria_display()
-                if categoria_display not in parametros_agrupados:
-                    parametros_agrupados[categoria_display] = []
-                
-                parametros_agrupados[categoria_display].append({
-                    'id': str(param.id),
-                    'nombre': param.nombre,
-                    'descripcion': param.descripcion,
-                    'articulo_pot': param.articulo_pot,
-                    'datos': param.datos,
-                    'orden': param.orden
-                })
+            # ✅ Snapshot precompilado (sin consultas a BD)
+            snapshot = ParametrosSnapshotService.get_snapshot()
             
             return Response({
                 'success': True,
-                'data': parametros_agrupados
+                'data': snapshot['agrupados'],
+                'total': snapshot['total'],
+                'version': snapshot['version']
             })
             
         except Exception as e:
@@ -393,6 +430,29 @@ class AnalisisUrbanisticoViewSet(viewsets.ModelViewSet):
                 'success': False,
                 'error': 'Error al obtener parámetros'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def uso_ia(self, request):
+        """
+        Consumo de Gemini por día y por usuario con histograma de latencia
+        
+        Query params: dias (por defecto 30)
+        """
+        try:
+            dias = min(max(int(request.query_params.get('dias', 30)), 1), 365)
+        except (TypeError, ValueError):
+            return Response({
+                'success': False,
+                'error': 'El parámetro dias debe ser un número entero'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=dias - 1)
+        
+        return Response({
+            'success': True,
+            'data': GeminiUsageLedger.resumen(desde, hasta)
+        })
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
@@ -401,33 +461,18 @@ def parametros_urbanisticos_view(request):
     ✅ NUEVO: Vista para obtener parámetros urbanísticos agrupados por categoría
     GET /api/analisis/parametros/
     """
-    from .models import ParametroUrbanistico
-    
     try:
-        parametros = ParametroUrbanistico.objects.filter(activo=True).order_by('categoria', 'orden')
-        
-        # Agrupar por categoría
-        parametros_agrupados = {}
-        for param in parametros:
-            categoria_display = param.get_categoria_display()
-            if categoria_display not in parametros_agrupados:
-                parametros_agrupados[categoria_display] = []
-            
-            parametros_agrupados[categoria_display].append({
-                'id': str(param.id),
-                'nombre': param.nombre,
-                'descripcion': param.descripcion,
-                'articulo_pot': param.articulo_pot,
-                'datos': param.datos,
-                'orden': param.orden
-            })
+        # ✅ Snapshot precompilado (sin consultas a BD)
+        snapshot = ParametrosSnapshotService.get_snapshot()
+        parametros_agrupados = snapshot['agrupados']
         
-        logger.info(f"✅ Parámetros urbanísticos recuperados: {len(parametros)} parámetros en {len(parametros_agrupados)} categorías")
+        logger.info(f"✅ Parámetros urbanísticos recuperados: {snapshot['total']} parámetros en {len(parametros_agrupados)} categorías (v{snapshot['version']})")
         
         return Response({
             'success': True,
             'data': parametros_agrupados,
-            'total': len(parametros)
+            'total': snapshot['total'],
+            'version': snapshot['version']
         })
         
     except Exception as e:
@@ -0,0 +1,89 @@
+"""
+Autenticación JWT con el usuario resuelto desde cache.
+
+`JWTAuthentication` consulta la fila completa de `users.User` en cada
+petición autenticada. `CachedJWTAuthentication` guarda en Redis (y en el L1
+del worker) un usuario con solo las columnas que usan las clases de permisos,
+con clave por id y versión de token: al invalidar se incrementa la versión y
+las entradas anteriores dejan de usarse (sin carreras entre borrar y volver
+a escribir).
+
+Se invalida en cada `post_save`/`post_delete` de User (edición, soft_delete,
+cambio y reset de contraseña) y en los `QuerySet.update()` de usuarios que
+escriben columnas cacheadas (`UserQuerySet.update`). El logout no invalida:
+el access token sigue siendo válido hasta expirar y el usuario no cambió.
+Si una vista necesita otro campo, `User.refresh_from_db` carga todos los
+diferidos en una sola consulta.
+"""
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+import logging
+
+from apps.common.cache import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication sin consulta a users_user en los aciertos de cache"""
+
+    CACHE_NAMESPACE = 'auth_user'
+
+    # Columnas que usan las clases de permisos y los logs de las vistas
+    FIELDS = (
+        'id', 'email', 'username', 'role',
+        'is_active', 'is_staff', 'is_superuser', 'is_verified',
+    )
+
+    @classmethod
+    def get_fields(cls):
+        fields = list(cls.FIELDS)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            fields.append('password')
+        return fields
+
+    @classmethod
+    def cache_key(cls, user_id):
+        """Clave por id y versión de token del usuario"""
+        version = CacheService.get_generation(f'{cls.CACHE_NAMESPACE}:{user_id}')
+        return f'{cls.CACHE_NAMESPACE}:{user_id}:v{version}'
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """Nueva versión de token: las entradas cacheadas del usuario dejan de usarse"""
+        CacheService.bump_generation(f'{cls.CACHE_NAMESPACE}:{user_id}')
+        logger.debug(f"🔄 Auth cache invalidated: {user_id}")
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = self.cache_key(user_id)
+        user = CacheService.get(key)
+        if user is None:
+            try:
+                user = self.user_model.objects.only(*self.get_fields()).get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            CacheService.set(key, user, timeout=getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
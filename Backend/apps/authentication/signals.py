@@ -3,7 +3,7 @@ Signals para autenticación
 """
 import logging
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -82,6 +82,22 @@ def handle_user_company_validation(sender, instance, **kwargs):
         instance.clean = skip_company_clean
 
 
+@receiver(post_save, sender='users.User')
+@receiver(post_delete, sender='users.User')
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    """
+    El usuario cacheado por CachedJWTAuthentication deja de ser válido al
+    guardar (edición, soft_delete, cambio de contraseña) o eliminar, salvo
+    que el save() solo haya escrito columnas que no se cachean.
+    """
+    from .authentication import CachedJWTAuthentication
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(CachedJWTAuthentication.get_fields()):
+        # Solo cambiaron columnas que el usuario cacheado no incluye
+        return
+    CachedJWTAuthentication.invalidate(instance.pk)
+
+
 def _get_client_ip(request):
     """Obtener IP del cliente de forma segura"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
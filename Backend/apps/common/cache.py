@@ -1,5 +1,10 @@
 """
 Servicio de cache centralizado para Lateral 360°
+
+Lecturas en dos niveles: L1 en proceso (`LocalCache`) y L2 en Redis.
+`get_or_set` y `@cache_result` protegen contra estampidas con expiración
+anticipada probabilística (XFetch), un lock de recálculo por clave que sirve
+el valor anterior mientras tanto, y cache negativo para resultados vacíos.
 """
 from django.core.cache import caches
 from django.conf import settings
@@ -8,6 +13,13 @@ from typing import Any, Optional, Callable
 from functools import wraps
 import hashlib
 import json
+import math
+import random
+import time
+import uuid
+
+from .local_cache import LocalCache
+from .metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +36,9 @@ class CacheService:
         'user_profile': 600,     # 10 minutos
     }
     
+    # Marca de los valores guardados por get_or_set (con metadatos de XFetch)
+    ENVELOPE = '__xfetch__'
+    
     @staticmethod
     def get_cache(cache_name: str = 'default'):
         """Obtener instancia de cache"""
@@ -41,13 +56,26 @@ class CacheService:
     
     @classmethod
     def get(cls, key: str, cache_name: str = 'default') -> Optional[Any]:
-        """Obtener valor del cache"""
+        """Obtener valor del cache (L1 en proceso, luego Redis)"""
+        l1 = LocalCache.enabled(cache_name)
+        if l1:
+            found, value = LocalCache.get(cache_name, key)
+            if found:
+                Metrics.observe_cache(cache_name, True, tier='l1')
+                logger.debug(f"✅ Cache HIT (L1): {key[:50]}...")
+                return value
+        
         try:
             cache = cls.get_cache(cache_name)
             value = cache.get(key)
+            Metrics.observe_cache(cache_name, value is not None)
             
             if value is not None:
                 logger.debug(f"✅ Cache HIT: {key[:50]}...")
+                if l1:
+                    # El TTL del L1 (corto, por namespace) acota cuánto puede
+                    # sobrevivir la copia local a la expiración en Redis
+                    LocalCache.set(cache_name, key, value)
             else:
                 logger.debug(f"❌ Cache MISS: {key[:50]}...")
             
@@ -63,6 +91,10 @@ class CacheService:
         try:
             cache = cls.get_cache(cache_name)
             cache.set(key, value, timeout=timeout)
+            if LocalCache.enabled(cache_name):
+                # Los demás workers descartan su copia; este guarda la nueva
+                LocalCache.broadcast(cache_name, keys=[key])
+                LocalCache.set(cache_name, key, value, timeout)
             logger.debug(f"💾 Cache SET: {key[:50]}... (timeout: {timeout}s)")
             return True
         except Exception as e:
@@ -75,18 +107,97 @@ class CacheService:
         try:
             cache = cls.get_cache(cache_name)
             cache.delete(key)
+            LocalCache.broadcast(cache_name, keys=[key])
             logger.debug(f"🗑️ Cache DELETE: {key[:50]}...")
             return True
         except Exception as e:
             logger.error(f"Cache DELETE error: {str(e)}")
             return False
     
+    @classmethod
+    def get_many(cls, keys, cache_name: str = 'default') -> dict:
+        """Obtener varias claves en un solo viaje a Redis ({clave: valor} de las encontradas)"""
+        encontrados = {}
+        l1 = LocalCache.enabled(cache_name)
+        pendientes = list(keys)
+        if l1:
+            faltantes = []
+            for key in pendientes:
+                found, value = LocalCache.get(cache_name, key)
+                if found:
+                    encontrados[key] = value
+                else:
+                    faltantes.append(key)
+            pendientes = faltantes
+
+        if pendientes:
+            try:
+                valores = cls.get_cache(cache_name).get_many(pendientes)
+            except Exception as e:
+                logger.error(f"Cache GET_MANY error: {str(e)}")
+                valores = {}
+            for key, value in valores.items():
+                if l1:
+                    LocalCache.set(cache_name, key, value)
+                encontrados[key] = value
+
+        Metrics.observe_cache(cache_name, len(encontrados) == len(keys))
+        return encontrados
+
+    @classmethod
+    def set_many(cls, data: dict, timeout: Optional[int] = None,
+                 cache_name: str = 'default') -> bool:
+        """Guardar varias claves en un solo viaje a Redis"""
+        if not data:
+            return True
+        try:
+            cls.get_cache(cache_name).set_many(data, timeout=timeout)
+            if LocalCache.enabled(cache_name):
+                LocalCache.broadcast(cache_name, keys=list(data))
+                for key, value in data.items():
+                    LocalCache.set(cache_name, key, value, timeout)
+            logger.debug(f"💾 Cache SET_MANY: {len(data)} claves (timeout: {timeout}s)")
+            return True
+        except Exception as e:
+            logger.error(f"Cache SET_MANY error: {str(e)}")
+            return False
+
+    @classmethod
+    def delete_many(cls, keys, cache_name: str = 'default') -> bool:
+        """Eliminar varias claves en un solo viaje a Redis"""
+        keys = list(keys)
+        if not keys:
+            return True
+        try:
+            cls.get_cache(cache_name).delete_many(keys)
+            LocalCache.broadcast(cache_name, keys=keys)
+            logger.debug(f"🗑️ Cache DELETE_MANY: {len(keys)} claves")
+            return True
+        except Exception as e:
+            logger.error(f"Cache DELETE_MANY error: {str(e)}")
+            return False
+
+    @classmethod
+    def delete_pattern(cls, pattern: str, cache_name: str = 'default') -> bool:
+        """Eliminar claves por patrón (solo django_redis) y vaciar el L1 del alias"""
+        try:
+            cache = cls.get_cache(cache_name)
+            if hasattr(cache, 'delete_pattern'):
+                cache.delete_pattern(pattern)
+            LocalCache.broadcast(cache_name, clear=True)
+            logger.debug(f"🗑️ Cache DELETE PATTERN: {pattern}")
+            return True
+        except Exception as e:
+            logger.error(f"Cache DELETE PATTERN error: {str(e)}")
+            return False
+    
     @classmethod
     def clear(cls, cache_name: str = 'default') -> bool:
         """Limpiar todo el cache"""
         try:
             cache = cls.get_cache(cache_name)
             cache.clear()
+            LocalCache.broadcast(cache_name, clear=True)
             logger.info(f"🧹 Cache CLEARED: {cache_name}")
             return True
         except Exception as e:
@@ -95,25 +206,232 @@ class CacheService:
     
     @classmethod
     def get_or_set(cls, key: str, default_func: Callable, timeout: Optional[int] = None,
-                   cache_name: str = 'default') -> Any:
-        """Obtener del cache o ejecutar función si no existe"""
-        value = cls.get(key, cache_name)
-        
-        if value is not None:
-            return value
+                   cache_name: str = 'default', raise_errors: bool = False) -> Any:
+        """
+        Obtener del cache o ejecutar función si no existe.
         
+        Protegido contra estampidas: como mucho un recálculo por expiración
+        (ver `_get_or_compute`). Si la función falla devuelve None, o propaga
+        la excepción con `raise_errors=True`.
+        """
         try:
-            value = default_func()
-            cls.set(key, value, timeout, cache_name)
-            return value
+            return cls._get_or_compute(key, default_func, timeout, cache_name)
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error executing default_func: {str(e)}")
             return None
+    
+    # ------------------------------------------------------------------
+    # Protección contra estampidas
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _config(name, default):
+        return getattr(settings, name, default)
+    
+    @classmethod
+    def _es_sobre(cls, value) -> bool:
+        return isinstance(value, dict) and value.get(cls.ENVELOPE) == 1
+    
+    @classmethod
+    def _debe_recalcular(cls, sobre, now) -> bool:
+        """
+        XFetch: recalcular antes de expirar con probabilidad creciente a medida
+        que se acerca la expiración, ponderada por lo que tardó el cálculo.
+        """
+        if now >= sobre['exp']:
+            return True
+        beta = cls._config('CACHE_XFETCH_BETA', 1.0)
+        return now - sobre['delta'] * beta * math.log(1.0 - random.random()) >= sobre['exp']
+    
+    @staticmethod
+    def _es_vacio(value) -> bool:
+        return value is None or (isinstance(value, (list, tuple, dict, set, str)) and not value)
+    
+    @classmethod
+    def _recalcular(cls, key, default_func, timeout, cache_name):
+        """Ejecutar la función y guardar el sobre con sus metadatos"""
+        inicio = time.perf_counter()
+        value = default_func()
+        delta = time.perf_counter() - inicio
+        
+        if timeout is None:
+            ttl = None
+        elif cls._es_vacio(value):
+            # ✅ Cache negativo: resultados vacíos por menos tiempo
+            ttl = min(timeout, cls._config('CACHE_NEGATIVE_TTL', 30))
+        else:
+            ttl = timeout
+        
+        sobre = {
+            cls.ENVELOPE: 1,
+            'v': value,
+            'delta': delta,
+            'exp': time.time() + ttl if ttl is not None else math.inf,
+        }
+        # El valor sigue en Redis un tiempo extra para servirlo mientras otro recalcula
+        stale_ttl = ttl + cls._config('CACHE_STALE_TTL', 60) if ttl is not None else None
+        cls.set(key, sobre, stale_ttl, cache_name)
+        return value
+    
+    @classmethod
+    def _get_or_compute(cls, key, default_func, timeout, cache_name):
+        """
+        1. Valor vigente (y XFetch no pide recalcular): devolverlo.
+        2. Si hay que recalcular, solo quien obtiene el lock de la clave lo
+           hace; los demás reciben el valor anterior (stale).
+        3. Sin valor anterior, los demás esperan al ganador hasta
+           CACHE_RECOMPUTE_WAIT segundos y luego calculan por su cuenta.
+        """
+        cached = cls.get(key, cache_name)
+        now = time.time()
+        stale = None
+        if cls._es_sobre(cached):
+            if not cls._debe_recalcular(cached, now):
+                return cached['v']
+            stale = cached
+        elif cached is not None:
+            # Valor guardado con set() sin metadatos
+            return cached
+        
+        cache = cls.get_cache(cache_name)
+        lock_key = f"{key}:recompute-lock"
+        token = uuid.uuid4().hex
+        try:
+            locked = cache.add(lock_key, token, timeout=cls._config('CACHE_RECOMPUTE_LOCK_TIMEOUT', 30))
+        except Exception as e:
+            logger.error(f"Cache LOCK error: {str(e)}")
+            locked = True
+        
+        if locked:
+            try:
+                return cls._recalcular(key, default_func, timeout, cache_name)
+            except Exception:
+                if stale is not None:
+                    logger.exception(f"Error recalculando {key[:50]}, se sirve el valor anterior")
+                    return stale['v']
+                raise
+            finally:
+                try:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+                except Exception:
+                    pass
+        
+        if stale is not None:
+            logger.debug(f"♻️ Cache STALE: {key[:50]}... (otro proceso recalcula)")
+            return stale['v']
+        
+        limite = now + cls._config('CACHE_RECOMPUTE_WAIT', 5)
+        while time.time() < limite:
+            time.sleep(0.05)
+            cached = cls.get(key, cache_name)
+            if cls._es_sobre(cached):
+                return cached['v']
+        
+        logger.warning(f"⏱️ Espera de recálculo agotada para {key[:50]}, se calcula localmente")
+        return cls._recalcular(key, default_func, timeout, cache_name)
+    
+    @classmethod
+    def get_generation(cls, namespace: str, cache_name: str = 'default') -> int:
+        """
+        Obtener la generación actual de un namespace.
+        
+        Las claves construidas con `versioned_key` incluyen la generación,
+        por lo que al incrementarla quedan invalidadas sin borrar patrones.
+        """
+        try:
+            cache = cls.get_cache(cache_name)
+            key = f'generation:{namespace}'
+            if LocalCache.enabled(cache_name):
+                found, generation = LocalCache.get(cache_name, key)
+                if found:
+                    return generation
+            generation = cache.get(key)
+            if generation is None:
+                cache.add(key, 1, timeout=None)
+                generation = 1
+            generation = int(generation)
+            if LocalCache.enabled(cache_name):
+                LocalCache.set(cache_name, key, generation)
+            return generation
+        except Exception as e:
+            logger.error(f"Cache GENERATION error: {str(e)}")
+            return 0
+    
+    @classmethod
+    def bump_generation(cls, namespace: str, cache_name: str = 'default') -> int:
+        """Incrementar la generación de un namespace (invalida sus claves)"""
+        key = f'generation:{namespace}'
+        try:
+            cache = cls.get_cache(cache_name)
+            try:
+                generation = cache.incr(key)
+            except ValueError:
+                # La clave no existe todavía
+                cache.add(key, 1, timeout=None)
+                generation = cache.incr(key)
+            LocalCache.broadcast(cache_name, keys=[key])
+            logger.debug(f"🔢 Cache GENERATION {namespace} -> {generation}")
+            return generation
+        except Exception as e:
+            logger.error(f"Cache BUMP error: {str(e)}")
+            return 0
+    
+    @classmethod
+    def get_generations(cls, namespaces, cache_name: str = 'default') -> Optional[dict]:
+        """
+        Generación de varios namespaces en un solo viaje, leída del cache
+        compartido (sin el L1) para comprobar que no cambió durante un
+        cálculo (1 si el namespace no existe, como `get_generation`). None si
+        el cache falla.
+        """
+        keys = {f'generation:{namespace}': namespace for namespace in namespaces}
+        if not keys:
+            return {}
+        try:
+            valores = cls.get_cache(cache_name).get_many(list(keys))
+        except Exception as e:
+            logger.error(f"Cache GENERATIONS error: {str(e)}")
+            return None
+        return {namespace: int(valores.get(key, 1)) for key, namespace in keys.items()}
+    
+    @classmethod
+    def bump_generations(cls, namespaces, cache_name: str = 'default') -> bool:
+        """Incrementar la generación de varios namespaces (ver `get_generations`)"""
+        try:
+            cache = cls.get_cache(cache_name)
+            keys = [f'generation:{namespace}' for namespace in namespaces]
+            for key in keys:
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    # La clave no existe todavía
+                    cache.add(key, 1, timeout=None)
+                    cache.incr(key)
+            if keys:
+                LocalCache.broadcast(cache_name, keys=keys)
+            return True
+        except Exception as e:
+            logger.error(f"Cache BUMP error: {str(e)}")
+            return False
+    
+    @classmethod
+    def versioned_key(cls, namespace: str, *args, cache_name: str = 'default', **kwargs) -> str:
+        """Generar clave de cache atada a la generación actual del namespace"""
+        generation = cls.get_generation(namespace, cache_name)
+        return f"{namespace}:g{generation}:{cls.generate_key(*args, **kwargs)}"
 
 
 def cache_result(timeout: int = 300, cache_name: str = 'default', 
                  key_prefix: str = ''):
-    """Decorador para cachear resultado de función"""
+    """
+    Decorador para cachear resultado de función.
+    
+    Usa la misma protección contra estampidas que `get_or_set`; las
+    excepciones de la función se propagan (sin valor anterior que servir).
+    """
     def decorator(func: Callable):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -123,17 +441,10 @@ def cache_result(timeout: int = 300, cache_name: str = 'default',
             key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
             cache_key = ":".join(key_parts)
             
-            # Intentar obtener del cache
-            result = CacheService.get(cache_key, cache_name)
-            
-            if result is not None:
-                return result
-            
-            # Ejecutar función y guardar en cache
-            result = func(*args, **kwargs)
-            CacheService.set(cache_key, result, timeout, cache_name)
-            
-            return result
+            return CacheService.get_or_set(
+                cache_key, lambda: func(*args, **kwargs), timeout, cache_name,
+                raise_errors=True
+            )
         
         return wrapper
     return decorator
@@ -150,11 +461,15 @@ def invalidate_user_cache(user_id: str):
 def invalidate_lote_cache(lote_id: str):
     """Invalidar cache relacionado con un lote"""
     CacheService.delete(f'lote_detail:{lote_id}')
-    cache = CacheService.get_cache('search')
-    cache.delete_pattern('lotes_list:*')
+    CacheService.delete_pattern('lotes_list:*', cache_name='search')
     logger.info(f"🔄 Lote cache invalidated: {lote_id}")
 
 
+def invalidate_document_cache():
+    """Invalidar cache afectado por la validación de documentos (estadísticas)"""
+    invalidate_statistics_cache()
+
+
 def invalidate_statistics_cache():
     """Invalidar cache de estadísticas"""
     CacheService.delete('admin_statistics')
@@ -0,0 +1,102 @@
+"""
+Seguimiento de campos modificados para modelos.
+
+`DirtyFieldsMixin` guarda los valores de las columnas al cargar una instancia
+desde la base de datos y, en `save()` sin `update_fields`, escribe solo las
+columnas que cambiaron (más las `auto_now`). Si nada cambió no hay UPDATE ni
+señales `post_save`, igual que `save(update_fields=[])` en Django.
+
+Tras cada save(), `get_saved_changes()` devuelve los valores anteriores de
+las columnas que escribió ese save(), para las señales `post_save`.
+"""
+import copy
+
+
+def _copiar(value):
+    # Los JSONField pueden modificarse en sitio; el resto son inmutables
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+class DirtyFieldsMixin:
+    """Mixin para models.Model: `get_dirty_fields()` y save() con update_fields"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._marcar_limpio()
+        return instance
+
+    def _valores_cargados(self, attnames=None):
+        return {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and (attnames is None or field.attname in attnames)
+        }
+
+    def _marcar_limpio(self, attnames=None):
+        """Tomar los valores actuales (o solo `attnames`) como los guardados"""
+        valores = {name: _copiar(value) for name, value in self._valores_cargados(attnames).items()}
+        if attnames is None or not hasattr(self, '_valores_guardados'):
+            self._valores_guardados = valores
+        else:
+            self._valores_guardados.update(valores)
+
+    def get_dirty_fields(self):
+        """
+        Conjunto de attnames modificados desde la carga o el último save(),
+        o None si la instancia no viene de la base de datos.
+        """
+        guardados = getattr(self, '_valores_guardados', None)
+        if self._state.adding or guardados is None:
+            return None
+        return {
+            name for name, value in self._valores_cargados().items()
+            if name not in guardados or guardados[name] != value
+        }
+
+    def get_saved_changes(self):
+        """
+        {attname: valor anterior} de las columnas que cambió el último save(),
+        o None si se desconocen (instancia nueva o que no viene de la base de
+        datos). Pensado para las señales `post_save`.
+        """
+        return getattr(self, '_cambios_guardados', None)
+
+    def is_dirty(self):
+        dirty = self.get_dirty_fields()
+        return dirty is None or bool(dirty)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # Los campos diferidos que se acaban de cargar no están modificados
+        self._marcar_limpio(set(fields) if fields is not None else None)
+
+    def save(self, *args, **kwargs):
+        cambios = self.get_dirty_fields()
+        guardados = getattr(self, '_valores_guardados', None)
+        if cambios is not None and kwargs.get('update_fields') is not None:
+            cambios &= {self._meta.get_field(name).attname for name in kwargs['update_fields']}
+        # Antes de super().save(): las señales post_save ya los consultan
+        self._cambios_guardados = None if cambios is None else {name: guardados.get(name) for name in cambios}
+
+        if not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            dirty = self.get_dirty_fields()
+            if dirty is not None:
+                if dirty:
+                    dirty |= {
+                        field.attname for field in self._meta.concrete_fields
+                        if getattr(field, 'auto_now', False)
+                    }
+                kwargs['update_fields'] = dirty
+
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._marcar_limpio()
+        elif update_fields:
+            self._marcar_limpio({
+                self._meta.get_field(name).attname for name in update_fields
+            })
@@ -0,0 +1,264 @@
+"""
+Cache L1 en proceso delante de Redis (L2).
+
+Cada worker guarda las claves leídas recientemente en un `TLRUCache` de
+cachetools por (alias, namespace), con tamaño y TTL por namespace. Las
+escrituras e invalidaciones se publican en el canal Redis
+`lateral360:cache:invalidate` y un hilo por proceso descarta las entradas
+afectadas en los demás workers. El TTL corto del L1 acota la desactualización
+si se pierde un mensaje; al reconectar el suscriptor se vacía todo el L1.
+
+Solo se activa para los aliases con backend django_redis (o los definidos en
+CACHE_L1_ALIASES): sobre LocMemCache no aporta nada.
+"""
+from cachetools import TLRUCache
+from collections import defaultdict
+from django.conf import settings
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+_INMUTABLES = (str, bytes, int, float, bool, type(None))
+
+
+class LocalCache:
+    """L1 por proceso con invalidación por pub/sub"""
+
+    CHANNEL = 'lateral360:cache:invalidate'
+
+    _lock = threading.RLock()
+    _caches = {}
+    _stats = defaultdict(lambda: [0, 0])
+    _aliases = None
+    _pid = None
+    _origin = None
+    _listener = None
+
+    # ------------------------------------------------------------------
+    # Configuración
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def get_aliases(cls):
+        """Aliases de cache con L1"""
+        if cls._aliases is None:
+            aliases = getattr(settings, 'CACHE_L1_ALIASES', None)
+            if aliases is None:
+                aliases = [
+                    alias for alias, config in settings.CACHES.items()
+                    if 'django_redis' in config.get('BACKEND', '')
+                ]
+            cls._aliases = frozenset(aliases) if getattr(settings, 'CACHE_L1_ENABLED', True) else frozenset()
+        return cls._aliases
+
+    @classmethod
+    def enabled(cls, alias):
+        return alias in cls.get_aliases()
+
+    @staticmethod
+    def namespace(key):
+        """
+        Prefijo antes de ':' ('generation:documents' -> 'generation'); las
+        claves sin prefijo usan su propio nombre si tienen límites
+        configurados ('admin_statistics') o 'default' (p. ej. hashes md5).
+        """
+        if ':' in key:
+            return key.split(':', 1)[0]
+        return key if key in getattr(settings, 'CACHE_L1_NAMESPACES', {}) else 'default'
+
+    @staticmethod
+    def get_limits(namespace):
+        """(maxsize, ttl) del namespace"""
+        limites = getattr(settings, 'CACHE_L1_NAMESPACES', {}).get(namespace, {})
+        return (
+            limites.get('maxsize', getattr(settings, 'CACHE_L1_MAXSIZE', 512)),
+            limites.get('ttl', getattr(settings, 'CACHE_L1_TTL', 10)),
+        )
+
+    @classmethod
+    def _check_pid(cls):
+        """Tras un fork (gunicorn) el L1 y el suscriptor no se heredan"""
+        pid = os.getpid()
+        if cls._pid != pid:
+            with cls._lock:
+                if cls._pid != pid:
+                    cls._caches = {}
+                    cls._stats = defaultdict(lambda: [0, 0])
+                    cls._listener = None
+                    cls._origin = uuid.uuid4().hex
+                    cls._pid = pid
+
+    @classmethod
+    def _cache_for(cls, alias, namespace):
+        cache = cls._caches.get((alias, namespace))
+        if cache is None:
+            maxsize, _ = cls.get_limits(namespace)
+            cache = TLRUCache(maxsize=maxsize, ttu=lambda _key, value, now: now + value[0])
+            cls._caches[(alias, namespace)] = cache
+        return cache
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def get(cls, alias, key):
+        """(encontrado, valor)"""
+        cls._check_pid()
+        cls.ensure_listener()
+        namespace = cls.namespace(key)
+        with cls._lock:
+            entry = cls._cache_for(alias, namespace).get(key)
+            cls._stats[(alias, namespace)][0 if entry is not None else 1] += 1
+        if entry is None:
+            return False, None
+        _, pickled, payload = entry
+        return True, pickle.loads(payload) if pickled else payload
+
+    @classmethod
+    def set(cls, alias, key, value, timeout=None):
+        """
+        Guardar en L1. Los valores mutables se guardan serializados para que
+        ningún llamador modifique la copia compartida.
+        """
+        if timeout is not None and timeout <= 0:
+            return
+        cls._check_pid()
+        namespace = cls.namespace(key)
+        maxsize, ttl = cls.get_limits(namespace)
+        if maxsize <= 0 or ttl <= 0:
+            return
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+
+        if isinstance(value, _INMUTABLES):
+            entry = (ttl, False, value)
+        else:
+            entry = (ttl, True, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with cls._lock:
+            cls._cache_for(alias, namespace)[key] = entry
+
+    @classmethod
+    def invalidate(cls, alias, keys):
+        with cls._lock:
+            for key in keys:
+                cache = cls._caches.get((alias, cls.namespace(key)))
+                if cache is not None:
+                    cache.pop(key, None)
+
+    @classmethod
+    def clear(cls, alias=None):
+        with cls._lock:
+            for (cache_alias, _), cache in cls._caches.items():
+                if alias is None or cache_alias == alias:
+                    cache.clear()
+
+    @classmethod
+    def stats(cls):
+        """{alias: {namespace: {size, maxsize, hits, misses, hit_rate}}}"""
+        resultado = defaultdict(dict)
+        with cls._lock:
+            for (alias, namespace), cache in cls._caches.items():
+                hits, misses = cls._stats[(alias, namespace)]
+                total = hits + misses
+                resultado[alias][namespace] = {
+                    'size': len(cache),
+                    'maxsize': cache.maxsize,
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / total, 4) if total else None,
+                }
+        return dict(resultado)
+
+    # ------------------------------------------------------------------
+    # Invalidación entre workers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _redis():
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception:
+            return None
+
+    @classmethod
+    def broadcast(cls, alias, keys=None, clear=False):
+        """
+        Invalidar en el proceso actual y publicar para los demás workers.
+
+        Args:
+            alias: alias de cache
+            keys: claves a descartar
+            clear: descartar todo el L1 del alias
+        """
+        if not cls.enabled(alias):
+            return
+        cls._check_pid()
+        if clear:
+            cls.clear(alias)
+        else:
+            cls.invalidate(alias, keys or [])
+
+        client = cls._redis()
+        if client is None:
+            return
+        mensaje = {'origin': cls._origin, 'alias': alias, 'clear': clear, 'keys': list(keys or [])}
+        try:
+            client.publish(cls.CHANNEL, json.dumps(mensaje))
+        except Exception as e:
+            logger.error(f"Error publicando invalidación de cache: {str(e)}")
+
+    @classmethod
+    def _aplicar(cls, raw):
+        try:
+            mensaje = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if mensaje.get('origin') == cls._origin:
+            return
+        if mensaje.get('clear'):
+            cls.clear(mensaje.get('alias'))
+        else:
+            cls.invalidate(mensaje.get('alias'), mensaje.get('keys') or [])
+
+    @classmethod
+    def ensure_listener(cls):
+        """Arrancar (una vez por proceso) el hilo suscriptor de invalidaciones"""
+        if cls._listener is not None or not cls.get_aliases():
+            return
+        with cls._lock:
+            if cls._listener is not None:
+                return
+            if cls._redis() is None:
+                # Sin Redis no hay otros workers que avisar
+                cls._listener = False
+                return
+            cls._listener = threading.Thread(
+                target=cls._escuchar, name='cache-l1-invalidation', daemon=True
+            )
+            cls._listener.start()
+
+    @classmethod
+    def _escuchar(cls):
+        espera = 1
+        while True:
+            try:
+                pubsub = cls._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(cls.CHANNEL)
+                # Pudimos perder mensajes mientras no estábamos suscritos
+                cls.clear()
+                espera = 1
+                for mensaje in pubsub.listen():
+                    cls._aplicar(mensaje.get('data'))
+            except Exception as e:
+                logger.error(f"Suscriptor de invalidación de cache caído: {str(e)}")
+                cls.clear()
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
@@ -0,0 +1,89 @@
+"""
+Handlers y formatters de logging para Lateral 360°
+
+- `BoundedQueueHandler`: escribe los logs desde un hilo aparte. El hilo de
+  la petición solo encola el registro; si la cola está llena, el registro se
+  descarta (y se cuenta) en lugar de bloquear la petición.
+- `JSONFormatter`: una línea JSON por registro (modo estructurado).
+
+Este módulo solo usa la librería estándar: se carga desde LOGGING antes de
+que Django termine de inicializarse.
+"""
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+
+
+class JSONFormatter(logging.Formatter):
+    """Formatter de una línea JSON; incluye el dict `extra={'api': {...}}` si existe"""
+
+    def format(self, record):
+        data = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        api = getattr(record, 'api', None)
+        if api:
+            data.update(api)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler con cola acotada y escritura en un hilo propio.
+
+    Args:
+        maxsize: registros máximos en cola antes de descartar
+        stream: destino final (por defecto sys.stderr)
+    """
+
+    def __init__(self, maxsize=10000, stream=None):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.dropped = 0
+        self._lock_dropped = threading.Lock()
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self._detener)
+
+    def _detener(self):
+        """Vaciar la cola y detener el hilo (idempotente)"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def setFormatter(self, fmt):
+        # El formateo ocurre en el hilo del listener
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        Preparar el registro sin formatearlo: solo se resuelven los args
+        (pueden mutar después) y el traceback.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock_dropped:
+                self.dropped += 1
+
+    def close(self):
+        self._detener()
+        super().close()
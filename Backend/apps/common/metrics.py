@@ -0,0 +1,211 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Cada worker acumula contadores en memoria y los vuelca a un hash de Redis
+(compartido por todos los workers) como máximo cada METRICS_FLUSH_INTERVAL
+segundos. Con un cache que no es django_redis los valores quedan en el
+proceso, suficiente para desarrollo.
+
+Series registradas:
+- `http_request_duration_seconds` (histograma por ruta, método y status)
+- `db_queries_total` / `db_query_duration_seconds_total` (por ruta)
+- `cache_requests_total` (aciertos y fallos de CacheService)
+- `outbound_request_duration_seconds` (MapGIS, Gemini)
+"""
+from collections import defaultdict
+from django.conf import settings
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Buckets (segundos) de los histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+OUTBOUND_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    'http_request_duration_seconds': ('histogram', 'Latencia de peticiones HTTP por ruta'),
+    'db_queries_total': ('counter', 'Consultas SQL ejecutadas por ruta'),
+    'db_query_duration_seconds_total': ('counter', 'Tiempo total en consultas SQL por ruta'),
+    'cache_requests_total': ('counter', 'Lecturas de CacheService por nivel (l1/l2) y resultado'),
+    'outbound_request_duration_seconds': ('histogram', 'Latencia de llamadas a servicios externos'),
+}
+
+
+def _orden(item):
+    """Ordenar series de un histograma por etiquetas y luego por `le` numérico"""
+    series = item[0]
+    base, sep, le = series.partition('le="')
+    if not sep:
+        return (series, 0.0)
+    le = le.split('"', 1)[0]
+    return (base, float('inf') if le == '+Inf' else float(le))
+
+
+def _labels(labels):
+    """{'route': 'x', 'method': 'GET'} -> route="x",method="GET" """
+    return ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in labels.items()
+    )
+
+
+class Metrics:
+    """Registro de métricas agregado entre workers"""
+
+    REDIS_KEY = 'lateral360:metrics'
+
+    _lock = threading.Lock()
+    _pending = defaultdict(float)
+    _local = defaultdict(float)
+    _last_flush = time.monotonic()
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, 'METRICS_ENABLED', True)
+
+    @staticmethod
+    def get_flush_interval():
+        return getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+
+    @staticmethod
+    def _redis():
+        """Conexión Redis compartida, o None si el cache no es django_redis"""
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception:
+            return None
+
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def inc(cls, name, labels, value=1):
+        """Sumar a un contador"""
+        if not cls.is_enabled():
+            return
+        series = f"{name}{{{_labels(labels)}}}"
+        with cls._lock:
+            cls._pending[series] += value
+
+    @classmethod
+    def observe(cls, name, labels, value, buckets=LATENCY_BUCKETS):
+        """Registrar una observación en un histograma (buckets acumulativos)"""
+        if not cls.is_enabled():
+            return
+        base = _labels(labels)
+        prefix = f"{base}," if base else ''
+        with cls._lock:
+            for le in buckets:
+                # += 0 también crea el bucket: todas las series exponen los mismos `le`
+                cls._pending[f'{name}_bucket{{{prefix}le="{le}"}}'] += 1 if value <= le else 0
+            cls._pending[f'{name}_bucket{{{prefix}le="+Inf"}}'] += 1
+            cls._pending[f'{name}_sum{{{base}}}'] += value
+            cls._pending[f'{name}_count{{{base}}}'] += 1
+
+    @classmethod
+    def observe_request(cls, route, method, status_code, duration, queries, query_time):
+        labels = {'route': route, 'method': method, 'status': f"{status_code // 100}xx"}
+        cls.observe('http_request_duration_seconds', labels, duration)
+        cls.inc('db_queries_total', {'route': route}, queries)
+        cls.inc('db_query_duration_seconds_total', {'route': route}, query_time)
+        cls.maybe_flush()
+
+    @classmethod
+    def observe_cache(cls, cache_name, hit, tier='l2'):
+        cls.inc('cache_requests_total', {'cache': cache_name, 'tier': tier, 'result': 'hit' if hit else 'miss'})
+
+    @classmethod
+    def observe_outbound(cls, service, operation, duration, error=False):
+        cls.observe(
+            'outbound_request_duration_seconds',
+            {'service': service, 'operation': operation, 'outcome': 'error' if error else 'ok'},
+            duration,
+            buckets=OUTBOUND_BUCKETS
+        )
+
+    # ------------------------------------------------------------------
+    # Volcado a Redis
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def maybe_flush(cls):
+        if time.monotonic() - cls._last_flush >= cls.get_flush_interval():
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        """Volcar los valores pendientes del proceso (una ida a Redis)"""
+        with cls._lock:
+            pending, cls._pending = cls._pending, defaultdict(float)
+            cls._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        client = cls._redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for series, value in pending.items():
+                    pipe.hincrbyfloat(cls.REDIS_KEY, series, value)
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.error(f"Error volcando métricas a Redis: {str(e)}")
+                return
+
+        with cls._lock:
+            for series, value in pending.items():
+                cls._local[series] += value
+
+    @classmethod
+    def snapshot(cls):
+        """Valores agregados {serie: valor}"""
+        cls.flush()
+        client = cls._redis()
+        if client is not None:
+            try:
+                return {
+                    series.decode(): float(value)
+                    for series, value in client.hgetall(cls.REDIS_KEY).items()
+                }
+            except Exception as e:
+                logger.error(f"Error leyendo métricas de Redis: {str(e)}")
+                return {}
+        with cls._lock:
+            return dict(cls._local)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._pending.clear()
+            cls._local.clear()
+        client = cls._redis()
+        if client is not None:
+            client.delete(cls.REDIS_KEY)
+
+    @classmethod
+    def render(cls):
+        """Exposición en formato de texto de Prometheus"""
+        por_metrica = defaultdict(list)
+        for series, value in cls.snapshot().items():
+            name = series.split('{', 1)[0]
+            for sufijo in ('_bucket', '_sum', '_count'):
+                if name.endswith(sufijo) and name[:-len(sufijo)] in HELP:
+                    name = name[:-len(sufijo)]
+                    break
+            por_metrica[name].append((series, value))
+
+        lineas = []
+        for name in sorted(por_metrica):
+            tipo, ayuda = HELP.get(name, ('untyped', ''))
+            lineas.append(f"# HELP {name} {ayuda}")
+            lineas.append(f"# TYPE {name} {tipo}")
+            for series, value in sorted(por_metrica[name], key=_orden):
+                valor = int(value) if value.is_integer() else round(value, 6)
+                lineas.append(f"{series} {valor}")
+        return '\n'.join(lineas) + '\n'
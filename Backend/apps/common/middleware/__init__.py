@@ -3,5 +3,7 @@ Middleware package for common utilities
 """
 
 from .api_logging import APILoggingMiddleware
+from .metrics import MetricsMiddleware
+from .query_inspector import QueryInspectorMiddleware
 
-__all__ = ['APILoggingMiddleware']
+__all__ = ['APILoggingMiddleware', 'MetricsMiddleware', 'QueryInspectorMiddleware']
@@ -1,59 +1,103 @@
 """
 Middleware para logging de requests API
 """
+from functools import lru_cache
 import json
 import logging
+import random
+import re
 import time
-import traceback
 from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 
 logger = logging.getLogger('api.requests')
 
+
+def _compilar_prefijos(prefijos):
+    """Regex única para un conjunto de prefijos de ruta (None si está vacío)"""
+    if not prefijos:
+        return None
+    return re.compile('|'.join(re.escape(prefijo) for prefijo in prefijos))
+
+
 class APILoggingMiddleware(MiddlewareMixin):
     """
-    Middleware que registra todas las peticiones API con información detallada.
+    Middleware que registra las peticiones API con bajo costo.
+
+    - Rutas y tasas de muestreo precompiladas; la regla de cada ruta se
+      memoriza (lru_cache), así que la decisión cuesta una búsqueda en dict.
+    - Las respuestas exitosas se registran con la tasa de muestreo de la ruta
+      (API_LOG_SAMPLE_RATES); errores y peticiones lentas siempre se registran.
+    - Los cuerpos de request/response solo se leen cuando hay error.
+    - La escritura ocurre fuera del hilo de la petición (BoundedQueueHandler).
     """
-    
+
+    # APIs que queremos monitorear
+    MONITORED_PATHS = (
+        '/api/auth/',
+        '/api/users/',
+        '/api/lotes/',
+        '/api/documentos/',
+    )
+
+    # Paths que solo loggeamos en caso de error
+    ERROR_ONLY_PATHS = (
+        '/api/common/health/',
+    )
+
+    # Endpoints sensibles cuyo contenido no debe ser registrado
+    SENSITIVE_PATHS = (
+        '/api/auth/login/',
+        '/api/auth/register/',
+        '/api/auth/change-password/',
+    )
+
     def __init__(self, get_response=None):
-        self.get_response = get_response
+        # ✅ MiddlewareMixin detecta si get_response es async (necesario bajo ASGI)
+        super().__init__(get_response)
         self.log_request_body = getattr(settings, 'API_LOG_REQUEST_BODY', True)
-        self.log_response_body = getattr(settings, 'API_LOG_RESPONSE_BODY', True) 
+        self.log_response_body = getattr(settings, 'API_LOG_RESPONSE_BODY', True)
         self.max_body_length = getattr(settings, 'API_LOG_MAX_BODY_LENGTH', 5000)
-        
-        # APIs que queremos monitorear
-        self.monitored_paths = [
-            '/api/auth/',
-            '/api/users/',
-            '/api/lotes/',
-            '/api/documentos/',
-        ]
-        
-        # Paths que solo loggeamos en caso de error
-        self.error_only_paths = [
-            '/api/common/health/',
-        ]
-        
-        # Endpoints sensibles cuyo contenido no debe ser registrado
-        self.sensitive_paths = [
-            '/api/auth/login/',
-            '/api/auth/register/',
-            '/api/auth/change-password/'
-        ]
-        
-    def should_log_path(self, path):
-        """Determina si la ruta debe ser registrada."""
-        return any(path.startswith(monitored) for monitored in self.monitored_paths)
-    
-    def should_log_error_only(self, path):
-        """Determina si la ruta solo debe loggearse en caso de error."""
-        return any(path.startswith(error_only) for error_only in self.error_only_paths)
-        
-    def is_sensitive_path(self, path):
-        """Comprueba si la ruta contiene información sensible."""
-        return any(path.startswith(sensitive) for sensitive in self.sensitive_paths)
-        
+        self.slow_ms = getattr(settings, 'API_LOG_SLOW_MS', 1000)
+
+        self.monitored_re = _compilar_prefijos(self.MONITORED_PATHS)
+        self.error_only_re = _compilar_prefijos(self.ERROR_ONLY_PATHS)
+        self.sensitive_re = _compilar_prefijos(self.SENSITIVE_PATHS)
+
+        # Tasas por prefijo, el más largo primero: {'/api/lotes/': 0.05, ...}
+        sample_rates = getattr(settings, 'API_LOG_SAMPLE_RATES', {})
+        self.default_rate = sample_rates.get('default', 1.0)
+        self.sample_rules = sorted(
+            (
+                (re.compile(re.escape(prefijo)), rate)
+                for prefijo, rate in sample_rates.items()
+                if prefijo != 'default'
+            ),
+            key=lambda regla: len(regla[0].pattern),
+            reverse=True
+        )
+
+        self.get_rule = lru_cache(maxsize=2048)(self._build_rule)
+
+    def _build_rule(self, path):
+        """
+        Regla de logging de una ruta: None si no se registra, o
+        (solo_errores, sensible, tasa_muestreo)
+        """
+        error_only = bool(self.error_only_re and self.error_only_re.match(path))
+        if not error_only and not (self.monitored_re and self.monitored_re.match(path)):
+            return None
+
+        rate = self.default_rate
+        for patron, regla_rate in self.sample_rules:
+            if patron.match(path):
+                rate = regla_rate
+                break
+
+        sensitive = bool(self.sensitive_re and self.sensitive_re.match(path))
+        return error_only, sensitive, rate
+
     def get_client_ip(self, request):
         """Obtiene la IP real del cliente incluso detrás de proxies."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -64,110 +108,111 @@ class APILoggingMiddleware(MiddlewareMixin):
             # De lo contrario, usar la IP directa
             ip = request.META.get('REMOTE_ADDR', 'unknown')
         return ip
-    
+
     def process_request(self, request):
         """Registrar inicio de la petición"""
-        request.start_time = time.time()
-        
-        # Solo registrar solicitudes a la API
-        if not self.should_log_path(request.path):
-            return None
-            
         # Guardar el tiempo de inicio para calcular el tiempo de respuesta
-        request.api_req_time = time.time()
-        
-        # Si estamos registrando el cuerpo de la solicitud y no es sensible
-        if self.log_request_body and not self.is_sensitive_path(request.path):
-            try:
-                # Para solicitudes POST con formato form-data o multipart
-                if request.POST:
-                    request.api_req_body = dict(request.POST)
-                # Para solicitudes con JSON en el cuerpo
-                elif request.body:
-                    try:
-                        request.api_req_body = json.loads(request.body)
-                    except json.JSONDecodeError:
-                        request.api_req_body = {'raw_body': str(request.body)[:self.max_body_length]}
-                else:
-                    request.api_req_body = None
-            except Exception:
-                request.api_req_body = {'error': 'No se pudo analizar el cuerpo de la solicitud'}
-        else:
-            request.api_req_body = None if self.is_sensitive_path(request.path) else {'message': 'Cuerpo de solicitud no registrado por configuración'}
-        
+        request.api_req_time = time.perf_counter()
         return None
-    
+
+    def _truncate(self, value):
+        return value[:self.max_body_length] if isinstance(value, str) else value
+
+    def _request_body(self, request):
+        """Cuerpo de la solicitud (solo se llama en errores)"""
+        try:
+            if request.POST:
+                return dict(request.POST)
+            body = request.body
+            if not body:
+                return None
+            try:
+                return json.loads(body)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                return {'raw_body': self._truncate(str(body))}
+        except Exception:
+            # p. ej. RawPostDataException tras leer un multipart
+            return {'error': 'No se pudo analizar el cuerpo de la solicitud'}
+
+    def _response_body(self, response):
+        """Cuerpo de la respuesta (solo se llama en errores)"""
+        try:
+            if hasattr(response, 'data'):
+                return response.data
+            if getattr(response, 'streaming', False):
+                return None
+            return {'raw_content': self._truncate(response.content.decode('utf-8', errors='replace'))}
+        except Exception:
+            return {'error': 'No se pudo analizar la respuesta'}
+
     def process_response(self, request, response):
         """Registrar respuesta y tiempo de ejecución"""
-        # Solo registrar solicitudes a la API
-        if not self.should_log_path(request.path) and not self.should_log_error_only(request.path):
+        rule = self.get_rule(request.path)
+        if rule is None:
             return response
-        
-        # Para paths de solo errores, solo loggear si hay problemas
-        if self.should_log_error_only(request.path) and 200 <= response.status_code < 400:
-            return response
-            
+        error_only, sensitive, rate = rule
+
+        status_code = response.status_code
+        success = 200 <= status_code < 300
+        is_error = status_code >= 400
+
         # Calcular el tiempo de respuesta
-        api_req_time = getattr(request, 'api_req_time', time.time())
-        api_res_time = time.time() - api_req_time
-        
+        api_req_time = getattr(request, 'api_req_time', None)
+        response_time = round((time.perf_counter() - api_req_time) * 1000, 2) if api_req_time else None
+        is_slow = response_time is not None and response_time >= self.slow_ms
+
+        if not is_error:
+            if error_only:
+                return response
+            # ✅ Muestreo: las respuestas exitosas rápidas se registran con probabilidad `rate`
+            if not is_slow and (rate <= 0 or (rate < 1 and random.random() >= rate)):
+                return response
+
         # Determinar el usuario
-        user = request.user if hasattr(request, 'user') else None
-        user_id = user.id if user and user.is_authenticated else None
-        username = user.username if user and user.is_authenticated else "anonymous"
-        
-        # Intentar obtener el cuerpo de la respuesta si está configurado
-        response_body = None
-        if self.log_response_body and not self.is_sensitive_path(request.path):
-            try:
-                if hasattr(response, 'data'):
-                    response_body = response.data
-                elif hasattr(response, 'content'):
-                    try:
-                        response_body = json.loads(response.content.decode('utf-8'))
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        response_body = {'raw_content': str(response.content)[:self.max_body_length]}
-            except Exception:
-                response_body = {'error': 'No se pudo analizar la respuesta'}
-        
-        # Determinar si la respuesta fue exitosa (códigos 2xx)
-        success = 200 <= response.status_code < 300
-        
-        # Registrar la información
+        user = getattr(request, 'user', None)
+        authenticated = bool(user and user.is_authenticated)
+        username = user.username if authenticated else "anonymous"
+
         log_data = {
             'timestamp': timezone.now().isoformat(),
             'path': request.path,
             'method': request.method,
-            'status_code': response.status_code,
+            'status_code': status_code,
             'success': success,
-            'response_time': round(api_res_time * 1000, 2),  # en milisegundos
-            'user_id': user_id,
+            'response_time': response_time,  # en milisegundos
+            'user_id': user.id if authenticated else None,
             'username': username,
             'ip': self.get_client_ip(request),
-            'request_body': getattr(request, 'api_req_body', None),
-            'response_body': response_body
+            'sample_rate': 1.0 if (is_error or is_slow) else rate,
         }
-        
+
+        # ✅ Cuerpos solo en errores (lectura perezosa)
+        if is_error and not sensitive:
+            if self.log_request_body:
+                log_data['request_body'] = self._request_body(request)
+            if self.log_response_body:
+                log_data['response_body'] = self._response_body(response)
+
         # Determinar el nivel de log según el código de estado
-        if success:
-            logger.info(f"API REQUEST: {request.method} {request.path} - {response.status_code} - {username} - {round(api_res_time * 1000, 2)}ms", 
-                        extra=log_data)
-        elif 400 <= response.status_code < 500:
-            logger.warning(f"API CLIENT ERROR: {request.method} {request.path} - {response.status_code} - {username}", 
-                          extra=log_data)
+        if status_code >= 500:
+            logger.error(f"API SERVER ERROR: {request.method} {request.path} - {status_code} - {username}",
+                         extra={'api': log_data})
+        elif is_error:
+            logger.warning(f"API CLIENT ERROR: {request.method} {request.path} - {status_code} - {username}",
+                           extra={'api': log_data})
         else:
-            logger.error(f"API SERVER ERROR: {request.method} {request.path} - {response.status_code} - {username}", 
-                         extra=log_data)
-        
+            logger.info(f"API REQUEST: {request.method} {request.path} - {status_code} - {username} - {response_time}ms",
+                        extra={'api': log_data})
+
         return response
-    
+
     def process_exception(self, request, exception):
         """Registrar excepciones"""
         logger.error(
             f"[API Exception] {request.method} {request.path} | "
             f"Exception: {exception.__class__.__name__}: {str(exception)} | "
             f"IP: {self.get_client_ip(request)} | "
-            f"User: {getattr(request.user, 'email', 'anonymous')}",
+            f"User: {getattr(getattr(request, 'user', None), 'email', 'anonymous')}",
             exc_info=True
         )
         return None
@@ -0,0 +1,71 @@
+"""
+Middleware de instrumentación: latencia por ruta y consultas SQL
+"""
+from contextlib import ExitStack
+from django.db import connections
+import time
+
+from apps.common.metrics import Metrics
+
+
+class _QueryTimer:
+    """execute_wrapper que cuenta las consultas y su duración"""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Registra por ruta resuelta (nombre de la URL, no el path crudo) la
+    latencia, el número de consultas SQL y el tiempo en base de datos.
+
+    Las rutas sin resolver (404) se agrupan como `unmatched` para no
+    multiplicar series con paths arbitrarios.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not Metrics.is_enabled():
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        Metrics.observe_request(
+            route=self.get_route(request),
+            method=request.method,
+            status_code=response.status_code,
+            duration=duration,
+            queries=timer.count,
+            query_time=timer.seconds
+        )
+        return response
+
+    @staticmethod
+    def get_route(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.route or 'unmatched'
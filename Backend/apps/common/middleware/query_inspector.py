@@ -0,0 +1,44 @@
+"""
+Middleware de desarrollo: detecta consultas SQL repetidas (N+1) por petición
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+import logging
+
+from apps.common.query_budget import recording_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryInspectorMiddleware:
+    """
+    Registra las consultas de cada petición y avisa cuando una misma forma
+    de SQL se repite QUERY_INSPECTOR_THRESHOLD veces o más.
+
+    Solo se activa con QUERY_INSPECTOR_ENABLED (por defecto, en DEBUG).
+    Agrega los headers `X-Query-Count` y `X-Query-Repeated` a la respuesta.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_INSPECTOR_THRESHOLD', 5)
+
+    def __call__(self, request):
+        with recording_queries() as recorder:
+            response = self.get_response(request)
+
+        repetidas = recorder.repetidas(self.threshold)
+        response['X-Query-Count'] = str(recorder.count)
+        if repetidas:
+            response['X-Query-Repeated'] = str(repetidas[0][1])
+            logger.warning(
+                f"🔁 Posible N+1 en {request.method} {request.path}: "
+                f"{recorder.count} consultas ({recorder.seconds * 1000:.1f}ms)\n"
+                f"{recorder.resumen()}"
+            )
+        return response
@@ -0,0 +1,145 @@
+"""
+Presupuesto de consultas SQL y detección de N+1.
+
+- `query_budget`: context manager / decorador que falla si un bloque supera
+  un número máximo de consultas (o repite la misma consulta demasiadas veces).
+- `QueryRecorder`: execute_wrapper que guarda las consultas de un bloque y
+  las agrupa por forma (SQL con los literales normalizados).
+
+Lo usan el middleware `QueryInspectorMiddleware` (desarrollo) y
+`scripts/benchmark_query_budgets.py`.
+"""
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+from django.db import connections
+import re
+import time
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS_IN = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_ESPACIOS = re.compile(r"\s+")
+_COLUMNAS = re.compile(r"^SELECT .*? FROM ", re.IGNORECASE)
+
+
+def normalizar_sql(sql):
+    """
+    Forma de una consulta: literales y listas IN reemplazados por `?`.
+
+    `SELECT ... WHERE id = 3` y `... WHERE id = 7` tienen la misma forma; si
+    aparece muchas veces en una petición es casi siempre un N+1.
+    """
+    sql = _LITERALES.sub('?', sql.replace('%s', '?'))
+    sql = _LISTAS_IN.sub('IN (?)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un bloque superó su presupuesto de consultas"""
+
+
+class QueryRecorder:
+    """execute_wrapper que registra SQL y duración de cada consulta"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def seconds(self):
+        return sum(duracion for _, duracion in self.queries)
+
+    def repetidas(self, minimo=2):
+        """[(forma, repeticiones)] de las formas que aparecen al menos `minimo` veces"""
+        formas = Counter(normalizar_sql(sql) for sql, _ in self.queries)
+        return [(forma, n) for forma, n in formas.most_common() if n >= minimo]
+
+    def resumen(self, limite=5):
+        """Texto con las formas más repetidas (para mensajes de error y logs)"""
+        return '\n'.join(
+            f"  {n}x {_COLUMNAS.sub('SELECT … FROM ', forma)[:200]}"
+            for forma, n in self.repetidas()[:limite]
+        )
+
+
+class recording_queries(ContextDecorator):
+    """Registrar las consultas de todas las conexiones dentro del bloque"""
+
+    def __init__(self, using=None):
+        self.using = using
+        self.recorder = QueryRecorder()
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        aliases = [self.using] if self.using else list(connections)
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.recorder))
+        return self.recorder
+
+    def __exit__(self, *exc):
+        self._stack.close()
+        return False
+
+
+class query_budget(ContextDecorator):
+    """
+    Fallar si el bloque ejecuta más de `max_queries` consultas.
+
+    Uso:
+        with query_budget(5, label='lotes-list'):
+            client.get('/api/lotes/')
+
+        @query_budget(3)
+        def test_detalle(): ...
+
+    Args:
+        max_queries: consultas permitidas (None = sin límite de total)
+        max_repeticiones: veces que puede repetirse una misma forma de SQL
+        label: nombre del bloque en el mensaje de error
+        using: alias de base de datos (por defecto todas)
+
+    Raises:
+        QueryBudgetExceeded
+    """
+
+    def __init__(self, max_queries=None, max_repeticiones=None, label=None, using=None):
+        self.max_queries = max_queries
+        self.max_repeticiones = max_repeticiones
+        self.label = label
+        self.using = using
+        self.recorder = None
+
+    def __enter__(self):
+        self._recording = recording_queries(self.using)
+        self.recorder = self._recording.__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc, tb):
+        self._recording.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+
+        nombre = self.label or 'bloque'
+        if self.max_queries is not None and self.recorder.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"{nombre}: {self.recorder.count} consultas (presupuesto {self.max_queries})\n"
+                f"{self.recorder.resumen()}"
+            )
+        if self.max_repeticiones is not None:
+            repetidas = self.recorder.repetidas(self.max_repeticiones + 1)
+            if repetidas:
+                raise QueryBudgetExceeded(
+                    f"{nombre}: consulta repetida {repetidas[0][1]} veces "
+                    f"(máximo {self.max_repeticiones}), posible N+1\n"
+                    f"{self.recorder.resumen()}"
+                )
+        return False
@@ -11,6 +11,8 @@ from rest_framework import status
 from datetime import datetime
 import logging
 
+from .local_cache import LocalCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -125,7 +127,8 @@ def redis_health_check(request):
             return Response({
                 'status': 'ok',
                 'cache': 'connected',
-                'response_time_ms': round(response_time, 2)
+                'response_time_ms': round(response_time, 2),
+                'l1': LocalCache.stats()
             })
         else:
             raise Exception("Cache value mismatch")
@@ -137,3 +140,29 @@ def redis_health_check(request):
             'cache': 'disconnected',
             'error': str(e)
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def metrics(request):
+    """
+    Métricas en formato de texto de Prometheus.
+
+    Requiere `Authorization: Bearer <METRICS_TOKEN>`; sin METRICS_TOKEN
+    configurado solo responde en DEBUG.
+    """
+    from django.conf import settings
+    from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed
+    from django.utils.crypto import constant_time_compare
+    from .metrics import Metrics
+
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        auth = request.META.get('HTTP_AUTHORIZATION', '')
+        if not constant_time_compare(auth, f"Bearer {token}"):
+            return HttpResponseForbidden('Token de métricas inválido')
+    elif not settings.DEBUG:
+        return HttpResponseForbidden('METRICS_TOKEN no configurado')
+
+    return HttpResponse(Metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
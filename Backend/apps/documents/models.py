@@ -204,8 +204,8 @@ class Document(models.Model):
         self.save()
         logger.info(f"Documento {self.id} archivado (soft delete)")
     
-    def validate_document(self, validated_by=None, comments=None):
-        """Validar el documento"""
+    def apply_validation(self, validated_by=None, comments=None):
+        """Marcar como validado en memoria (sin guardar, usado por bulk_update)"""
         if not self.metadata:
             self.metadata = {}
         
@@ -216,12 +216,9 @@ class Document(models.Model):
         
         self.validated_at = timezone.now()
         self.validated_by = validated_by
-        
-        self.save()
-        logger.info(f"Documento {self.id} validado")
     
-    def reject_document(self, reason, rejected_by=None):
-        """Rechazar el documento"""
+    def apply_rejection(self, reason, rejected_by=None):
+        """Marcar como rechazado en memoria (sin guardar, usado por bulk_update)"""
         if not self.metadata:
             self.metadata = {}
         
@@ -230,7 +227,16 @@ class Document(models.Model):
         self.metadata['rejection_reason'] = reason
         if rejected_by:
             self.metadata['rejected_by'] = str(rejected_by.id)
-        
+    
+    def validate_document(self, validated_by=None, comments=None):
+        """Validar el documento"""
+        self.apply_validation(validated_by=validated_by, comments=comments)
+        self.save()
+        logger.info(f"Documento {self.id} validado")
+    
+    def reject_document(self, reason, rejected_by=None):
+        """Rechazar el documento"""
+        self.apply_rejection(reason, rejected_by=rejected_by)
         self.save()
         logger.info(f"Documento {self.id} rechazado: {reason}")
     
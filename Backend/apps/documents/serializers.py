@@ -338,3 +338,17 @@ class DocumentValidateActionSerializer(serializers.Serializer):
             })
         
         return attrs
+
+
+class DocumentBulkValidateActionSerializer(DocumentValidateActionSerializer):
+    """
+    Serializer para validar o rechazar varios documentos en una sola petición
+    """
+    MAX_DOCUMENTS = 200
+    
+    document_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=MAX_DOCUMENTS,
+        help_text="IDs de los documentos a procesar"
+    )
@@ -1,6 +1,7 @@
 """
 Servicios para la gestión de documentos.
 """
+from django.db import transaction
 from django.utils import timezone
 from .models import Document
 import logging
@@ -101,6 +102,76 @@ class DocumentValidationService:
             logger.error(f"❌ Error en validación: {str(e)}")
             return document, False, f"Error al procesar: {str(e)}"
     
+    @staticmethod
+    def bulk_validate_documents(document_ids, status, comments=None, validated_by=None):
+        """
+        Valida o rechaza varios documentos en una sola transacción.
+        
+        Bloquea las filas con select_for_update, aplica el cambio en memoria
+        y persiste todo con un único bulk_update. Los documentos que ya están
+        en el estado destino se omiten.
+        
+        Args:
+            document_ids: Lista de IDs de documentos
+            status: Nuevo estado ('validado' o 'rechazado')
+            comments: Comentarios (obligatorios para rechazar)
+            validated_by: Usuario que realiza la validación
+            
+        Returns:
+            Diccionario con 'updated' (documentos), 'skipped' y 'not_found' (IDs)
+        """
+        if status not in ['validado', 'rechazado']:
+            raise ValueError("Estado de validación no válido")
+        
+        if status == 'rechazado' and not comments:
+            raise ValueError("Se requieren comentarios para rechazar")
+        
+        requested_ids = {str(document_id) for document_id in document_ids}
+        
+        with transaction.atomic():
+            documents = list(
+                Document.objects.select_for_update(of=('self',))
+                .select_related('user', 'lote')
+                .filter(id__in=requested_ids, is_active=True)
+                .order_by('id')
+            )
+            
+            found_ids = {str(document.id) for document in documents}
+            now = timezone.now()
+            updated = []
+            skipped = []
+            
+            for document in documents:
+                if document.validation_status == status:
+                    skipped.append(str(document.id))
+                    continue
+                
+                if status == 'validado':
+                    document.apply_validation(validated_by=validated_by, comments=comments)
+                else:
+                    document.apply_rejection(comments, rejected_by=validated_by)
+                
+                # bulk_update no dispara auto_now
+                document.updated_at = now
+                updated.append(document)
+            
+            if updated:
+                Document.objects.bulk_update(
+                    updated,
+                    ['metadata', 'validated_at', 'validated_by', 'updated_at']
+                )
+        
+        logger.info(
+            f"✅ Validación masiva ({status}): {len(updated)} actualizados, "
+            f"{len(skipped)} omitidos, {len(requested_ids - found_ids)} no encontrados"
+        )
+        
+        return {
+            'updated': updated,
+            'skipped': skipped,
+            'not_found': sorted(requested_ids - found_ids),
+        }
+    
     @staticmethod
     def delete_document(document_id):
         """
@@ -223,7 +294,7 @@ class DocumentValidationService:
         
         start = (page - 1) * page_size
         end = start + page_size
-        lotes_paginated = lotes_query[start:end]
+        lotes_paginated = list(lotes_query[start:end])
         
         # Construir resultado
         result = {
@@ -233,18 +304,22 @@ class DocumentValidationService:
             'total_pages': total_pages
         }
         
+        # ✅ Documentos de todos los lotes de la página en una sola consulta
+        docs_query = Document.objects.filter(
+            lote__in=lotes_paginated,
+            is_active=True
+        ).select_related('user', 'lote')
+        
+        if status:
+            docs_query = docs_query.filter(metadata__validation_status=status)
+        
+        docs_por_lote = {}
+        # ✅ NUEVO: Ordenar por fecha de creación descendente (más reciente primero)
+        for doc in docs_query.order_by('-created_at', '-updated_at'):
+            docs_por_lote.setdefault(doc.lote_id, []).append(doc)
+        
         for lote in lotes_paginated:
-            # ✅ Obtener documentos del lote ORDENADOS por fecha (más reciente primero)
-            docs_query = Document.objects.filter(
-                lote=lote, 
-                is_active=True
-            )
-            
-            if status:
-                docs_query = docs_query.filter(metadata__validation_status=status)
-            
-            # ✅ NUEVO: Ordenar por fecha de creación descendente (más reciente primero)
-            docs = list(docs_query.order_by('-created_at', '-updated_at'))
+            docs = docs_por_lote.get(lote.id, [])
             
             # ✅ Contar estados correctamente
             total_docs = len(docs)
@@ -26,6 +26,7 @@ urlpatterns = [
     path('validation/list/', views.DocumentValidationListView.as_view(), name='validation-list'),
     # ✅ NUEVO: Endpoint para documentos agrupados por lote
     path('validation/grouped/', views.DocumentValidationGroupedView.as_view(), name='validation-grouped'),
+    path('validation/bulk-action/', views.DocumentBulkValidateActionView.as_view(), name='validation-bulk-action'),
     path('validation/<uuid:pk>/', views.DocumentValidationDetailView.as_view(), name='validation-detail'),
     path('validation/<uuid:document_id>/action/', views.DocumentValidateActionView.as_view(), name='validation-action'),
 ]
@@ -17,10 +17,12 @@ from django.http import HttpResponseRedirect, JsonResponse
 from .models import Document
 from .serializers import (
     DocumentListSerializer, DocumentSerializer, DocumentUploadSerializer, 
-    DocumentValidateActionSerializer, DocumentValidationSerializer
+    DocumentValidateActionSerializer, DocumentValidationSerializer,
+    DocumentBulkValidateActionSerializer
 )
 from .services import DocumentValidationService
 from apps.notifications.services import NotificationService  # ✅ AGREGAR
+from apps.common.cache import invalidate_document_cache
 
 logger = logging.getLogger(__name__)
 
@@ -62,7 +64,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """✅ Filtrar documentos activos y según permisos"""
-        queryset = Document.objects.filter(is_active=True)
+        # ✅ user y lote se usan en el serializer: cargarlos en el mismo JOIN
+        queryset = Document.objects.filter(is_active=True).select_related('user', 'lote')
         
         # Los administradores pueden ver todos los documentos
         if not self.request.user.is_staff:
@@ -213,7 +216,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         """
         Endpoint para obtener los documentos del usuario autenticado.
         """
-        documents = Document.objects.filter(user=request.user, is_active=True)
+        documents = Document.objects.filter(user=request.user, is_active=True).select_related('user', 'lote')
         serializer = DocumentSerializer(documents, many=True)
         return Response(serializer.data)
     
@@ -443,6 +446,8 @@ class DocumentValidateActionView(views.APIView):
         else:
             NotificationService.notify_documento_rechazado(document, comments)
         
+        invalidate_document_cache()
+        
         # ✅ Serializar con estado actualizado
         serialized = DocumentValidationSerializer(document, context={'request': request})
         
@@ -454,6 +459,66 @@ class DocumentValidateActionView(views.APIView):
             'document': serialized.data
         })
 
+class DocumentBulkValidateActionView(views.APIView):
+    """
+    Vista para validar o rechazar varios documentos en una sola petición.
+    Bloquea y actualiza todos los documentos en una transacción y envía
+    una única notificación por propietario.
+    """
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    
+    def post(self, request):
+        """
+        Procesa una acción de validación masiva (validar o rechazar).
+        """
+        serializer = DocumentBulkValidateActionSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        action = serializer.validated_data['action']
+        comments = serializer.validated_data.get('comments', '')
+        validation_status = 'validado' if action == 'validar' else 'rechazado'
+        
+        try:
+            result = DocumentValidationService.bulk_validate_documents(
+                document_ids=serializer.validated_data['document_ids'],
+                status=validation_status,
+                comments=comments,
+                validated_by=request.user
+            )
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        updated = result['updated']
+        
+        if updated:
+            NotificationService.notify_documentos_procesados(
+                updated, validation_status, reason=comments
+            )
+            invalidate_document_cache()
+        
+        logger.info(
+            f"✅ Bulk {action}: {len(updated)} documents by {request.user.email}"
+        )
+        
+        return Response({
+            'success': True,
+            'message': f'{len(updated)} documentos procesados correctamente',
+            'updated': [str(document.id) for document in updated],
+            'skipped': result['skipped'],
+            'not_found': result['not_found'],
+            'documents': DocumentValidationSerializer(
+                updated, many=True, context={'request': request}
+            ).data
+        })
+
 class DocumentValidationGroupedView(generics.ListAPIView):
     """
     ✅ NUEVO: Vista para obtener documentos agrupados por lote.
@@ -512,7 +577,7 @@ def user_documents(request):
     """
     Lista todos los documentos del usuario actual
     """
-    documents = Document.objects.filter(user=request.user, is_active=True)
+    documents = Document.objects.filter(user=request.user, is_active=True).select_related('user', 'lote')
     serializer = DocumentSerializer(documents, many=True, context={'request': request})
     return Response(serializer.data)
 
@@ -544,14 +609,18 @@ def lote_documents(request, lote_id):
             )
         
         # Verificar permisos
-        if not request.user.is_staff and hasattr(lote, 'owner') and lote.owner != request.user:
+        if not request.user.is_staff and lote.owner_id != request.user.id:
             logger.warning(f"Usuario {request.user.id} intentó acceder a documentos de lote {lote_id} sin permiso")
             raise PermissionDenied("No tienes permiso para ver estos documentos")
         
         # Obtener documentos del lote
-        documents = Document.objects.filter(lote=lote, is_active=True).order_by('-created_at')
+        documents = list(
+            Document.objects.filter(lote=lote, is_active=True)
+            .select_related('user', 'lote')
+            .order_by('-created_at')
+        )
         
-        logger.info(f"Documentos encontrados para lote {lote_id}: {documents.count()}")
+        logger.info(f"Documentos encontrados para lote {lote_id}: {len(documents)}")
         
         serializer = DocumentSerializer(documents, many=True, context={'request': request})
         return Response(serializer.data)
@@ -8,3 +8,7 @@ class InvestmentCriteriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.investment_criteria'
     verbose_name = 'Criterios de Inversión'
+    
+    def ready(self):
+        """Importar signals cuando la app esté lista"""
+        import apps.investment_criteria.signals  # noqa
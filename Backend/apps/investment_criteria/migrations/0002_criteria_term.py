@@ -0,0 +1,116 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:01
+
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copia de las reglas de CriteriaPercolator.terminos_criterio al crear la
+# migración: la migración no debe depender del código vivo de services.py
+AREA_BUCKETS = (0, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 20000, 50000)
+COMODIN = '*'
+BATCH_SIZE = 500
+
+
+def _textos(values):
+    normalizados = []
+    for value in values or []:
+        value = str(value).replace('_', ' ').strip().lower()
+        if value and value not in normalizados:
+            normalizados.append(value)
+    return normalizados
+
+
+def _enteros(values):
+    enteros = set()
+    for value in values or []:
+        try:
+            enteros.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return sorted(enteros)
+
+
+def _bucket_area(area):
+    return max(bisect_right(AREA_BUCKETS, Decimal(area)) - 1, 0)
+
+
+def _terminos_criterio(criteria):
+    terminos = set()
+    
+    for estrato in _enteros(criteria.estratos) or [COMODIN]:
+        terminos.add(('estrato', f'estrato:{estrato}'))
+    
+    for bucket in range(_bucket_area(criteria.area_min), _bucket_area(criteria.area_max) + 1):
+        terminos.add(('area', f'area:{bucket}'))
+    
+    for dimension, valores in (
+        ('zona', criteria.zones),
+        ('tratamiento', criteria.treatments),
+        ('uso', criteria.uso_suelo_preferido),
+    ):
+        for valor in _textos(valores) or [COMODIN]:
+            clave = valor[:3] if len(valor) >= 3 else COMODIN
+            terminos.add((dimension, f'{dimension}:{clave}'))
+    
+    return sorted(terminos)
+
+
+def indexar_criterios_activos(apps, schema_editor):
+    """Construir el índice invertido de los criterios activos existentes"""
+    InvestmentCriteria = apps.get_model('investment_criteria', 'InvestmentCriteria')
+    CriteriaTerm = apps.get_model('investment_criteria', 'CriteriaTerm')
+    
+    terminos = [
+        CriteriaTerm(criteria_id=criteria.pk, dimension=dimension, term=term)
+        for criteria in InvestmentCriteria.objects.filter(status='active').iterator()
+        for dimension, term in _terminos_criterio(criteria)
+    ]
+    CriteriaTerm.objects.bulk_create(terminos, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("investment_criteria", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CriteriaTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(max_length=20, verbose_name="Dimensión"),
+                ),
+                ("term", models.CharField(max_length=40, verbose_name="Término")),
+                (
+                    "criteria",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="index_terms",
+                        to="investment_criteria.investmentcriteria",
+                        verbose_name="Criterio",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Término de Criterio",
+                "verbose_name_plural": "Términos de Criterios",
+                "db_table": "investment_criteria_term",
+                "unique_together": {("term", "criteria")},
+            },
+        ),
+        migrations.RunPython(indexar_criterios_activos, migrations.RunPython.noop),
+    ]
@@ -167,30 +167,10 @@ class InvestmentCriteria(models.Model):
     def get_matching_lotes_count(self):
         """
         Cuenta cuántos lotes coinciden con este criterio.
-        Método de ejemplo, se puede optimizar.
+        ✅ Mismo plan que el listado (CriteriaMatcher), conteo cacheado
         """
-        from apps.lotes.models import Lote
-        from django.db.models import Q
-        
-        queryset = Lote.objects.filter(
-            status='active',
-            is_verified=True,
-            area__gte=self.area_min,
-            area__lte=self.area_max
-        )
-        
-        # Filtrar por zonas si hay
-        if self.zones:
-            zone_filters = Q()
-            for zone in self.zones:
-                zone_filters |= Q(barrio__icontains=zone)
-            queryset = queryset.filter(zone_filters)
-        
-        # Filtrar por estratos si hay
-        if self.estratos:
-            queryset = queryset.filter(estrato__in=self.estratos)
-        
-        return queryset.count()
+        from .services import CriteriaMatcher
+        return CriteriaMatcher.count(self)
 
 
 class CriteriaMatch(models.Model):
@@ -237,3 +217,33 @@ class CriteriaMatch(models.Model):
     
     def __str__(self):
         return f"{self.criteria.name} - {self.lote.nombre} (Score: {self.match_score})"
+
+
+class CriteriaTerm(models.Model):
+    """
+    Índice invertido de criterios activos (percolator).
+    
+    Cada fila asocia un término de una dimensión ('estrato:4', 'area:3',
+    'zona:lau', 'zona:*', ...) con un criterio. Se reconstruye en cada
+    save() del criterio; ver `CriteriaPercolator`.
+    """
+    criteria = models.ForeignKey(
+        InvestmentCriteria,
+        on_delete=models.CASCADE,
+        related_name='index_terms',
+        verbose_name='Criterio'
+    )
+    
+    dimension = models.CharField(max_length=20, verbose_name='Dimensión')
+    
+    term = models.CharField(max_length=40, verbose_name='Término')
+    
+    class Meta:
+        verbose_name = 'Término de Criterio'
+        verbose_name_plural = 'Términos de Criterios'
+        db_table = 'investment_criteria_term'
+        # (term, criteria): búsqueda por término y sin duplicados
+        unique_together = ['term', 'criteria']
+    
+    def __str__(self):
+        return f"{self.term} -> {self.criteria_id}"
@@ -26,7 +26,7 @@ class InvestmentCriteriaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'developer', 'created_at', 'updated_at']
     
     def get_matching_lotes_count(self, obj):
-        """Obtener conteo de lotes que coinciden"""
+        """Obtener conteo de lotes que coinciden (cacheado, ver CriteriaMatcher)"""
         try:
             return obj.get_matching_lotes_count()
         except Exception as e:
@@ -0,0 +1,347 @@
+"""
+Servicios para criterios de inversión
+
+`CriteriaPlan` compila un criterio en un plan de búsqueda normalizado. El mismo
+plan genera el predicado SQL (listado y conteo) y evalúa un lote en memoria
+(notificaciones), así que todas las rutas aplican exactamente las mismas reglas:
+
+- status='active' e is_verified=True
+- area entre area_min y area_max
+- valor entre budget_min y budget_max, o sin valor publicado
+  (solo si budget_max > 0)
+- estrato IN estratos
+- barrio contiene alguna zona, tratamiento_pot contiene algún tratamiento y
+  uso_suelo contiene algún uso preferido
+
+Las dimensiones numéricas usan el índice `lote_match_idx`
+(status, is_verified, estrato, area); las de texto se aplican sobre las filas
+que deja el índice.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from apps.common.cache import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+def _textos(values):
+    """Lista JSON de texto -> tupla normalizada (minúsculas, '_' como espacio, sin duplicados)"""
+    normalizados = []
+    for value in values or []:
+        value = str(value).replace('_', ' ').strip().lower()
+        if value and value not in normalizados:
+            normalizados.append(value)
+    return tuple(normalizados)
+
+
+def _enteros(values):
+    enteros = set()
+    for value in values or []:
+        try:
+            enteros.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return tuple(sorted(enteros))
+
+
+def _contiene_alguno(campo, valores):
+    """OR de `campo__icontains` para cada valor"""
+    condicion = Q()
+    for valor in valores:
+        condicion |= Q(**{f'{campo}__icontains': valor})
+    return condicion
+
+
+class CriteriaPlan:
+    """Plan normalizado de un criterio de inversión"""
+
+    __slots__ = (
+        'area_min', 'area_max', 'budget_min', 'budget_max',
+        'estratos', 'zones', 'treatments', 'usos',
+    )
+
+    def __init__(self, area_min, area_max, budget_min=None, budget_max=None,
+                 estratos=(), zones=(), treatments=(), usos=()):
+        self.area_min = Decimal(area_min)
+        self.area_max = Decimal(area_max)
+        self.budget_min = Decimal(budget_min or 0)
+        self.budget_max = Decimal(budget_max or 0)
+        self.estratos = _enteros(estratos)
+        self.zones = _textos(zones)
+        self.treatments = _textos(treatments)
+        self.usos = _textos(usos)
+
+    @classmethod
+    def from_criteria(cls, criteria):
+        return cls(
+            area_min=criteria.area_min,
+            area_max=criteria.area_max,
+            budget_min=criteria.budget_min,
+            budget_max=criteria.budget_max,
+            estratos=criteria.estratos,
+            zones=criteria.zones,
+            treatments=criteria.treatments,
+            usos=criteria.uso_suelo_preferido,
+        )
+
+    @property
+    def usa_presupuesto(self):
+        return self.budget_max > 0
+
+    def as_q(self):
+        """Predicado SQL único para `Lote.objects.filter()`"""
+        condicion = Q(
+            status='active',
+            is_verified=True,
+            area__gte=self.area_min,
+            area__lte=self.area_max,
+        )
+        if self.estratos:
+            condicion &= Q(estrato__in=self.estratos)
+        if self.usa_presupuesto:
+            condicion &= (
+                Q(valor__isnull=True) |
+                Q(valor__gte=self.budget_min, valor__lte=self.budget_max)
+            )
+        if self.zones:
+            condicion &= _contiene_alguno('barrio', self.zones)
+        if self.treatments:
+            condicion &= _contiene_alguno('tratamiento_pot', self.treatments)
+        if self.usos:
+            condicion &= _contiene_alguno('uso_suelo', self.usos)
+        return condicion
+
+    def matches(self, lote):
+        """Evaluar un lote en memoria con las mismas reglas que `as_q()`"""
+        if lote.status != 'active' or not lote.is_verified:
+            return False
+        if lote.area is None or not (self.area_min <= lote.area <= self.area_max):
+            return False
+        if self.estratos and lote.estrato not in self.estratos:
+            return False
+        if self.usa_presupuesto and lote.valor is not None:
+            if not (self.budget_min <= lote.valor <= self.budget_max):
+                return False
+        for valores, texto in (
+            (self.zones, lote.barrio),
+            (self.treatments, lote.tratamiento_pot),
+            (self.usos, lote.uso_suelo),
+        ):
+            if valores:
+                texto = (texto or '').lower()
+                if not any(valor in texto for valor in valores):
+                    return False
+        return True
+
+    def especificidad(self):
+        """
+        Puntuación 0-100 según las dimensiones que restringe el criterio:
+        área 30, zona 30, estrato 20, uso de suelo 20.
+        
+        Depende solo del criterio: `matches()` exige todas las dimensiones,
+        así que todo lote que cumple el plan recibe la misma puntuación y un
+        criterio más específico puntúa más alto.
+        """
+        return (
+            30 +
+            (30 if self.zones else 0) +
+            (20 if self.estratos else 0) +
+            (20 if self.usos else 0)
+        )
+
+
+class CriteriaMatcher:
+    """
+    Lotes que coinciden con un criterio (listado, conteo y evaluación).
+
+    El conteo se cachea por criterio y versión de su `updated_at`; la
+    generación `criteria_match` se incrementa al cambiar cualquier lote.
+    """
+
+    CACHE_NAMESPACE = 'criteria_match'
+    COUNT_TIMEOUT = 300
+
+    @staticmethod
+    def plan(criteria):
+        return CriteriaPlan.from_criteria(criteria)
+
+    @classmethod
+    def lotes(cls, criteria):
+        """QuerySet de lotes que coinciden (sin orden ni eager loading)"""
+        from apps.lotes.models import Lote
+        return Lote.objects.filter(cls.plan(criteria).as_q())
+
+    @classmethod
+    def count(cls, criteria):
+        """Conteo cacheado de lotes que coinciden"""
+        key = CacheService.versioned_key(
+            cls.CACHE_NAMESPACE, 'count', str(criteria.pk),
+            criteria.updated_at.isoformat() if criteria.updated_at else ''
+        )
+        return CacheService.get_or_set(
+            key,
+            lambda: cls.lotes(criteria).count(),
+            timeout=cls.COUNT_TIMEOUT,
+            raise_errors=True
+        )
+
+    @classmethod
+    def matches(cls, criteria, lote):
+        return cls.plan(criteria).matches(lote)
+
+    @classmethod
+    def invalidar(cls):
+        """Los conteos cacheados dejan de usarse (un lote cambió)"""
+        CacheService.bump_generation(cls.CACHE_NAMESPACE)
+
+
+class CriteriaPercolator:
+    """
+    Criterios activos que cumple un lote, sin evaluar todos los criterios.
+    
+    Índice invertido (`CriteriaTerm`) de dimensión -> criterios, mantenido en
+    cada save() del criterio. Por dimensión, un criterio sin restricción se
+    indexa con el comodín ('estrato:*') y el lote consulta su valor más el
+    comodín; los candidatos son la intersección de las cinco dimensiones
+    (un GROUP BY ... HAVING) y se verifican con `CriteriaPlan.matches`.
+    
+    - estrato: cada estrato del criterio
+    - area: buckets de AREA_BUCKETS que cruzan [area_min, area_max]
+    - zona/tratamiento/uso: primer trigrama de cada valor. Si el valor está
+      contenido en el texto del lote, su primer trigrama también, así que el
+      índice nunca descarta un criterio que `matches()` aceptaría.
+    
+    El presupuesto no se indexa: lo resuelve la verificación.
+    """
+    
+    DIMENSIONES = ('estrato', 'area', 'zona', 'tratamiento', 'uso')
+    AREA_BUCKETS = (0, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 20000, 50000)
+    COMODIN = '*'
+    BATCH_SIZE = 500
+    
+    @classmethod
+    def _bucket_area(cls, area):
+        return max(bisect_right(cls.AREA_BUCKETS, area) - 1, 0)
+    
+    @staticmethod
+    def _trigramas(texto):
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+    
+    @classmethod
+    def terminos_criterio(cls, criteria):
+        """[(dimensión, término)] de un criterio"""
+        plan = CriteriaPlan.from_criteria(criteria)
+        terminos = set()
+        
+        for estrato in plan.estratos or [cls.COMODIN]:
+            terminos.add(('estrato', f'estrato:{estrato}'))
+        
+        for bucket in range(cls._bucket_area(plan.area_min), cls._bucket_area(plan.area_max) + 1):
+            terminos.add(('area', f'area:{bucket}'))
+        
+        for dimension, valores in (('zona', plan.zones), ('tratamiento', plan.treatments), ('uso', plan.usos)):
+            for valor in valores or [cls.COMODIN]:
+                # Valores de menos de 3 caracteres no tienen trigrama: comodín
+                clave = valor[:3] if len(valor) >= 3 else cls.COMODIN
+                terminos.add((dimension, f'{dimension}:{clave}'))
+        
+        return sorted(terminos)
+    
+    @classmethod
+    def terminos_lote(cls, lote):
+        """Términos que consulta un lote (sus valores más los comodines)"""
+        terminos = {f'{dimension}:{cls.COMODIN}' for dimension in ('estrato', 'zona', 'tratamiento', 'uso')}
+        if lote.estrato is not None:
+            terminos.add(f'estrato:{lote.estrato}')
+        if lote.area is not None:
+            terminos.add(f'area:{cls._bucket_area(lote.area)}')
+        for dimension, texto in (('zona', lote.barrio), ('tratamiento', lote.tratamiento_pot), ('uso', lote.uso_suelo)):
+            terminos.update(f'{dimension}:{trigrama}' for trigrama in cls._trigramas((texto or '').lower()))
+        return terminos
+    
+    @classmethod
+    def indexar(cls, criteria):
+        """Reconstruir los términos de un criterio (solo los activos quedan indexados)"""
+        from .models import CriteriaTerm
+        
+        with transaction.atomic():
+            CriteriaTerm.objects.filter(criteria_id=criteria.pk).delete()
+            if criteria.status == 'active':
+                CriteriaTerm.objects.bulk_create([
+                    CriteriaTerm(criteria_id=criteria.pk, dimension=dimension, term=term)
+                    for dimension, term in cls.terminos_criterio(criteria)
+                ])
+    
+    @classmethod
+    def candidatos(cls, lote):
+        """Ids de criterios presentes en las cinco dimensiones del lote (1 consulta)"""
+        from .models import CriteriaTerm
+        
+        return list(
+            CriteriaTerm.objects.filter(term__in=cls.terminos_lote(lote))
+            .values('criteria_id')
+            .annotate(dimensiones=Count('dimension', distinct=True))
+            .filter(dimensiones=len(cls.DIMENSIONES))
+            .values_list('criteria_id', flat=True)
+        )
+    
+    @classmethod
+    def percolar(cls, lote):
+        """
+        Sincronizar los CriteriaMatch del lote: insertar los nuevos en un solo
+        INSERT masivo y borrar los de criterios que ya no cumple (todos si el
+        lote dejó de ser visible).
+        
+        Returns:
+            list: CriteriaMatch creados (criterios que aún no tenían match)
+        """
+        from .models import CriteriaMatch, InvestmentCriteria
+        
+        ids = cls.candidatos(lote) if lote.can_be_shown else []
+        coinciden = []
+        if ids:
+            criterios = InvestmentCriteria.objects.filter(id__in=ids, status='active').annotate(
+                registrado=Exists(CriteriaMatch.objects.filter(criteria=OuterRef('pk'), lote=lote))
+            )
+            for criteria in criterios:
+                plan = CriteriaPlan.from_criteria(criteria)
+                if plan.matches(lote):
+                    coinciden.append((criteria, plan))
+        
+        retirados, _ = CriteriaMatch.objects.filter(lote=lote).exclude(
+            criteria_id__in=[criteria.pk for criteria, _ in coinciden]
+        ).delete()
+        
+        nuevos = [
+            CriteriaMatch(criteria=criteria, lote=lote, match_score=plan.especificidad())
+            for criteria, plan in coinciden
+            if not criteria.registrado
+        ]
+        CriteriaMatch.objects.bulk_create(nuevos, batch_size=cls.BATCH_SIZE, ignore_conflicts=True)
+        logger.info(
+            f"🎯 Lote {lote.id}: {len(ids)} criterios candidatos, "
+            f"{len(nuevos)} matches nuevos, {retirados} retirados"
+        )
+        return nuevos
+    
+    @staticmethod
+    def retirar_matches(criteria):
+        """
+        Borrar los CriteriaMatch de lotes que el criterio ya no cumple (todos
+        si el criterio no está activo).
+        
+        Returns:
+            int: matches borrados
+        """
+        from .models import CriteriaMatch
+        
+        matches = CriteriaMatch.objects.filter(criteria_id=criteria.pk)
+        if criteria.status == 'active':
+            matches = matches.exclude(lote__in=CriteriaMatcher.lotes(criteria).values('id'))
+        retirados, _ = matches.delete()
+        return retirados
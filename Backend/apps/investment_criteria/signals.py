@@ -0,0 +1,72 @@
+"""
+Señales para criterios de inversión
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from apps.lotes.models import Lote
+from .models import InvestmentCriteria
+
+logger = logging.getLogger(__name__)
+
+
+def _afecta_criterios(instance, actualizado):
+    """
+    Si un save()/delete() del lote puede cambiar los criterios que cumple:
+    el lote es o era visible y se creó, se eliminó o cambió la visibilidad o
+    alguna dimensión de los criterios. Otras ediciones no los afectan.
+    """
+    era_visible = instance.era_visible if actualizado else False
+    if not instance.can_be_shown and era_visible is False:
+        # Ni antes ni ahora cuenta para ningún criterio
+        return False
+    
+    if actualizado:
+        modificados = instance.campos_modificados()
+        if modificados is not None and not modificados:
+            return False
+    return True
+
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidar_conteos_criterios(sender, instance, created=False, **kwargs):
+    """Los conteos de lotes por criterio dejan de ser válidos"""
+    from .services import CriteriaMatcher
+    
+    if _afecta_criterios(instance, actualizado=kwargs['signal'] is post_save and not created):
+        transaction.on_commit(CriteriaMatcher.invalidar)
+
+
+@receiver(post_save, sender=InvestmentCriteria)
+def indexar_criterio(sender, instance, **kwargs):
+    """
+    Mantener el índice invertido del criterio (percolator) y retirar los
+    matches de lotes que ya no cumple
+    """
+    from .services import CriteriaPercolator
+    
+    CriteriaPercolator.indexar(instance)
+    CriteriaPercolator.retirar_matches(instance)
+
+
+@receiver(post_save, sender=Lote)
+def percolar_lote(sender, instance, created, **kwargs):
+    """
+    Sincronizar los criterios que cumple el lote (al confirmar la
+    transacción) cuando pasa a visible, deja de serlo o cambia alguna
+    dimensión de los criterios siendo visible
+    """
+    if not _afecta_criterios(instance, actualizado=not created):
+        return
+    
+    def _percolar():
+        from .services import CriteriaPercolator
+        try:
+            CriteriaPercolator.percolar(instance)
+        except Exception as e:
+            logger.error(f"❌ Error registrando matches del lote {instance.id}: {e}", exc_info=True)
+    
+    transaction.on_commit(_percolar)
@@ -4,6 +4,7 @@ Vistas para criterios de inversión
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 import logging
@@ -14,10 +15,19 @@ from .serializers import (
     InvestmentCriteriaCreateSerializer,
     CriteriaMatchSerializer
 )
+from .services import CriteriaMatcher
 
 logger = logging.getLogger(__name__)
 
 
+class MatchingLotesPagination(CursorPagination):
+    """Paginación keyset de lotes coincidentes (sin OFFSET)"""
+    ordering = ('-created_at', '-id')
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
 class InvestmentCriteriaViewSet(viewsets.ModelViewSet):
     """ViewSet para gestionar criterios de inversión"""
     permission_classes = [permissions.IsAuthenticated]
@@ -40,7 +50,7 @@ class InvestmentCriteriaViewSet(viewsets.ModelViewSet):
         # ✅ CRÍTICO: Admin ve TODOS los criterios
         if user.is_staff or user.role == 'admin':
             logger.info(f"[Investment Criteria] Admin {user.email} accessing all criteria")
-            return InvestmentCriteria.objects.all()
+            return InvestmentCriteria.objects.select_related('developer')
         
         # ✅ Solo desarrolladores pueden tener criterios
         if user.role != 'developer':
@@ -49,7 +59,7 @@ class InvestmentCriteriaViewSet(viewsets.ModelViewSet):
         
         # Desarrollador ve solo los suyos
         logger.info(f"[Investment Criteria] Developer {user.email} accessing own criteria")
-        return InvestmentCriteria.objects.filter(developer=user)
+        return InvestmentCriteria.objects.filter(developer=user).select_related('developer')
     
     @action(detail=False, methods=['get'])
     def my_criteria(self, request):
@@ -79,48 +89,27 @@ class InvestmentCriteriaViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def matching_lotes(self, request, pk=None):
-        """Obtener lotes que coinciden con este criterio"""
+        """
+        Obtener lotes que coinciden con este criterio
+        ✅ Plan compilado (CriteriaMatcher) + paginación keyset, conteo cacheado
+        """
         criteria = self.get_object()
         
-        from apps.lotes.models import Lote
         from apps.lotes.serializers import LoteSerializer
-        from django.db.models import Q
-        
-        # Construir query
-        queryset = Lote.objects.filter(
-            status='active',
-            is_verified=True,
-            area__gte=criteria.area_min,
-            area__lte=criteria.area_max
-        )
-        
-        # Filtrar por zonas
-        if criteria.zones:
-            zone_filters = Q()
-            for zone in criteria.zones:
-                zone_filters |= Q(barrio__icontains=zone)
-            queryset = queryset.filter(zone_filters)
-        
-        # Filtrar por estratos
-        if criteria.estratos:
-            queryset = queryset.filter(estrato__in=criteria.estratos)
-        
-        # Paginación
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 12))
-        start = (page - 1) * page_size
-        end = start + page_size
         
-        total = queryset.count()
-        lotes = queryset[start:end]
+        queryset = LoteSerializer.setup_eager_loading(CriteriaMatcher.lotes(criteria))
+        
+        # view=None: el orden es siempre el de la paginación, no el OrderingFilter de criterios
+        paginator = MatchingLotesPagination()
+        lotes = paginator.paginate_queryset(queryset, request)
         
         serializer = LoteSerializer(lotes, many=True, context={'request': request})
         
         return Response({
-            'count': total,
-            'results': serializer.data,
-            'page': page,
-            'total_pages': (total + page_size - 1) // page_size
+            'count': CriteriaMatcher.count(criteria),
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': serializer.data
         })
     
     @action(detail=False, methods=['get'])
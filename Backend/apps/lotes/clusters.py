@@ -0,0 +1,159 @@
+"""
+Clusters de lotes para el mapa, agregados en el servidor por celda geohash.
+
+Cada zoom usa una precisión de cluster (celdas de 1/2 a 1 tile del mapa) y
+las respuestas se arman con "tiles" de cache: la celda geohash de una
+precisión menor, que contiene a lo sumo 32 clusters. Un tile se calcula una
+vez (una consulta GROUP BY para todos los tiles faltantes de la petición) y
+queda en cache hasta que cambia un lote dentro de él, así que el tamaño de la
+respuesta depende del área visible y no de la cantidad de lotes.
+
+Cada tile tiene una generación (`CacheService.get_generations`) que forma parte
+de su clave y que `invalidar` incrementa. Un tile calculado solo se guarda si su
+generación no cambió durante la consulta: un cálculo que leyó la base de datos
+antes de una invalidación nunca deja un tile obsoleto en cache.
+
+Solo se agrupan lotes activos y verificados con coordenadas.
+"""
+from math import ceil
+import logging
+
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import Substr
+
+from apps.common.cache import CacheService
+from .geo import celdas_bbox, contar_celdas, q_prefijos
+
+logger = logging.getLogger(__name__)
+
+
+class LoteClusters:
+    """Clusters (conteo, centroide, suma de áreas) por tile geohash"""
+
+    KEY_PREFIX = 'lotes:clusters:'
+    TIMEOUT = 3600
+    ZOOM_MAX = 22
+    PRECISION_MAX = 8
+    MAX_TILES = 100
+
+    @classmethod
+    def precision_cluster(cls, zoom):
+        """Mayor precisión cuya celda mide al menos medio tile del mapa (128 px) en el zoom"""
+        precision = 1
+        for candidata in range(1, cls.PRECISION_MAX + 1):
+            # Ancho de la celda: 360 / 2^bits de longitud; del tile: 360 / 2^zoom
+            if ceil(5 * candidata / 2) <= zoom + 1:
+                precision = candidata
+        return precision
+
+    @staticmethod
+    def precision_tile(precision_cluster):
+        return precision_cluster - 1
+
+    @classmethod
+    def namespace(cls, precision_cluster, tile):
+        """Namespace de la generación del tile"""
+        return f"{cls.KEY_PREFIX}{precision_cluster}:{tile}"
+
+    @classmethod
+    def key(cls, precision_cluster, tile, generacion):
+        return f"{cls.namespace(precision_cluster, tile)}:g{generacion}"
+
+    @classmethod
+    def tiles_bbox(cls, sur, oeste, norte, este, precision_cluster):
+        """Tiles que cubren el bbox (ValueError si superan MAX_TILES)"""
+        precision = cls.precision_tile(precision_cluster)
+        if precision == 0:
+            return ['']
+
+        if contar_celdas(sur, oeste, norte, este, precision) > cls.MAX_TILES:
+            raise ValueError('El bbox es demasiado grande para el zoom')
+        return celdas_bbox(sur, oeste, norte, este, precision)
+
+    @classmethod
+    def calcular(cls, tiles, precision_cluster):
+        """{tile: [cluster]} de varios tiles en una consulta agrupada"""
+        from .models import Lote
+
+        precision = cls.precision_tile(precision_cluster)
+        por_tile = {tile: [] for tile in tiles}
+        filas = (
+            Lote.objects.filter(q_prefijos(tiles, 'active'), is_verified=True)
+            .annotate(celda=Substr('geohash', 1, precision_cluster))
+            .values('celda')
+            .annotate(total=Count('id'), lat=Avg('latitud'), lon=Avg('longitud'), area=Sum('area'))
+            .order_by('celda')
+        )
+        for fila in filas:
+            por_tile[fila['celda'][:precision]].append({
+                'geohash': fila['celda'],
+                'count': fila['total'],
+                'lat': round(float(fila['lat']), 6),
+                'lon': round(float(fila['lon']), 6),
+                'area_total': float(fila['area'] or 0),
+            })
+        return por_tile
+
+    @classmethod
+    def en_bbox(cls, sur, oeste, norte, este, zoom):
+        """
+        Clusters de los tiles que cubren el bbox.
+
+        Returns:
+            tuple: (precisión de cluster, tiles, clusters, tiles calculados)
+        """
+        precision_cluster = cls.precision_cluster(zoom)
+        tiles = cls.tiles_bbox(sur, oeste, norte, este, precision_cluster)
+        namespaces = {tile: cls.namespace(precision_cluster, tile) for tile in tiles}
+
+        generaciones = CacheService.get_generations(namespaces.values())
+        if generaciones is None:
+            # Sin cache: calcular todo sin guardar
+            por_tile = cls.calcular(tiles, precision_cluster)
+            clusters = [cluster for tile in tiles for cluster in por_tile[tile]]
+            return precision_cluster, tiles, clusters, len(tiles)
+
+        keys = {tile: cls.key(precision_cluster, tile, generaciones[namespaces[tile]]) for tile in tiles}
+        cacheados = CacheService.get_many(list(keys.values()))
+        faltantes = [tile for tile in tiles if keys[tile] not in cacheados]
+        por_tile = {tile: cacheados[keys[tile]] for tile in tiles if keys[tile] in cacheados}
+
+        if faltantes:
+            calculados = cls.calcular(faltantes, precision_cluster)
+            # ✅ Solo los tiles que nadie invalidó mientras se consultaban
+            actuales = CacheService.get_generations([namespaces[tile] for tile in faltantes]) or {}
+            CacheService.set_many(
+                {
+                    keys[tile]: clusters for tile, clusters in calculados.items()
+                    if actuales.get(namespaces[tile]) == generaciones[namespaces[tile]]
+                },
+                timeout=cls.TIMEOUT
+            )
+            por_tile.update(calculados)
+
+        clusters = [cluster for tile in tiles for cluster in por_tile[tile]]
+        return precision_cluster, tiles, clusters, len(faltantes)
+
+    @classmethod
+    def namespaces_geohash(cls, geohash):
+        """Namespaces de todos los tiles (todas las precisiones) que contienen un geohash"""
+        return [
+            cls.namespace(precision_cluster, geohash[:cls.precision_tile(precision_cluster)])
+            for precision_cluster in range(1, cls.PRECISION_MAX + 1)
+        ]
+
+    @classmethod
+    def invalidar_tiles(cls, namespaces):
+        """Incrementar la generación de los tiles (sus claves dejan de usarse)"""
+        CacheService.bump_generations(namespaces)
+
+    @classmethod
+    def invalidar(cls, *geohashes):
+        """Invalidar los tiles de esos geohash al confirmar la transacción"""
+        namespaces = {
+            namespace for geohash in geohashes if geohash
+            for namespace in cls.namespaces_geohash(geohash)
+        }
+        if namespaces:
+            transaction.on_commit(lambda: cls.invalidar_tiles(namespaces))
@@ -0,0 +1,160 @@
+"""
+Conjunto de lotes favoritos por usuario en cache.
+
+El corazón de cada tarjeta de lote consultaba `Favorite.objects.exists()`.
+`FavoriteSet` mantiene los ids de lotes favoritos de cada usuario en un set
+de Redis (SISMEMBER/SMISMEMBER sin tocar la base de datos), sincronizado en
+cada alta o baja de `Favorite` al confirmar la transacción.
+
+El set incluye un miembro centinela: sin él (set expirado, o creado por un
+SADD antes de cargarse) se reconstruye desde la base de datos, así que nunca
+se responde con un set parcial. Cada escritura incrementa además un contador
+por usuario; la reconstrucción vigila (WATCH) el set y el contador desde antes
+de consultar la base de datos y solo escribe si nadie los tocó, así que una
+lectura de la base de datos anterior a un alta o baja nunca pisa el set. Sin
+Redis el conjunto se guarda completo en el cache 'default' y se invalida en
+cada cambio.
+"""
+from django.db import transaction
+import logging
+
+from apps.common.cache import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class FavoriteSet:
+    """Ids (str) de lotes favoritos por usuario"""
+
+    KEY_PREFIX = 'lotes:favorites:'
+    CENTINELA = '*'
+    TIMEOUT = 24 * 3600
+
+    @classmethod
+    def key(cls, user_id):
+        return f"{cls.KEY_PREFIX}{user_id}"
+
+    @classmethod
+    def key_cambios(cls, user_id):
+        """Contador de escrituras del usuario (aborta reconstrucciones en curso)"""
+        return f"{cls.KEY_PREFIX}{user_id}:cambios"
+
+    @staticmethod
+    def _redis():
+        """Conexión Redis compartida, o None si el cache no es django_redis"""
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception:
+            return None
+
+    @staticmethod
+    def _cargar(user_id):
+        """Ids favoritos desde la base de datos (1 consulta)"""
+        from .models import Favorite
+        return {
+            str(lote_id)
+            for lote_id in Favorite.objects.filter(user_id=user_id).values_list('lote_id', flat=True)
+        }
+
+    @classmethod
+    def _reconstruir_redis(cls, client, user_id):
+        """
+        Cargar el set desde la base de datos. Si un alta o baja toca el set o
+        su contador mientras se consulta, el EXEC se aborta y el set queda
+        como lo dejó la escritura (sin centinela: la próxima lectura reconstruye).
+        """
+        from redis.exceptions import WatchError
+
+        key = cls.key(user_id)
+        with client.pipeline() as pipe:
+            # WATCH antes de la consulta: una escritura confirmada después de
+            # leer la base de datos siempre llega a Redis después del WATCH
+            pipe.watch(key, cls.key_cambios(user_id))
+            ids = cls._cargar(user_id)
+            pipe.multi()
+            pipe.delete(key)
+            pipe.sadd(key, cls.CENTINELA, *ids)
+            pipe.expire(key, cls.TIMEOUT)
+            try:
+                pipe.execute()
+            except WatchError:
+                logger.debug(f"Favoritos de {user_id} cambiaron durante la reconstrucción: no se cachean")
+        return ids
+
+    @classmethod
+    def ids(cls, user_id):
+        """Todos los ids favoritos del usuario"""
+        client = cls._redis()
+        if client is not None:
+            try:
+                miembros = {m.decode() if isinstance(m, bytes) else m for m in client.smembers(cls.key(user_id))}
+                if cls.CENTINELA in miembros:
+                    miembros.discard(cls.CENTINELA)
+                    return miembros
+                return cls._reconstruir_redis(client, user_id)
+            except Exception as e:
+                logger.error(f"Redis error (favoritos): {str(e)}")
+                return cls._cargar(user_id)
+
+        ids = CacheService.get(cls.key(user_id))
+        if ids is None:
+            ids = cls._cargar(user_id)
+            CacheService.set(cls.key(user_id), ids, timeout=cls.TIMEOUT)
+        return set(ids)
+
+    @classmethod
+    def flags(cls, user_id, lote_ids):
+        """{lote_id: bool} para una página de lotes"""
+        lote_ids = [str(lote_id) for lote_id in lote_ids]
+        if not lote_ids:
+            return {}
+
+        client = cls._redis()
+        if client is not None:
+            try:
+                resultado = client.smismember(cls.key(user_id), [cls.CENTINELA] + lote_ids)
+                if resultado[0]:
+                    return {lote_id: bool(es) for lote_id, es in zip(lote_ids, resultado[1:])}
+            except Exception as e:
+                logger.error(f"Redis error (favoritos): {str(e)}")
+
+        favoritos = cls.ids(user_id)
+        return {lote_id: lote_id in favoritos for lote_id in lote_ids}
+
+    @classmethod
+    def contiene(cls, user_id, lote_id):
+        return cls.flags(user_id, [lote_id])[str(lote_id)]
+
+    @classmethod
+    def _aplicar(cls, user_id, lote_id, agregar):
+        client = cls._redis()
+        if client is None:
+            CacheService.delete(cls.key(user_id))
+            return
+        try:
+            # Si el set no estaba cargado queda sin centinela y se reconstruye al
+            # leerlo; el contador aborta las reconstrucciones en curso (SREM de
+            # un set inexistente no modifica ninguna clave vigilada)
+            pipe = client.pipeline()
+            if agregar:
+                pipe.sadd(cls.key(user_id), str(lote_id))
+            else:
+                pipe.srem(cls.key(user_id), str(lote_id))
+            pipe.incr(cls.key_cambios(user_id))
+            pipe.expire(cls.key_cambios(user_id), cls.TIMEOUT)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error (favoritos): {str(e)}")
+            try:
+                client.delete(cls.key(user_id), cls.key_cambios(user_id))
+            except Exception:
+                pass
+
+    @classmethod
+    def agregar(cls, user_id, lote_id):
+        transaction.on_commit(lambda: cls._aplicar(user_id, lote_id, True))
+
+    @classmethod
+    def quitar(cls, user_id, lote_id):
+        transaction.on_commit(lambda: cls._aplicar(user_id, lote_id, False))
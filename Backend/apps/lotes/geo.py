@@ -0,0 +1,210 @@
+"""
+Búsqueda geográfica de lotes sin PostGIS.
+
+Cada lote guarda el geohash de sus coordenadas (`Lote.geohash`, calculado en
+save()) con el índice B-tree `lote_geohash_idx` (status, geohash). "geohash
+empieza por X" equivale al rango X <= geohash < sucesor(X), que el índice
+resuelve en cualquier motor (LIKE 'X%' no lo usa en SQLite ni en PostgreSQL
+con collation no C). Una búsqueda por área:
+
+1. Cubre el bbox con las celdas geohash de la mayor precisión que no supere
+   MAX_CELDAS (`prefijos_bbox`).
+2. Filtra con un OR de (status, rango de geohash), uniendo celdas
+   consecutivas en un solo rango. El status va dentro de cada rama para que
+   cada una sea un index scan completo.
+3. Refina de forma exacta: rangos de latitud/longitud en SQL para un bbox y
+   distancia haversine en Python para un radio.
+"""
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+import logging
+
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 12
+RADIO_TIERRA_M = 6371008.8
+MAX_CELDAS = 16
+
+
+def encode(lat, lon, precision=PRECISION):
+    """Geohash de unas coordenadas (bits alternos: longitud primero)"""
+    lat, lon = float(lat), float(lon)
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    resultado = []
+    bits = 0
+    valor = 0
+    es_lon = True
+
+    while len(resultado) < precision:
+        if es_lon:
+            medio = (lon_min + lon_max) / 2
+            if lon >= medio:
+                valor = (valor << 1) | 1
+                lon_min = medio
+            else:
+                valor <<= 1
+                lon_max = medio
+        else:
+            medio = (lat_min + lat_max) / 2
+            if lat >= medio:
+                valor = (valor << 1) | 1
+                lat_min = medio
+            else:
+                valor <<= 1
+                lat_max = medio
+        es_lon = not es_lon
+        bits += 1
+        if bits == 5:
+            resultado.append(BASE32[valor])
+            bits = 0
+            valor = 0
+
+    return ''.join(resultado)
+
+
+def tamano_celda(precision):
+    """(alto, ancho) en grados de una celda geohash"""
+    bits = 5 * precision
+    bits_lon = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / (1 << bits_lat), 360.0 / (1 << bits_lon)
+
+
+def _rango_celdas(sur, oeste, norte, este, precision):
+    alto, ancho = tamano_celda(precision)
+    filas = range(floor((sur + 90) / alto), floor((min(norte, 90 - 1e-9) + 90) / alto) + 1)
+    columnas = range(floor((oeste + 180) / ancho), floor((min(este, 180 - 1e-9) + 180) / ancho) + 1)
+    return filas, columnas, alto, ancho
+
+
+def contar_celdas(sur, oeste, norte, este, precision):
+    """Cantidad de celdas de una precisión que cubren el bbox"""
+    filas, columnas, _, _ = _rango_celdas(sur, oeste, norte, este, precision)
+    return len(filas) * len(columnas)
+
+
+def celdas_bbox(sur, oeste, norte, este, precision):
+    """Celdas geohash de una precisión que cubren el bbox"""
+    filas, columnas, alto, ancho = _rango_celdas(sur, oeste, norte, este, precision)
+    return sorted({
+        encode(-90 + (fila + 0.5) * alto, -180 + (columna + 0.5) * ancho, precision)
+        for fila in filas
+        for columna in columnas
+    })
+
+
+def prefijos_bbox(sur, oeste, norte, este, max_celdas=MAX_CELDAS):
+    """
+    Celdas geohash que cubren el bbox, a la mayor precisión con a lo sumo
+    `max_celdas` celdas (el cubrimiento siempre incluye todo el bbox).
+    """
+    precision = 1
+    for candidata in range(PRECISION, 0, -1):
+        if contar_celdas(sur, oeste, norte, este, candidata) <= max_celdas:
+            precision = candidata
+            break
+    return celdas_bbox(sur, oeste, norte, este, precision)
+
+
+def sucesor(prefijo):
+    """
+    Menor cadena mayor que todo geohash que empieza por `prefijo`
+    (None si no hay: 'zz...')
+    """
+    prefijo = prefijo.rstrip(BASE32[-1])
+    if not prefijo:
+        return None
+    return prefijo[:-1] + BASE32[BASE32.index(prefijo[-1]) + 1]
+
+
+def rangos(prefijos):
+    """[(desde, hasta)] de los prefijos, uniendo los contiguos (hasta=None: sin límite)"""
+    resultado = []
+    for prefijo in sorted(prefijos):
+        hasta = sucesor(prefijo)
+        if resultado and resultado[-1][1] == prefijo:
+            resultado[-1] = (resultado[-1][0], hasta)
+        else:
+            resultado.append((prefijo, hasta))
+    return resultado
+
+
+def q_prefijos(prefijos, status):
+    """OR de `status = ? AND desde <= geohash < hasta` que cubren los prefijos"""
+    condicion = Q()
+    for desde, hasta in rangos(prefijos):
+        rango = Q(status=status, geohash__gte=desde)
+        if hasta is not None:
+            rango &= Q(geohash__lt=hasta)
+        condicion |= rango
+    return condicion
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Distancia en metros sobre la esfera"""
+    lat1, lon1, lat2, lon2 = map(radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_M * asin(min(1.0, sqrt(a)))
+
+
+def bbox_de_radio(lat, lon, radio_m):
+    """(sur, oeste, norte, este) que contiene el círculo"""
+    lat, lon = float(lat), float(lon)
+    delta_lat = degrees(radio_m / RADIO_TIERRA_M)
+    delta_lon = degrees(radio_m / (RADIO_TIERRA_M * max(cos(radians(lat)), 1e-6)))
+    return (
+        max(lat - delta_lat, -90.0),
+        max(lon - delta_lon, -180.0),
+        min(lat + delta_lat, 90.0),
+        min(lon + delta_lon, 180.0),
+    )
+
+
+class LoteGeoSearch:
+    """
+    Búsquedas por bbox y por radio sobre un QuerySet de lotes.
+
+    El filtro de status lo aplica la búsqueda (primera columna del índice);
+    el QuerySet aporta el resto (is_verified, owner, ...).
+    """
+
+    STATUS = 'active'
+
+    @classmethod
+    def en_bbox(cls, queryset, sur, oeste, norte, este, status=STATUS):
+        """Lotes dentro del bbox (prefijos geohash + rangos exactos en SQL)"""
+        return queryset.filter(
+            q_prefijos(prefijos_bbox(sur, oeste, norte, este), status),
+            latitud__gte=sur,
+            latitud__lte=norte,
+            longitud__gte=oeste,
+            longitud__lte=este,
+        )
+
+    @classmethod
+    def cercanos(cls, queryset, lat, lon, radio_m, limite, status=STATUS):
+        """
+        Lotes a menos de `radio_m` metros, del más cercano al más lejano.
+
+        Los candidatos del bbox del círculo se traen solo con (id, lat, lon);
+        la distancia exacta se calcula en Python y se cargan completos los
+        `limite` más cercanos (2 consultas).
+
+        Returns:
+            list: [(lote, distancia_m)]
+        """
+        candidatos = cls.en_bbox(queryset, *bbox_de_radio(lat, lon, radio_m), status=status).order_by().values_list(
+            'id', 'latitud', 'longitud'
+        )
+        distancias = sorted(
+            (distancia, lote_id)
+            for lote_id, lote_lat, lote_lon in candidatos
+            for distancia in (haversine_m(lat, lon, lote_lat, lote_lon),)
+            if distancia <= radio_m
+        )[:limite]
+
+        lotes = queryset.in_bulk([lote_id for _, lote_id in distancias])
+        return [(lotes[lote_id], distancia) for distancia, lote_id in distancias if lote_id in lotes]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lotes", "0012_lote_desarrolladores"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lote",
+            index=models.Index(
+                fields=["status", "is_verified", "estrato", "area"],
+                name="lote_match_idx",
+            ),
+        ),
+    ]
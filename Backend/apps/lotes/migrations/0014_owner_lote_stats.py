@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_userrequest_user_updated_idx"),
+        ("lotes", "0013_lote_match_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OwnerLoteStats",
+            fields=[
+                (
+                    "owner",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="lote_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Propietario",
+                    ),
+                ),
+                (
+                    "total_lotes",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Total de Lotes"
+                    ),
+                ),
+                (
+                    "total_area",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Área Total (m²)",
+                    ),
+                ),
+                (
+                    "activos",
+                    models.PositiveIntegerField(default=0, verbose_name="Activos"),
+                ),
+                (
+                    "pendientes",
+                    models.PositiveIntegerField(default=0, verbose_name="Pendientes"),
+                ),
+                (
+                    "rechazados",
+                    models.PositiveIntegerField(default=0, verbose_name="Rechazados"),
+                ),
+                (
+                    "archivados",
+                    models.PositiveIntegerField(default=0, verbose_name="Archivados"),
+                ),
+                (
+                    "version",
+                    models.PositiveIntegerField(default=0, verbose_name="Versión"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última Actualización"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Estadísticas de Lotes por Propietario",
+                "verbose_name_plural": "Estadísticas de Lotes por Propietario",
+                "db_table": "lotes_owner_stats",
+            },
+        ),
+    ]
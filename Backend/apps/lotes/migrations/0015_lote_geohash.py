@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:08
+
+from django.db import migrations, models
+
+
+def calcular_geohash(apps, schema_editor):
+    """Geohash de los lotes existentes con coordenadas"""
+    from apps.lotes.geo import encode
+    
+    Lote = apps.get_model('lotes', 'Lote')
+    lotes = []
+    for lote in Lote.objects.filter(latitud__isnull=False, longitud__isnull=False).only('id', 'latitud', 'longitud').iterator():
+        lote.geohash = encode(lote.latitud, lote.longitud)
+        lotes.append(lote)
+    Lote.objects.bulk_update(lotes, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lotes", "0014_owner_lote_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lote",
+            name="geohash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Geohash de las coordenadas (búsqueda por prefijo)",
+                max_length=12,
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lote",
+            index=models.Index(
+                fields=["status", "geohash"], name="lote_geohash_idx"
+            ),
+        ),
+        migrations.RunPython(calcular_geohash, migrations.RunPython.noop),
+    ]
@@ -9,11 +9,13 @@ import uuid
 import logging
 from django.utils import timezone
 
+from apps.common.dirty_fields import DirtyFieldsMixin
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-class Lote(models.Model):
+class Lote(DirtyFieldsMixin, models.Model):
     """
     Modelo simplificado de Lote
     ✅ ESTADOS CLAROS Y DOCUMENTADOS
@@ -113,6 +115,14 @@ class Lote(models.Model):
         null=True,
         help_text="Coordenada de longitud"
     )
+    # ✅ Geohash de (latitud, longitud), calculado en save() para búsquedas por área
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Geohash de las coordenadas (búsqueda por prefijo)"
+    )
     clasificacion_suelo = models.CharField(
         max_length=100, 
         blank=True, 
@@ -268,11 +278,43 @@ class Lote(models.Model):
             models.Index(fields=['cbml'], name='lote_cbml_idx'),
             models.Index(fields=['uso_suelo'], name='lote_uso_suelo_idx'),
             models.Index(fields=['tratamiento_pot'], name='lote_tratamiento_idx'),
+            # ✅ Criterios de inversión: dimensiones numéricas del plan (CriteriaPlan)
+            models.Index(fields=['status', 'is_verified', 'estrato', 'area'], name='lote_match_idx'),
+            # ✅ Búsqueda geográfica: prefijos geohash como rangos dentro de los lotes visibles
+            models.Index(fields=['status', 'geohash'], name='lote_geohash_idx'),
         ]
 
     def __str__(self):
         return f"{self.nombre} - {self.direccion}"
 
+    # Dimensiones de los criterios de inversión: las señales comparan sus
+    # valores anteriores (get_saved_changes de DirtyFieldsMixin)
+    CAMPOS_CRITERIOS = (
+        'status', 'is_verified', 'area', 'estrato', 'valor',
+        'barrio', 'tratamiento_pot', 'uso_suelo',
+    )
+
+    def campos_modificados(self):
+        """
+        CAMPOS_CRITERIOS que cambió el último save() (para las señales
+        post_save). None si no se conocen: lote nuevo o instancia que no se
+        cargó de la base de datos.
+        """
+        cambios = self.get_saved_changes()
+        if cambios is None:
+            return None
+        return set(self.CAMPOS_CRITERIOS) & cambios.keys()
+
+    @property
+    def era_visible(self):
+        """can_be_shown antes del último save() (None si no se conoce)"""
+        cambios = self.get_saved_changes()
+        if cambios is None:
+            return None
+        status = cambios.get('status', self.status)
+        is_verified = cambios.get('is_verified', self.is_verified)
+        return status == 'active' and bool(is_verified)
+
     def clean(self):
         """Validaciones del modelo"""
         super().clean()
@@ -317,6 +359,18 @@ class Lote(models.Model):
             self.matricula = self.matricula.strip()
         if self.barrio:
             self.barrio = self.barrio.strip()
+        
+        # ✅ Geohash siempre alineado con las coordenadas (el anterior, vía
+        # get_saved_changes, lo usan las señales para invalidar los clusters
+        # del mapa de su celda)
+        from .geo import encode
+        if self.latitud is not None and self.longitud is not None:
+            self.geohash = encode(self.latitud, self.longitud)
+        else:
+            self.geohash = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitud', 'longitud'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
             
         super().save(*args, **kwargs)
 
@@ -547,6 +601,42 @@ class Favorite(models.Model):
         return f"{self.user.email} - {self.lote.cbml}"
 
 
+class OwnerLoteStats(models.Model):
+    """
+    Resumen de lotes por propietario (una fila por owner).
+    Se recalcula con un solo aggregate al cambiar un lote del owner
+    (ver `OwnerLoteStatsService`); `version` alimenta el ETag.
+    """
+    owner = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='lote_stats',
+        verbose_name='Propietario'
+    )
+    total_lotes = models.PositiveIntegerField(default=0, verbose_name='Total de Lotes')
+    total_area = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Área Total (m²)'
+    )
+    activos = models.PositiveIntegerField(default=0, verbose_name='Activos')
+    pendientes = models.PositiveIntegerField(default=0, verbose_name='Pendientes')
+    rechazados = models.PositiveIntegerField(default=0, verbose_name='Rechazados')
+    archivados = models.PositiveIntegerField(default=0, verbose_name='Archivados')
+    version = models.PositiveIntegerField(default=0, verbose_name='Versión')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
+    
+    class Meta:
+        verbose_name = 'Estadísticas de Lotes por Propietario'
+        verbose_name_plural = 'Estadísticas de Lotes por Propietario'
+        db_table = 'lotes_owner_stats'
+    
+    def __str__(self):
+        return f"{self.owner_id}: {self.total_lotes} lotes (v{self.version})"
+
+
 class Tratamiento(models.Model):
     """
     Modelo para tratamientos urbanísticos del POT
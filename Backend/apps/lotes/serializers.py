@@ -19,6 +19,18 @@ class LoteSimpleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'owner']
 
 
+class LoteUbicacionSerializer(serializers.ModelSerializer):
+    """Serializer liviano para búsquedas por ubicación (mapa)"""
+    
+    class Meta:
+        model = Lote
+        fields = [
+            'id', 'nombre', 'direccion', 'barrio', 'estrato', 'area',
+            'valor', 'uso_suelo', 'latitud', 'longitud'
+        ]
+        read_only_fields = fields
+
+
 class LoteSerializer(serializers.ModelSerializer):
     """Serializer completo para lotes"""
     owner_name = serializers.SerializerMethodField()
@@ -56,6 +68,11 @@ class LoteSerializer(serializers.ModelSerializer):
             'desarrolladores_info',  # ✅ NUEVO
         ]
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """✅ Cargar owner y desarrolladores junto al listado (evita N+1)"""
+        return queryset.select_related('owner').prefetch_related('desarrolladores')
+    
     def get_owner_name(self, obj):
         """Obtener nombre del propietario"""
         if obj.owner:
@@ -123,6 +140,14 @@ class LoteSerializer(serializers.ModelSerializer):
             }
             for d in desarrolladores
         ]
+    
+    def to_representation(self, instance):
+        """✅ `is_favorite` desde el set precargado en el contexto (`favorite_ids`), sin consultas"""
+        data = super().to_representation(instance)
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is not None:
+            data['is_favorite'] = str(instance.pk) in favorite_ids
+        return data
 
 
 class LoteCreateSerializer(serializers.ModelSerializer):
@@ -4,9 +4,12 @@ Servicios consolidados para lógica de negocio de lotes
 from typing import Dict, Optional, List
 import logging
 from decimal import Decimal
-from django.db.models import Avg, Count
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
 
-from .models import Lote, Tratamiento
+from .models import Lote, OwnerLoteStats, Tratamiento
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +52,77 @@ class LotesService:
         return len(errores) == 0, errores
 
 
+# =============================================================================
+# ESTADÍSTICAS POR PROPIETARIO
+# =============================================================================
+
+class OwnerLoteStatsService:
+    """
+    Estadísticas de lotes por propietario.
+    
+    Un solo aggregate con conteos condicionales calcula el resumen, que se
+    guarda en `OwnerLoteStats` al cambiar un lote del owner. Las lecturas son
+    una consulta por clave primaria y el ETag sale de `version`.
+    """
+    
+    @staticmethod
+    def calcular(owner_id) -> Dict:
+        """Resumen del owner en una sola consulta"""
+        resumen = Lote.objects.filter(owner_id=owner_id).aggregate(
+            total_lotes=Count('id'),
+            total_area=Sum('area'),
+            activos=Count('id', filter=Q(status='active')),
+            pendientes=Count('id', filter=Q(status='pending')),
+            rechazados=Count('id', filter=Q(status='rejected')),
+            archivados=Count('id', filter=Q(status='archived')),
+        )
+        resumen['total_area'] = resumen['total_area'] or Decimal('0')
+        return resumen
+    
+    @classmethod
+    def _refrescar_bloqueando(cls, owner_id) -> None:
+        with transaction.atomic():
+            # ✅ Bloquear la fila antes de calcular: los refrescos del mismo
+            # owner se serializan y el último siempre calcula con los cambios
+            # que confirmó el anterior
+            existe = OwnerLoteStats.objects.select_for_update().filter(owner_id=owner_id).first() is not None
+            valores = cls.calcular(owner_id)
+            if existe:
+                OwnerLoteStats.objects.filter(owner_id=owner_id).update(
+                    **valores, version=F('version') + 1, updated_at=timezone.now()
+                )
+            else:
+                OwnerLoteStats.objects.create(owner_id=owner_id, version=1, **valores)
+    
+    @classmethod
+    def refrescar(cls, owner_id) -> None:
+        """Recalcular la fila del owner e incrementar su versión"""
+        try:
+            cls._refrescar_bloqueando(owner_id)
+        except IntegrityError:
+            # Otro proceso creó la fila a la vez: repetir, ya con la fila bloqueable
+            cls._refrescar_bloqueando(owner_id)
+    
+    @classmethod
+    def obtener(cls, owner_id) -> Optional[OwnerLoteStats]:
+        """
+        Fila del owner (con el owner cargado); se crea si no existe.
+        None si el usuario no existe.
+        """
+        queryset = OwnerLoteStats.objects.select_related('owner')
+        stats = queryset.filter(owner_id=owner_id).first()
+        if stats is None:
+            if not get_user_model().objects.filter(pk=owner_id).exists():
+                return None
+            cls.refrescar(owner_id)
+            stats = queryset.get(owner_id=owner_id)
+        return stats
+    
+    @staticmethod
+    def etag(stats: OwnerLoteStats) -> str:
+        return f'"lote-stats-{stats.owner_id}-v{stats.version}"'
+
+
 # =============================================================================
 # SERVICIO DE TRATAMIENTOS
 # =============================================================================
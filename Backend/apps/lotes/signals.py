@@ -2,10 +2,11 @@
 Señales para notificaciones relacionadas con lotes
 """
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Lote
+from .models import Favorite, Lote
 import logging
 
 User = get_user_model()
@@ -24,14 +25,26 @@ def notificar_lote_match(sender, instance, created, **kwargs):
     try:
         from apps.notifications.services import NotificationService
         
-        # Obtener developers con perfil completo
-        developers = User.objects.filter(
+        # Valores del perfil de inversión que aparecen en el lote
+        texto = f"{instance.barrio or ''} {instance.direccion or ''}".lower()
+        uso_suelo = (instance.uso_suelo or '').lower()
+        modelo_pago = str((instance.metadatos or {}).get('modelo_pago', '')).lower()
+        
+        # ✅ Solo developers que contienen alguno de esos valores (@> con índices GIN)
+        developers = list(User.objects.filter(
             role='developer',
             perfil_completo=True,
             is_active=True
-        )
+        ).interesados_en(
+            ciudades=[c for c in User.CIUDADES_INTERES if c in texto],
+            usos=[u for u in User.USOS_PREFERIDOS if u in uso_suelo],
+            modelos_pago=[m for m in User.MODELOS_PAGO if m in modelo_pago],
+        ).only('id', 'ciudades_interes', 'usos_preferidos', 'modelos_pago'))
+        
+        logger.info(f"🔍 Buscando matches para lote {instance.id} entre {len(developers)} developers candidatos")
         
-        logger.info(f"🔍 Buscando matches para lote {instance.id} entre {developers.count()} developers")
+        # Developers agrupados por razones de match: una notificación masiva por grupo
+        developers_por_razones = {}
         
         for developer in developers:
             # Verificar si hay match (al menos 1 criterio)
@@ -64,17 +77,77 @@ def notificar_lote_match(sender, instance, created, **kwargs):
                         match_reasons.append(f"modelo de pago ({modelo})")
                         break
             
-            # ✅ Si hay match, crear notificación
+            # ✅ Si hay match, agrupar para notificar
             if has_match:
                 match_text = ', '.join(match_reasons)
-                NotificationService.notify_lote_recomendado(
-                    user=developer,
-                    lote=instance,
-                    match_reasons=match_text
-                )
-                logger.info(f"✅ Notificación enviada a {developer.email} - Match: {match_text}")
+                developers_por_razones.setdefault(match_text, []).append(developer.pk)
+        
+        for match_text, developer_ids in developers_por_razones.items():
+            NotificationService.notify_lotes_recomendados(
+                developer_ids,
+                lote=instance,
+                match_reasons=match_text
+            )
+            logger.info(f"✅ Notificación enviada a {len(developer_ids)} developers - Match: {match_text}")
     
     except ImportError:
         logger.warning("NotificationService no disponible")
     except Exception as e:
         logger.error(f"❌ Error notificando matches: {str(e)}")
+
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def refrescar_estadisticas_owner(sender, instance, created=False, **kwargs):
+    """
+    Recalcular el resumen de lotes del propietario al confirmar la
+    transacción (y el del propietario anterior si el lote cambió de dueño).
+    Ediciones que no tocan status, área ni propietario no lo cambian.
+    """
+    from .services import OwnerLoteStatsService
+    
+    owner_ids = {instance.owner_id}
+    if kwargs['signal'] is post_save and not created:
+        cambios = instance.get_saved_changes()
+        if cambios is not None:
+            if not {'status', 'area', 'owner_id'} & cambios.keys():
+                return
+            owner_ids.add(cambios.get('owner_id'))
+    owner_ids.discard(None)
+    for owner_id in owner_ids:
+        transaction.on_commit(lambda owner_id=owner_id: OwnerLoteStatsService.refrescar(owner_id))
+
+
+@receiver(post_save, sender=Favorite)
+def agregar_favorito_en_cache(sender, instance, created, **kwargs):
+    """Agregar el lote al set de favoritos del usuario"""
+    if created:
+        from .favorites import FavoriteSet
+        FavoriteSet.agregar(instance.user_id, instance.lote_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def quitar_favorito_de_cache(sender, instance, **kwargs):
+    """Quitar el lote del set de favoritos del usuario"""
+    from .favorites import FavoriteSet
+    FavoriteSet.quitar(instance.user_id, instance.lote_id)
+
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def invalidar_clusters_mapa(sender, instance, created=False, **kwargs):
+    """
+    Invalidar los tiles de clusters de la celda del lote (y de la anterior si
+    se movió). Ediciones que no tocan ubicación, visibilidad ni área no los
+    cambian.
+    """
+    from .clusters import LoteClusters
+    
+    geohash_anterior = None
+    if kwargs['signal'] is post_save and not created:
+        cambios = instance.get_saved_changes()
+        if cambios is not None:
+            if not {'latitud', 'longitud', 'status', 'is_verified', 'area'} & cambios.keys():
+                return
+            geohash_anterior = cambios.get('geohash')
+    LoteClusters.invalidar(instance.__dict__.get('geohash'), geohash_anterior)
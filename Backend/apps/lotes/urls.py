@@ -17,6 +17,9 @@ from .views import (
     manage_lote_developers,
     list_lote_developers,
     list_available_developers,
+    lotes_cercanos,
+    lotes_en_bbox,
+    lotes_clusters,
 )
 
 app_name = 'lotes'
@@ -31,6 +34,11 @@ urlpatterns = [
     path('<uuid:pk>/analysis/', LoteAnalysisView.as_view(), name='lote-analysis'),
     path('available/', AvailableLotesView.as_view(), name='available-lotes'),
     
+    # Búsqueda geográfica
+    path('near/', lotes_cercanos, name='lotes-near'),
+    path('in-bbox/', lotes_en_bbox, name='lotes-in-bbox'),
+    path('clusters/', lotes_clusters, name='lotes-clusters'),
+    
     # Verificación (admin)
     path('pending-verification/', LotePendingVerificationListView.as_view(), name='lote-pending'),
     path('<uuid:pk>/verify/', LoteVerificationView.as_view(), name='lote-verify'),
@@ -39,6 +47,7 @@ urlpatterns = [
     path('tratamientos/', listar_tratamientos, name='tratamientos-list'),
     
     # Estadísticas
+    path('stats/', user_lote_stats, name='my-stats'),
     path('stats/user/<uuid:user_id>/', user_lote_stats, name='user-stats'),
     
     # Router (favoritos)
@@ -10,6 +10,7 @@ from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.contrib.auth import get_user_model
 import logging
 import uuid
@@ -18,11 +19,14 @@ from apps.documents.models import Document
 
 from .models import Lote, Favorite, Tratamiento
 from .serializers import (
-    LoteSerializer, LoteCreateSerializer, FavoriteSerializer
+    LoteSerializer, LoteCreateSerializer, FavoriteSerializer, LoteUbicacionSerializer
 )
+from .favorites import FavoriteSet
+from .clusters import LoteClusters
+from .geo import LoteGeoSearch
 from .filters import LoteFilter
 from .permissions import IsOwnerOrAdmin
-from .services import LotesService, TratamientosService
+from .services import LotesService, OwnerLoteStatsService, TratamientosService
 from django.db.models import Prefetch, Q
 from apps.common.cache import CacheService, cache_result
 
@@ -51,13 +55,22 @@ class LoteListCreateView(generics.ListCreateAPIView):
         user = self.request.user
         
         if user.is_admin:
-            return Lote.objects.all()
+            queryset = Lote.objects.all()
         elif user.is_owner:
-            return Lote.objects.filter(owner=user)
+            queryset = Lote.objects.filter(owner=user)
         elif user.is_developer:
-            return Lote.objects.filter(status='active', is_verified=True)
+            queryset = Lote.objects.filter(status='active', is_verified=True)
+        else:
+            return Lote.objects.none()
         
-        return Lote.objects.none()
+        return LoteSerializer.setup_eager_loading(queryset)
+    
+    def get_serializer_context(self):
+        """✅ Favoritos del usuario para `is_favorite` en el listado (sin consultas por lote)"""
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            context['favorite_ids'] = FavoriteSet.ids(self.request.user.pk)
+        return context
     
     def create(self, request, *args, **kwargs):
         """Crear lote con owner asignado automáticamente"""
@@ -97,10 +110,10 @@ class AvailableLotesView(APIView):
         """Obtener lotes disponibles con filtros"""
         try:
             # ✅ CRÍTICO: Filtrar solo lotes activos y verificados
-            queryset = Lote.objects.select_related('owner').filter(
+            queryset = LoteSerializer.setup_eager_loading(Lote.objects.filter(
                 status='active',
                 is_verified=True
-            )
+            ))
             
             # ✅ LOGGING
             total_count = queryset.count()
@@ -136,7 +149,10 @@ class AvailableLotesView(APIView):
             logger.info(f"[AvailableLotes] Lotes después de filtros: {final_count}")
             
             # Serializar
-            serializer = LoteSerializer(queryset, many=True)
+            serializer = LoteSerializer(queryset, many=True, context={
+                'request': request,
+                'favorite_ids': FavoriteSet.ids(request.user.pk),
+            })
             
             return Response({
                 'success': True,
@@ -161,6 +177,7 @@ class FavoriteViewSet(viewsets.ModelViewSet):
     """Gestión de favoritos de lotes"""
     serializer_class = FavoriteSerializer
     permission_classes = [IsAuthenticated]
+    CHECK_MANY_MAX = 100
     
     def get_queryset(self):
         return Favorite.objects.filter(
@@ -238,20 +255,53 @@ class FavoriteViewSet(viewsets.ModelViewSet):
         
         try:
             lote_uuid = uuid.UUID(lote_id)
-            exists = Favorite.objects.filter(
-                user=request.user,
-                lote_id=lote_uuid
-            ).exists()
             
             return Response({
                 'success': True,
-                'is_favorite': exists
+                'is_favorite': FavoriteSet.contiene(request.user.pk, lote_uuid)
             })
         except ValueError:
             return Response({
                 'success': False,
                 'error': 'UUID inválido'
             }, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get', 'post'], url_path='check-many')
+    def check_many(self, request):
+        """
+        ✅ Verificar una página de lotes en una sola llamada
+        
+        GET ?lote_ids=<uuid>,<uuid> o POST {"lote_ids": [...]}
+        """
+        if request.method == 'POST':
+            lote_ids = request.data.get('lote_ids') or []
+        else:
+            lote_ids = [i for i in request.query_params.get('lote_ids', '').split(',') if i.strip()]
+        
+        if not isinstance(lote_ids, list) or not lote_ids:
+            return Response({
+                'success': False,
+                'error': 'lote_ids requerido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(lote_ids) > self.CHECK_MANY_MAX:
+            return Response({
+                'success': False,
+                'error': f'Máximo {self.CHECK_MANY_MAX} lotes por consulta'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            lote_uuids = [uuid.UUID(str(lote_id).strip()) for lote_id in lote_ids]
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'UUID inválido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'favorites': FavoriteSet.flags(request.user.pk, lote_uuids)
+        })
 
 
 # =============================================================================
@@ -341,10 +391,10 @@ class LotePendingVerificationListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def get_queryset(self):
-        return Lote.objects.filter(
+        return LoteSerializer.setup_eager_loading(Lote.objects.filter(
             status='pending',
             is_verified=False
-        ).order_by('-created_at')
+        )).order_by('-created_at')
 
 
 # =============================================================================
@@ -435,7 +485,10 @@ def listar_tratamientos(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_lote_stats(request, user_id=None):
-    """Estadísticas de lotes por usuario"""
+    """
+    Estadísticas de lotes por usuario
+    ✅ Resumen por owner (un aggregate, guardado en OwnerLoteStats) con ETag
+    """
     if not user_id:
         user_id = request.user.id
     
@@ -445,29 +498,32 @@ def user_lote_stats(request, user_id=None):
             'error': 'Sin permisos'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    try:
-        target_user = User.objects.get(id=user_id)
-        lotes = Lote.objects.filter(owner=target_user)
-        
-        total_area = sum(l.area for l in lotes if l.area)
-        
-        stats = {
-            'user_id': user_id,
-            'user_name': target_user.get_full_name(),
-            'total_lotes': lotes.count(),
-            'total_area': float(total_area) if total_area else 0,
-            'por_estado': {
-                'activos': lotes.filter(status='active').count(),
-                'pendientes': lotes.filter(status='pending').count(),
-                'archivados': lotes.filter(status='archived').count(),
-            }
-        }
-        
-        return Response(stats)
-    except User.DoesNotExist:
+    stats = OwnerLoteStatsService.obtener(user_id)
+    if stats is None:
         return Response({
             'error': 'Usuario no encontrado'
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    etag = OwnerLoteStatsService.etag(stats)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = Response({
+            'user_id': user_id,
+            'user_name': stats.owner.get_full_name(),
+            'total_lotes': stats.total_lotes,
+            'total_area': float(stats.total_area),
+            'por_estado': {
+                'activos': stats.activos,
+                'pendientes': stats.pendientes,
+                'rechazados': stats.rechazados,
+                'archivados': stats.archivados,
+            }
+        })
+    
+    # El cliente revalida siempre; con el mismo ETag recibe 304 sin cuerpo
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @api_view(['GET'])
@@ -848,13 +904,13 @@ def list_lote_developers(request, lote_id):
         lote = get_object_or_404(Lote, id=lote_id)
         
         # ✅ Solo propietario o admin pueden ver
-        if lote.owner != request.user and not request.user.is_staff:
+        if lote.owner_id != request.user.id and not request.user.is_staff:
             return Response({
                 'success': False,
                 'error': 'Sin permisos para ver desarrolladores de este lote'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        desarrolladores = lote.desarrolladores.all()
+        desarrolladores = list(lote.desarrolladores.all())
         
         return Response({
             'success': True,
@@ -868,7 +924,7 @@ def list_lote_developers(request, lote_id):
                 }
                 for d in desarrolladores
             ],
-            'count': desarrolladores.count()
+            'count': len(desarrolladores)
         })
         
     except Exception as e:
@@ -924,3 +980,144 @@ def list_available_developers(request):
             'success': False,
             'error': 'Error interno del servidor'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# =============================================================================
+# SECCIÓN 6: BÚSQUEDA GEOGRÁFICA
+# =============================================================================
+
+RADIO_DEFAULT_M = 1000
+RADIO_MAX_M = 50000
+LIMITE_CERCANOS = 50
+LIMITE_CERCANOS_MAX = 200
+LIMITE_BBOX_MAX = 500
+
+
+def _lotes_visibles():
+    """Lotes verificados con las columnas del mapa (LoteGeoSearch filtra status='active')"""
+    return Lote.objects.filter(is_verified=True).only(*LoteUbicacionSerializer.Meta.fields)
+
+
+def _parametro_float(request, nombre, minimo, maximo, default=None):
+    """Leer un parámetro numérico; ValueError con mensaje si falta o está fuera de rango"""
+    valor = request.query_params.get(nombre)
+    if valor in (None, ''):
+        if default is None:
+            raise ValueError(f'{nombre} es requerido')
+        return default
+    try:
+        valor = float(valor)
+    except ValueError:
+        raise ValueError(f'{nombre} debe ser numérico')
+    if not (minimo <= valor <= maximo):
+        raise ValueError(f'{nombre} debe estar entre {minimo} y {maximo}')
+    return valor
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lotes_cercanos(request):
+    """
+    ✅ Lotes disponibles a menos de `radio` metros, del más cercano al más lejano
+    
+    GET /api/lotes/near/?lat=6.2442&lon=-75.5812&radio=1000&limit=50
+    """
+    try:
+        lat = _parametro_float(request, 'lat', -90, 90)
+        lon = _parametro_float(request, 'lon', -180, 180)
+        radio = _parametro_float(request, 'radio', 1, RADIO_MAX_M, default=RADIO_DEFAULT_M)
+        limite = int(_parametro_float(request, 'limit', 1, LIMITE_CERCANOS_MAX, default=LIMITE_CERCANOS))
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    resultados = LoteGeoSearch.cercanos(_lotes_visibles(), lat, lon, radio, limite)
+    
+    lotes = []
+    for lote, distancia in resultados:
+        data = LoteUbicacionSerializer(lote).data
+        data['distancia_m'] = round(distancia, 1)
+        lotes.append(data)
+    
+    return Response({
+        'success': True,
+        'count': len(lotes),
+        'centro': {'lat': lat, 'lon': lon},
+        'radio_m': radio,
+        'lotes': lotes
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lotes_en_bbox(request):
+    """
+    ✅ Lotes disponibles dentro del área visible del mapa
+    
+    GET /api/lotes/in-bbox/?sur=6.20&oeste=-75.60&norte=6.28&este=-75.55&limit=500
+    """
+    try:
+        sur = _parametro_float(request, 'sur', -90, 90)
+        oeste = _parametro_float(request, 'oeste', -180, 180)
+        norte = _parametro_float(request, 'norte', -90, 90)
+        este = _parametro_float(request, 'este', -180, 180)
+        limite = int(_parametro_float(request, 'limit', 1, LIMITE_BBOX_MAX, default=LIMITE_BBOX_MAX))
+        if sur > norte or oeste > este:
+            raise ValueError('El bbox debe cumplir sur <= norte y oeste <= este')
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Un registro extra indica si el resultado se truncó (sin count())
+    lotes = list(LoteGeoSearch.en_bbox(_lotes_visibles(), sur, oeste, norte, este).order_by('geohash')[:limite + 1])
+    truncado = len(lotes) > limite
+    lotes = lotes[:limite]
+    
+    return Response({
+        'success': True,
+        'count': len(lotes),
+        'truncated': truncado,
+        'lotes': LoteUbicacionSerializer(lotes, many=True).data
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lotes_clusters(request):
+    """
+    ✅ Clusters de lotes disponibles para el mapa (conteo, centroide y área total)
+    
+    GET /api/lotes/clusters/?sur=6.20&oeste=-75.60&norte=6.28&este=-75.55&zoom=13
+    
+    Devuelve los clusters de los tiles geohash que cubren el bbox; cada tile
+    se cachea y se invalida cuando cambia un lote dentro de él.
+    """
+    try:
+        sur = _parametro_float(request, 'sur', -90, 90)
+        oeste = _parametro_float(request, 'oeste', -180, 180)
+        norte = _parametro_float(request, 'norte', -90, 90)
+        este = _parametro_float(request, 'este', -180, 180)
+        zoom = int(_parametro_float(request, 'zoom', 0, LoteClusters.ZOOM_MAX))
+        if sur > norte or oeste > este:
+            raise ValueError('El bbox debe cumplir sur <= norte y oeste <= este')
+        precision, tiles, clusters, calculados = LoteClusters.en_bbox(sur, oeste, norte, este, zoom)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    logger.debug(f"[Clusters] zoom {zoom}: {len(tiles)} tiles ({calculados} calculados), {len(clusters)} clusters")
+    
+    return Response({
+        'success': True,
+        'zoom': zoom,
+        'precision': precision,
+        'tiles': len(tiles),
+        'count': sum(cluster['count'] for cluster in clusters),
+        'clusters': clusters
+    })
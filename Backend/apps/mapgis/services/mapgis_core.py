@@ -5,11 +5,29 @@ import requests
 from typing import Dict, Optional, List
 import logging
 import json
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit
 import time
 
+from apps.common.metrics import Metrics
+
 logger = logging.getLogger(__name__)
 
+
+class MapGISSession(requests.Session):
+    """Sesión HTTP que registra la latencia de cada llamada a MapGIS"""
+
+    def request(self, method, url, *args, **kwargs):
+        operation = urlsplit(url).path.rsplit('/', 1)[-1] or 'root'
+        start = time.perf_counter()
+        error = True
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            Metrics.observe_outbound('mapgis', operation, time.perf_counter() - start, error=error)
+
+
 class MapGISCore:
     """Gestor de sesión y configuración de MapGIS"""
     
@@ -34,7 +52,7 @@ class MapGISCore:
     
     def __init__(self):
         """Inicializar sesión HTTP"""
-        self.session = requests.Session()
+        self.session = MapGISSession()
         self._configurar_headers()
         self._sesion_inicializada = False
         self._ultimo_cbml = None
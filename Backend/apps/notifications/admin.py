@@ -2,7 +2,7 @@
 Admin para notificaciones
 """
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationArchive
 
 
 @admin.register(Notification)
@@ -30,3 +30,18 @@ class NotificationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    """Admin de solo lectura para notificaciones archivadas"""
+    list_display = ['title', 'user', 'type', 'created_at', 'archived_at']
+    list_filter = ['type', 'archived_at']
+    search_fields = ['title', 'user__email']
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,152 @@
+"""
+Contadores de notificaciones no leídas en cache.
+
+`unread_count` es el endpoint más consultado: en lugar de un COUNT(*) por
+petición se mantiene un contador por usuario que se ajusta al crear, leer o
+marcar como no leída una notificación. El comando
+`reconciliar_contadores_notificaciones` corrige cualquier desviación.
+"""
+from django.db import transaction
+from django.db.models import Count
+import logging
+
+from apps.common.cache import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class UnreadCounter:
+    """Contador de no leídas por usuario (cache 'default')"""
+
+    KEY_PREFIX = 'notifications:unread:'
+
+    # Un contador sin tocar expira y se recalcula en la siguiente lectura
+    TIMEOUT = 24 * 3600
+
+    @classmethod
+    def key(cls, user_id):
+        return f"{cls.KEY_PREFIX}{user_id}"
+
+    @classmethod
+    def contar(cls, user_id):
+        """COUNT(*) sobre el índice (user, is_read)"""
+        from .models import Notification
+        return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+    @classmethod
+    def get(cls, user_id):
+        """Conteo de no leídas desde cache, o desde BD si no hay contador"""
+        cache = CacheService.get_cache()
+        try:
+            value = cache.get(cls.key(user_id))
+        except Exception as e:
+            logger.error(f"Cache GET error (unread): {str(e)}")
+            value = None
+
+        if value is not None:
+            return max(int(value), 0)
+
+        count = cls.contar(user_id)
+        try:
+            # add: no pisar un contador creado por un incremento concurrente
+            cache.add(cls.key(user_id), count, timeout=cls.TIMEOUT)
+        except Exception as e:
+            logger.error(f"Cache ADD error (unread): {str(e)}")
+        return count
+
+    @classmethod
+    def _ajustar(cls, user_id, delta):
+        """Sumar delta al contador existente. Sin contador no hace nada."""
+        cache = CacheService.get_cache()
+        key = cls.key(user_id)
+        try:
+            value = cache.incr(key, delta)
+        except ValueError:
+            # No hay contador: la siguiente lectura lo calcula
+            return None
+        except Exception as e:
+            logger.error(f"Cache INCR error (unread): {str(e)}")
+            return None
+
+        if value < 0:
+            # Desviación: descartar y recalcular en la siguiente lectura
+            cache.delete(key)
+            return None
+        return value
+
+    @classmethod
+    def _publicar(cls, user_id, count):
+        if count is None:
+            return
+        from .realtime import NotificationBroker
+        NotificationBroker.publish(user_id, 'unread_count', {'count': count})
+
+    @classmethod
+    def incrementar(cls, user_id, cantidad=1):
+        transaction.on_commit(lambda: cls._ajustar(user_id, cantidad))
+
+    @classmethod
+    def incrementar_many(cls, user_ids):
+        """+1 para varios usuarios con un solo callback on_commit"""
+        user_ids = list(user_ids)
+        transaction.on_commit(lambda: [cls._ajustar(user_id, 1) for user_id in user_ids])
+
+    @classmethod
+    def decrementar(cls, user_id, cantidad=1):
+        transaction.on_commit(
+            lambda: cls._publicar(user_id, cls._ajustar(user_id, -cantidad))
+        )
+
+    @classmethod
+    def reiniciar(cls, user_id):
+        """Todas leídas: el contador queda en 0"""
+        def _reset():
+            CacheService.set(cls.key(user_id), 0, timeout=cls.TIMEOUT)
+            cls._publicar(user_id, 0)
+        transaction.on_commit(_reset)
+
+    @classmethod
+    def reconciliar(cls, user_ids=None):
+        """
+        Corregir contadores desviados con una consulta agrupada.
+
+        Args:
+            user_ids: limitar a estos usuarios (por defecto, los que tienen
+                no leídas y los que ya tienen contador en Redis)
+
+        Returns:
+            dict: {'revisados', 'corregidos'}
+        """
+        from .models import Notification
+
+        cache = CacheService.get_cache()
+
+        reales = Notification.objects.filter(is_read=False)
+        if user_ids is not None:
+            reales = reales.filter(user_id__in=user_ids)
+        reales = dict(
+            reales.order_by().values_list('user_id').annotate(total=Count('id'))
+        )
+
+        usuarios = set(str(user_id) for user_id in (user_ids or [])) | set(str(u) for u in reales)
+        if user_ids is None and hasattr(cache, 'iter_keys'):
+            # django_redis: incluir contadores de usuarios que ya no tienen no leídas
+            for key in cache.iter_keys(f"{cls.KEY_PREFIX}*"):
+                usuarios.add(key[len(cls.KEY_PREFIX):])
+
+        reales = {str(user_id): total for user_id, total in reales.items()}
+        claves = {cls.key(user_id): user_id for user_id in usuarios}
+        cacheados = cache.get_many(list(claves)) if claves else {}
+
+        corregidos = {}
+        for key, valor in cacheados.items():
+            user_id = claves[key]
+            real = reales.get(user_id, 0)
+            if int(valor) != real:
+                corregidos[key] = real
+
+        if corregidos:
+            cache.set_many(corregidos, timeout=cls.TIMEOUT)
+            logger.info(f"🔧 {len(corregidos)} contadores de no leídas corregidos")
+
+        return {'revisados': len(cacheados), 'corregidos': len(corregidos)}
@@ -0,0 +1,46 @@
+"""
+Mueve las notificaciones leídas antiguas a la tabla de archivo.
+
+Uso (cron diario):
+    python manage.py archivar_notificaciones
+    python manage.py archivar_notificaciones --dias 60 --batch-size 2000
+    python manage.py archivar_notificaciones --dry-run
+    python manage.py archivar_notificaciones --metricas
+"""
+from django.core.management.base import BaseCommand
+import json
+
+from apps.notifications.retention import NotificationRetentionService
+
+
+class Command(BaseCommand):
+    help = 'Archiva notificaciones leídas con más de N días'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help='Antigüedad mínima (por defecto NOTIFICATIONS_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Notificaciones por lote')
+        parser.add_argument('--max-lotes', type=int, default=None, help='Detener tras N lotes')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar candidatas')
+        parser.add_argument('--metricas', action='store_true', help='Mostrar métricas sin archivar')
+
+    def handle(self, *args, **options):
+        if options['metricas']:
+            metricas = NotificationRetentionService.metricas(dias=options['dias'])
+            self.stdout.write(json.dumps(metricas, indent=2, default=str))
+            return
+
+        resultado = NotificationRetentionService.archivar(
+            dias=options['dias'],
+            batch_size=options['batch_size'],
+            max_lotes=options['max_lotes'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"🔍 {resultado['candidatas']} notificaciones para archivar (antes de {resultado['cutoff']})")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['archivadas']} notificaciones archivadas en {resultado['lotes']} lotes "
+            f"({resultado['segundos']}s)"
+        ))
@@ -0,0 +1,32 @@
+"""
+Corrige los contadores de no leídas en cache contra la base de datos.
+
+Uso (cron cada 10 minutos, o en bucle):
+    python manage.py reconciliar_contadores_notificaciones
+    python manage.py reconciliar_contadores_notificaciones --intervalo 600
+"""
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from apps.notifications.counters import UnreadCounter
+
+
+class Command(BaseCommand):
+    help = 'Reconcilia los contadores de notificaciones no leídas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='user_ids', help='Limitar a un usuario (repetible)')
+        parser.add_argument('--intervalo', type=int, default=0, help='Repetir cada N segundos (0 = una vez)')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            resultado = UnreadCounter.reconciliar(user_ids=options['user_ids'])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {resultado['revisados']} contadores revisados, {resultado['corregidos']} corregidos"
+            ))
+
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("notifications", "0003_alter_notification_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationArchive",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("type", models.CharField(max_length=50, verbose_name="Tipo")),
+                ("title", models.CharField(max_length=255, verbose_name="Título")),
+                ("message", models.TextField(verbose_name="Mensaje")),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="priority, lote_id, document_id, solicitud_id, action_url y data",
+                        verbose_name="Datos",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(verbose_name="Fecha de Creación")),
+                (
+                    "read_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de Lectura"
+                    ),
+                ),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de Archivo"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notifications_archive",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Notificación Archivada",
+                "verbose_name_plural": "Notificaciones Archivadas",
+                "db_table": "notifications_notification_archive",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at"],
+                        name="notificatio_user_id_24d10f_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", True)),
+                fields=["created_at"],
+                name="notif_leidas_created_idx",
+            ),
+        ),
+    ]
@@ -6,6 +6,8 @@ from django.conf import settings
 import uuid
 import logging
 
+from .counters import UnreadCounter
+
 logger = logging.getLogger(__name__)
 
 
@@ -86,24 +88,86 @@ class Notification(models.Model):
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['type', '-created_at']),
+            # ✅ Lotes del archivado de retención (leídas más antiguas primero)
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(is_read=True),
+                name='notif_leidas_created_idx'
+            ),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.user.email} ({'leída' if self.is_read else 'no leída'})"
     
     def mark_as_read(self):
-        """Marcar notificación como leída"""
-        if not self.is_read:
-            from django.utils import timezone
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save()
+        """
+        Marcar notificación como leída.
+        
+        UPDATE condicional: con dos peticiones simultáneas solo una cambia la
+        fila, y solo esa ajusta el contador de no leídas.
+        """
+        from django.utils import timezone
+        read_at = timezone.now()
+        actualizadas = Notification.objects.filter(pk=self.pk, is_read=False).update(
+            is_read=True,
+            read_at=read_at
+        )
+        self.is_read = True
+        if actualizadas == 1:
+            self.read_at = read_at
+            UnreadCounter.decrementar(self.user_id)
             logger.info(f"Notification {self.id} marked as read by {self.user.email}")
     
     def mark_as_unread(self):
-        """Marcar notificación como no leída"""
-        if self.is_read:
-            self.is_read = False
-            self.read_at = None
-            self.save()
+        """Marcar notificación como no leída (UPDATE condicional, como mark_as_read)"""
+        actualizadas = Notification.objects.filter(pk=self.pk, is_read=True).update(
+            is_read=False,
+            read_at=None
+        )
+        self.is_read = False
+        self.read_at = None
+        if actualizadas == 1:
+            UnreadCounter.incrementar(self.user_id)
             logger.info(f"Notification {self.id} marked as unread by {self.user.email}")
+
+
+class NotificationArchive(models.Model):
+    """
+    Notificaciones leídas antiguas movidas fuera de la tabla principal.
+    
+    `apps.notifications.retention` mueve aquí las notificaciones leídas con
+    más de NOTIFICATIONS_RETENTION_DAYS días, para que la tabla consultada por
+    el listado y `recent` no crezca indefinidamente. Los campos poco usados
+    se guardan juntos en `payload`.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notifications_archive',
+        verbose_name='Usuario'
+    )
+    type = models.CharField(max_length=50, verbose_name='Tipo')
+    title = models.CharField(max_length=255, verbose_name='Título')
+    message = models.TextField(verbose_name='Mensaje')
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Datos',
+        help_text='priority, lote_id, document_id, solicitud_id, action_url y data'
+    )
+    created_at = models.DateTimeField(verbose_name='Fecha de Creación')
+    read_at = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Lectura')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Archivo')
+    
+    class Meta:
+        verbose_name = 'Notificación Archivada'
+        verbose_name_plural = 'Notificaciones Archivadas'
+        ordering = ['-created_at']
+        db_table = 'notifications_notification_archive'
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} (archivada)"
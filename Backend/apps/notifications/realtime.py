@@ -0,0 +1,231 @@
+"""
+Entrega de notificaciones en tiempo real (Server-Sent Events).
+
+`NotificationService.create_notification` publica cada notificación nueva en
+el canal Redis del usuario; el endpoint `stream/` mantiene la conexión SSE
+abierta y reenvía los mensajes. Con Redis el fan-out funciona entre todos los
+workers; sin Redis (desarrollo con LocMemCache) se usa un broker en memoria
+del proceso.
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event=None, data=None, id=None, comment=None):
+    """Serializar un mensaje en formato text/event-stream"""
+    lineas = []
+    if comment is not None:
+        lineas.append(f": {comment}")
+    if id is not None:
+        lineas.append(f"id: {id}")
+    if event is not None:
+        lineas.append(f"event: {event}")
+    if data is not None:
+        texto = data if isinstance(data, str) else json.dumps(data, cls=DjangoJSONEncoder)
+        lineas.extend(f"data: {linea}" for linea in texto.splitlines() or [''])
+    return "\n".join(lineas) + "\n\n"
+
+
+class _SyncSubscriber:
+    """Suscriptor local para conexiones servidas por WSGI (hilo bloqueante)"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def put(self, message):
+        self.queue.put(message)
+
+
+class _AsyncSubscriber:
+    """Suscriptor local para conexiones servidas por ASGI (event loop)"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, message):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+
+class NotificationBroker:
+    """
+    Publicación y suscripción de eventos de notificaciones por usuario.
+    """
+
+    CHANNEL_PREFIX = 'lateral360:notifications:'
+
+    _local_subscribers = {}
+    _local_lock = threading.Lock()
+
+    @classmethod
+    def channel(cls, user_id):
+        return f"{cls.CHANNEL_PREFIX}{user_id}"
+
+    @staticmethod
+    def get_redis_url():
+        """URL de Redis del cache por defecto, o None si no se usa django_redis"""
+        cache_config = settings.CACHES.get('default', {})
+        if 'django_redis' not in cache_config.get('BACKEND', ''):
+            return None
+        return cache_config.get('LOCATION')
+
+    @staticmethod
+    def _redis():
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception:
+            return None
+
+    @classmethod
+    def publish(cls, user_id, event, payload):
+        """Publicar un evento para un usuario (no lanza excepciones)"""
+        message = json.dumps({'event': event, 'data': payload}, cls=DjangoJSONEncoder)
+
+        if cls.get_redis_url():
+            try:
+                cls._redis().publish(cls.channel(user_id), message)
+                return
+            except Exception as e:
+                logger.error(f"❌ Error publicando notificación en Redis: {str(e)}")
+                return
+
+        with cls._local_lock:
+            subscribers = list(cls._local_subscribers.get(str(user_id), ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    @classmethod
+    def publish_batch(cls, event, payload, ids_por_usuario):
+        """
+        Publicar un evento común para muchos usuarios.
+
+        Cada usuario recibe el mensaje en su propio canal (las conexiones SSE
+        solo escuchan el suyo); con Redis todos los PUBLISH del lote van en
+        un pipeline, un solo viaje de red.
+
+        Args:
+            payload: datos comunes del evento
+            ids_por_usuario: {user_id: id del evento para ese usuario}
+        """
+        messages = {
+            str(user_id): json.dumps(
+                {'event': event, 'data': dict(payload, id=event_id)},
+                cls=DjangoJSONEncoder
+            )
+            for user_id, event_id in ids_por_usuario.items()
+        }
+
+        if cls.get_redis_url():
+            try:
+                pipe = cls._redis().pipeline(transaction=False)
+                for user_id, message in messages.items():
+                    pipe.publish(cls.channel(user_id), message)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"❌ Error publicando lote de notificaciones en Redis: {str(e)}")
+            return
+
+        with cls._local_lock:
+            destinos = [
+                (subscriber, message)
+                for user_id, message in messages.items()
+                for subscriber in cls._local_subscribers.get(user_id, ())
+            ]
+        for subscriber, message in destinos:
+            subscriber.put(message)
+
+    @classmethod
+    def publish_batch_on_commit(cls, event, payload, ids_por_usuario):
+        transaction.on_commit(lambda: cls.publish_batch(event, payload, ids_por_usuario))
+
+    @classmethod
+    def publish_on_commit(cls, user_id, event, payload):
+        """Publicar cuando la transacción actual confirme (evita leer filas no confirmadas)"""
+        transaction.on_commit(lambda: cls.publish(user_id, event, payload))
+
+    @classmethod
+    def _register(cls, user_id, subscriber):
+        with cls._local_lock:
+            cls._local_subscribers.setdefault(str(user_id), set()).add(subscriber)
+
+    @classmethod
+    def _unregister(cls, user_id, subscriber):
+        with cls._local_lock:
+            subscribers = cls._local_subscribers.get(str(user_id))
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    cls._local_subscribers.pop(str(user_id), None)
+
+    @classmethod
+    async def listen(cls, user_id, timeout):
+        """
+        Generador asíncrono de eventos del usuario.
+
+        Produce el evento decodificado o None cuando pasan `timeout` segundos
+        sin mensajes (para enviar heartbeats).
+        """
+        redis_url = cls.get_redis_url()
+
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            client = aioredis.from_url(redis_url)
+            pubsub = client.pubsub()
+            await pubsub.subscribe(cls.channel(user_id))
+            try:
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=timeout
+                    )
+                    yield json.loads(message['data']) if message else None
+            finally:
+                await pubsub.unsubscribe()
+                await pubsub.aclose()
+                await client.aclose()
+        else:
+            subscriber = _AsyncSubscriber()
+            cls._register(user_id, subscriber)
+            try:
+                while True:
+                    try:
+                        message = await asyncio.wait_for(subscriber.queue.get(), timeout)
+                        yield json.loads(message)
+                    except asyncio.TimeoutError:
+                        yield None
+            finally:
+                cls._unregister(user_id, subscriber)
+
+    @classmethod
+    def listen_sync(cls, user_id, timeout):
+        """Equivalente bloqueante de `listen` para servidores WSGI (runserver)"""
+        if cls.get_redis_url():
+            pubsub = cls._redis().pubsub()
+            pubsub.subscribe(cls.channel(user_id))
+            try:
+                while True:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                    yield json.loads(message['data']) if message else None
+            finally:
+                pubsub.close()
+        else:
+            subscriber = _SyncSubscriber()
+            cls._register(user_id, subscriber)
+            try:
+                while True:
+                    try:
+                        yield json.loads(subscriber.queue.get(timeout=timeout))
+                    except queue.Empty:
+                        yield None
+            finally:
+                cls._unregister(user_id, subscriber)
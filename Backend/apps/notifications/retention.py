@@ -0,0 +1,173 @@
+"""
+Retención de notificaciones.
+
+Las notificaciones leídas con más de NOTIFICATIONS_RETENTION_DAYS días se
+mueven por lotes a NotificationArchive. Así la tabla principal (y sus índices
+`(user, -created_at)` y `(user, is_read)`) se mantiene acotada a lo reciente
+y a lo no leído.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+import logging
+import time
+import uuid
+
+from apps.common.cache import CacheService
+from .models import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationRetentionService:
+    """Archivado por lotes y métricas de la tabla de notificaciones"""
+
+    LAST_RUN_KEY = 'notifications:retention:last_run'
+
+    @staticmethod
+    def get_retention_days():
+        return getattr(settings, 'NOTIFICATIONS_RETENTION_DAYS', 90)
+
+    @staticmethod
+    def get_batch_size():
+        return getattr(settings, 'NOTIFICATIONS_ARCHIVE_BATCH_SIZE', 1000)
+
+    @classmethod
+    def get_cutoff(cls, dias=None):
+        dias = cls.get_retention_days() if dias is None else dias
+        return timezone.now() - timedelta(days=dias)
+
+    @classmethod
+    def candidatas(cls, cutoff):
+        """Notificaciones leídas anteriores al corte"""
+        return Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+    @staticmethod
+    def _payload(fila):
+        """Campos opcionales de la notificación (UUID como texto: JSON)"""
+        payload = {}
+        for campo in ('priority', 'lote_id', 'document_id', 'solicitud_id', 'action_url', 'data'):
+            valor = fila[campo]
+            if valor in (None, {}, ''):
+                continue
+            payload[campo] = str(valor) if isinstance(valor, uuid.UUID) else valor
+        return payload
+
+    @classmethod
+    def _archivar_lote(cls, cutoff, batch_size):
+        """
+        Mover un lote a la tabla de archivo en una transacción.
+
+        Returns:
+            int: notificaciones movidas (0 si no quedan)
+        """
+        with transaction.atomic():
+            filas = list(
+                Notification.objects
+                .select_for_update(skip_locked=True)
+                .filter(is_read=True, created_at__lt=cutoff)
+                .order_by('created_at')
+                .values(
+                    'id', 'user_id', 'type', 'title', 'message', 'priority',
+                    'lote_id', 'document_id', 'solicitud_id', 'action_url',
+                    'data', 'created_at', 'read_at'
+                )[:batch_size]
+            )
+            if not filas:
+                return 0
+
+            NotificationArchive.objects.bulk_create(
+                [
+                    NotificationArchive(
+                        id=fila['id'],
+                        user_id=fila['user_id'],
+                        type=fila['type'],
+                        title=fila['title'],
+                        message=fila['message'],
+                        payload=cls._payload(fila),
+                        created_at=fila['created_at'],
+                        read_at=fila['read_at'],
+                    )
+                    for fila in filas
+                ],
+                ignore_conflicts=True
+            )
+            Notification.objects.filter(pk__in=[fila['id'] for fila in filas]).delete()
+            return len(filas)
+
+    @classmethod
+    def archivar(cls, dias=None, batch_size=None, max_lotes=None, dry_run=False):
+        """
+        Archivar notificaciones leídas antiguas por lotes.
+
+        Cada lote es una transacción corta, así que puede ejecutarse con la
+        aplicación en marcha.
+
+        Args:
+            dias: antigüedad mínima (por defecto NOTIFICATIONS_RETENTION_DAYS)
+            batch_size: notificaciones por lote
+            max_lotes: detener tras N lotes (None = hasta terminar)
+            dry_run: solo contar candidatas
+
+        Returns:
+            dict: métricas de la ejecución
+        """
+        cutoff = cls.get_cutoff(dias)
+        batch_size = batch_size or cls.get_batch_size()
+
+        if dry_run:
+            return {
+                'cutoff': cutoff.isoformat(),
+                'candidatas': cls.candidatas(cutoff).count(),
+                'archivadas': 0,
+                'lotes': 0,
+                'segundos': 0,
+                'dry_run': True,
+            }
+
+        inicio = time.monotonic()
+        archivadas = 0
+        lotes = 0
+        while max_lotes is None or lotes < max_lotes:
+            movidas = cls._archivar_lote(cutoff, batch_size)
+            if not movidas:
+                break
+            archivadas += movidas
+            lotes += 1
+            logger.debug(f"📦 Lote {lotes}: {movidas} notificaciones archivadas")
+
+        resultado = {
+            'cutoff': cutoff.isoformat(),
+            'archivadas': archivadas,
+            'lotes': lotes,
+            'segundos': round(time.monotonic() - inicio, 2),
+            'ejecutado_en': timezone.now().isoformat(),
+        }
+        CacheService.set(cls.LAST_RUN_KEY, resultado, timeout=None)
+        logger.info(f"📦 {archivadas} notificaciones archivadas en {lotes} lotes ({resultado['segundos']}s)")
+        return resultado
+
+    @staticmethod
+    def tamano_tabla(model):
+        """Tamaño en bytes de la tabla e índices (solo PostgreSQL)"""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_total_relation_size(%s)", [model._meta.db_table])
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def metricas(cls, dias=None):
+        """Estado de la tabla principal y del archivo"""
+        cutoff = cls.get_cutoff(dias)
+        return {
+            'retencion_dias': cls.get_retention_days() if dias is None else dias,
+            'activas': Notification.objects.count(),
+            'no_leidas': Notification.objects.filter(is_read=False).count(),
+            'pendientes_archivar': cls.candidatas(cutoff).count(),
+            'archivadas': NotificationArchive.objects.count(),
+            'bytes_activas': cls.tamano_tabla(Notification),
+            'bytes_archivo': cls.tamano_tabla(NotificationArchive),
+            'ultima_ejecucion': CacheService.get(cls.LAST_RUN_KEY),
+        }
@@ -2,6 +2,8 @@
 Servicio para crear y gestionar notificaciones
 """
 from django.utils import timezone
+import itertools
+from .counters import UnreadCounter
 from .models import Notification
 import logging
 
@@ -42,6 +44,11 @@ class NotificationService:
                 action_url=kwargs.get('action_url')
             )
             
+            UnreadCounter.incrementar(notification.user_id)
+            
+            # ✅ Tiempo real: enviar a las conexiones SSE del usuario
+            NotificationService.publicar(notification)
+            
             logger.info(f"✅ Notification created: {type} for {user.email}")
             return notification
             
@@ -49,6 +56,99 @@ class NotificationService:
             logger.error(f"❌ Error creating notification: {str(e)}")
             return None
     
+    @staticmethod
+    def publicar(notification):
+        """Publicar la notificación en el canal en tiempo real del usuario"""
+        from .realtime import NotificationBroker
+        from .serializers import NotificationSerializer
+        
+        try:
+            NotificationBroker.publish_on_commit(
+                notification.user_id,
+                'notification',
+                NotificationSerializer(notification).data
+            )
+        except Exception as e:
+            logger.error(f"❌ Error publicando notificación {notification.id}: {str(e)}")
+    
+    # Tamaño de lote para bulk_create en notify_many
+    BULK_BATCH_SIZE = 500
+    
+    @staticmethod
+    def _iter_user_ids(recipients):
+        """IDs de destinatarios desde un queryset, usuarios o IDs"""
+        from django.db.models import QuerySet
+        
+        if isinstance(recipients, QuerySet):
+            yield from recipients.values_list('pk', flat=True).iterator()
+            return
+        for recipient in recipients:
+            yield getattr(recipient, 'pk', recipient)
+    
+    @staticmethod
+    def notify_many(recipients, type, title, message, batch_size=None, **kwargs):
+        """
+        Crea la misma notificación para muchos usuarios
+        
+        El contenido se arma una sola vez; las filas se insertan con
+        bulk_create por lotes y cada lote se publica en tiempo real con un
+        único mensaje pub/sub.
+        
+        Args:
+            recipients: QuerySet de usuarios, lista de usuarios o de IDs
+            type, title, message: Igual que create_notification
+            batch_size: Filas por INSERT (por defecto BULK_BATCH_SIZE)
+            **kwargs: Campos opcionales (priority, lote_id, data, etc.)
+        
+        Returns:
+            int: Notificaciones creadas
+        """
+        from .realtime import NotificationBroker
+        from .serializers import NotificationSerializer
+        
+        batch_size = batch_size or NotificationService.BULK_BATCH_SIZE
+        campos = {
+            'type': type,
+            'title': title,
+            'message': message,
+            'priority': kwargs.get('priority', 'normal'),
+            'lote_id': kwargs.get('lote_id'),
+            'document_id': kwargs.get('document_id'),
+            'solicitud_id': kwargs.get('solicitud_id'),
+            'data': kwargs.get('data', {}),
+            'action_url': kwargs.get('action_url'),
+        }
+        
+        total = 0
+        try:
+            user_ids = NotificationService._iter_user_ids(recipients)
+            while True:
+                lote_ids = list(itertools.islice(user_ids, batch_size))
+                if not lote_ids:
+                    break
+                
+                notifications = Notification.objects.bulk_create([
+                    Notification(user_id=user_id, **campos) for user_id in lote_ids
+                ])
+                total += len(notifications)
+                
+                UnreadCounter.incrementar_many(lote_ids)
+                
+                # ✅ Payload serializado una vez por lote, solo cambia el id
+                payload = NotificationSerializer(notifications[0]).data
+                NotificationBroker.publish_batch_on_commit(
+                    'notification',
+                    payload,
+                    {str(n.user_id): str(n.id) for n in notifications}
+                )
+            
+            logger.info(f"✅ {total} notifications created: {type}")
+            return total
+            
+        except Exception as e:
+            logger.error(f"❌ Error creating notifications in bulk: {str(e)}")
+            return total
+    
     # ✅ Métodos específicos para cada tipo de evento - RUTAS CORREGIDAS
     
     @staticmethod
@@ -131,6 +231,72 @@ class NotificationService:
             }
         )
     
+    @staticmethod
+    def notify_documentos_procesados(documents, status, reason=None):
+        """
+        Notificar una validación masiva: una sola notificación por propietario.
+        
+        Args:
+            documents: Documentos validados o rechazados
+            status: 'validado' o 'rechazado'
+            reason: Razón del rechazo (si aplica)
+        
+        Returns:
+            list: Notificaciones creadas
+        """
+        documents_by_user = {}
+        for document in documents:
+            documents_by_user.setdefault(document.user_id, []).append(document)
+        
+        notifications = []
+        for user_documents in documents_by_user.values():
+            # Un solo documento: mantener la notificación individual
+            if len(user_documents) == 1:
+                if status == 'validado':
+                    notification = NotificationService.notify_documento_validado(user_documents[0])
+                else:
+                    notification = NotificationService.notify_documento_rechazado(user_documents[0], reason)
+                notifications.append(notification)
+                continue
+            
+            lote_ids = {document.lote_id for document in user_documents}
+            lote_id = lote_ids.pop() if len(lote_ids) == 1 else None
+            action_url = f'/owner/lote/{lote_id}/documentos' if lote_id else None
+            
+            count = len(user_documents)
+            if status == 'validado':
+                title = '✅ Documentos Validados'
+                message = f'{count} de tus documentos han sido validados.'
+                priority = 'normal'
+            else:
+                title = '❌ Documentos Rechazados'
+                message = f'{count} de tus documentos fueron rechazados. Razón: {reason}'
+                priority = 'high'
+            
+            notifications.append(NotificationService.create_notification(
+                user=user_documents[0].user,
+                type=f'documento_{status}',
+                title=title,
+                message=message,
+                priority=priority,
+                lote_id=lote_id,
+                action_url=action_url,
+                data={
+                    'documentos': [
+                        {
+                            'id': str(document.id),
+                            'titulo': document.title,
+                            'tipo': document.document_type,
+                        }
+                        for document in user_documents
+                    ],
+                    'total': count,
+                    'razon_rechazo': reason,
+                }
+            ))
+        
+        return notifications
+    
     @staticmethod
     def notify_solicitud_respondida(solicitud):
         """Notificar cuando una solicitud es respondida"""
@@ -151,8 +317,8 @@ class NotificationService:
     
     @staticmethod
     def get_unread_count(user):
-        """Obtener conteo de notificaciones no leídas"""
-        return Notification.objects.filter(user=user, is_read=False).count()
+        """Obtener conteo de notificaciones no leídas (contador en cache)"""
+        return UnreadCounter.get(user.pk)
     
     @staticmethod
     def mark_all_as_read(user):
@@ -164,6 +330,7 @@ class NotificationService:
             is_read=True,
             read_at=timezone.now()
         )
+        UnreadCounter.reiniciar(user.pk)
         logger.info(f"Marked {updated} notifications as read for {user.email}")
         return updated
     
@@ -180,22 +347,21 @@ class NotificationService:
             # Notificar a todos los admins
             admins = User.objects.filter(role='admin', is_active=True)
             
-            for admin in admins:
-                NotificationService.create_notification(
-                    user=admin,
-                    type='analisis_solicitado',
-                    title='Nueva Solicitud de Análisis',
-                    message=f"Nueva solicitud de análisis {analisis.get_tipo_analisis_display()} "
-                            f"para el lote {analisis.lote.nombre} por {analisis.solicitante.get_full_name()}",
-                    priority='high',
-                    action_url=f'/admin/analisis/{analisis.id}',
-                    data={
-                        'analisis_id': str(analisis.id),
-                        'tipo': analisis.tipo_analisis,
-                        'lote_id': str(analisis.lote.id),
-                        'solicitante': analisis.solicitante.email
-                    }
-                )
+            NotificationService.notify_many(
+                admins,
+                type='analisis_solicitado',
+                title='Nueva Solicitud de Análisis',
+                message=f"Nueva solicitud de análisis {analisis.get_tipo_analisis_display()} "
+                        f"para el lote {analisis.lote.nombre} por {analisis.solicitante.get_full_name()}",
+                priority='high',
+                action_url=f'/admin/analisis/{analisis.id}',
+                data={
+                    'analisis_id': str(analisis.id),
+                    'tipo': analisis.tipo_analisis,
+                    'lote_id': str(analisis.lote.id),
+                    'solicitante': analisis.solicitante.email
+                }
+            )
             
             logger.info(f"✅ Admins notificados sobre nueva solicitud de análisis {analisis.id}")
             
@@ -257,6 +423,25 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Error notificando análisis rechazado: {str(e)}")
     
+    @staticmethod
+    def _contenido_lote_recomendado(lote, match_reasons):
+        """Campos de la notificación de lote recomendado"""
+        return {
+            'type': 'lote_recomendado',
+            'title': f'🎯 Nuevo lote recomendado: {lote.nombre or lote.cbml}',
+            'message': f'Encontramos un lote que coincide con tu perfil por: {match_reasons}.',
+            'lote_id': lote.id,
+            'action_url': f'/developer/lote/{lote.id}',
+            'data': {
+                'lote_id': str(lote.id),
+                'lote_nombre': lote.nombre,
+                'lote_direccion': lote.direccion,
+                'lote_area': str(lote.area),
+                'match_reasons': match_reasons,
+                'accion': 'ver_lote'
+            }
+        }
+    
     @staticmethod
     def notify_lote_recomendado(user, lote, match_reasons):
         """
@@ -267,23 +452,23 @@ class NotificationService:
             lote: Lote que coincide
             match_reasons: String con razones del match
         """
-        from .models import Notification
-        
-        notification = Notification.objects.create(
+        notification = NotificationService.create_notification(
             user=user,
-            tipo='lote_recomendado',
-            titulo=f'🎯 Nuevo lote recomendado: {lote.nombre or lote.cbml}',
-            mensaje=f'Encontramos un lote que coincide con tu perfil por: {match_reasons}.',
-            link=f'/developer/lote/{lote.id}',
-            metadata={
-                'lote_id': str(lote.id),
-                'lote_nombre': lote.nombre,
-                'lote_direccion': lote.direccion,
-                'lote_area': str(lote.area),
-                'match_reasons': match_reasons,
-                'accion': 'ver_lote'
-            }
+            **NotificationService._contenido_lote_recomendado(lote, match_reasons)
         )
         
         logger.info(f"✅ Notificación de recomendación creada para {user.email}")
         return notification
+    
+    @staticmethod
+    def notify_lotes_recomendados(users, lote, match_reasons):
+        """
+        Notificar el mismo lote recomendado a varios developers (notify_many)
+        
+        Returns:
+            int: Notificaciones creadas
+        """
+        return NotificationService.notify_many(
+            users,
+            **NotificationService._contenido_lote_recomendado(lote, match_reasons)
+        )
@@ -11,5 +11,7 @@ router = DefaultRouter()
 router.register(r'', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    # Antes del router: 'stream/' no debe resolverse como detalle
+    path('stream/', views.notification_stream, name='notification-stream'),
     path('', include(router.urls)),
 ]
@@ -7,9 +7,20 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 import logging
+import time
+import uuid
 
+from apps.authentication.authentication import CachedJWTAuthentication
+from .counters import UnreadCounter
 from .models import Notification
+from .realtime import NotificationBroker, format_sse
 from .serializers import NotificationSerializer
 from .services import NotificationService
 
@@ -31,6 +42,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Solo notificaciones del usuario actual"""
         return Notification.objects.filter(user=self.request.user)
     
+    def perform_destroy(self, instance):
+        """Eliminar y mantener el contador de no leídas"""
+        was_unread = not instance.is_read
+        instance.delete()
+        if was_unread:
+            UnreadCounter.decrementar(instance.user_id)
+    
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Obtener conteo de no leídas"""
@@ -73,3 +91,108 @@ class NotificationViewSet(viewsets.ModelViewSet):
         notifications = self.get_queryset()[:10]
         serializer = self.get_serializer(notifications, many=True)
         return Response(serializer.data)
+
+
+# =============================================================================
+# STREAM EN TIEMPO REAL (SSE)
+# =============================================================================
+
+def _autenticar_stream(request):
+    """Usuario del header Authorization: Bearer <access>, o None"""
+    auth = CachedJWTAuthentication()
+    try:
+        result = auth.authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def _eventos_iniciales(user, last_event_id):
+    """
+    Mensajes al conectar: notificaciones perdidas desde Last-Event-ID
+    (reconexión) y conteo de no leídas. Un Last-Event-ID que no es UUID se
+    ignora.
+    """
+    mensajes = [format_sse(comment='conectado') + 'retry: 5000\n\n']
+    
+    if last_event_id:
+        try:
+            last_event_id = uuid.UUID(str(last_event_id))
+        except ValueError:
+            last_event_id = None
+    
+    if last_event_id:
+        ultima = Notification.objects.filter(user=user, pk=last_event_id).values('created_at').first()
+        if ultima:
+            perdidas = Notification.objects.filter(
+                user=user, created_at__gt=ultima['created_at']
+            ).order_by('created_at')[:50]
+            for notification in perdidas:
+                mensajes.append(format_sse(
+                    event='notification',
+                    data=NotificationSerializer(notification).data,
+                    id=notification.id
+                ))
+    
+    mensajes.append(format_sse(
+        event='unread_count',
+        data={'count': NotificationService.get_unread_count(user)}
+    ))
+    return mensajes
+
+
+def _format_evento(evento):
+    data = evento['data']
+    event_id = data.get('id') if evento['event'] == 'notification' and isinstance(data, dict) else None
+    return format_sse(event=evento['event'], data=data, id=event_id)
+
+
+async def notification_stream(request):
+    """
+    Stream SSE de notificaciones del usuario autenticado
+    GET /api/notifications/stream/
+    
+    Eventos:
+    - `notification`: notificación nueva (mismo formato que el listado)
+    - `unread_count`: conteo de no leídas al conectar
+    
+    La conexión se cierra tras NOTIFICATIONS_STREAM_MAX_SECONDS; el cliente
+    reconecta con Last-Event-ID y recibe lo que se haya perdido.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    
+    user = await sync_to_async(_autenticar_stream)(request)
+    if user is None:
+        return JsonResponse({'detail': 'No autenticado'}, status=401)
+    
+    heartbeat = getattr(settings, 'NOTIFICATIONS_STREAM_HEARTBEAT', 15)
+    max_seconds = getattr(settings, 'NOTIFICATIONS_STREAM_MAX_SECONDS', 300)
+    last_event_id = request.headers.get('Last-Event-ID')
+    
+    iniciales = await sync_to_async(_eventos_iniciales)(user, last_event_id)
+    
+    async def stream_async():
+        # ✅ ASGI: la conexión espera en el event loop, sin ocupar un worker
+        inicio = time.monotonic()
+        for mensaje in iniciales:
+            yield mensaje
+        async for evento in NotificationBroker.listen(user.id, heartbeat):
+            yield format_sse(comment='ping') if evento is None else _format_evento(evento)
+            if time.monotonic() - inicio >= max_seconds:
+                break
+    
+    def stream_sync():
+        # WSGI (runserver): la conexión ocupa un hilo mientras está abierta
+        inicio = time.monotonic()
+        yield from iniciales
+        for evento in NotificationBroker.listen_sync(user.id, heartbeat):
+            yield format_sse(comment='ping') if evento is None else _format_evento(evento)
+            if time.monotonic() - inicio >= max_seconds:
+                break
+    
+    stream = stream_async() if isinstance(request, ASGIRequest) else stream_sync()
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
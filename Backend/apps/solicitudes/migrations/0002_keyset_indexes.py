@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("solicitudes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="solicitud",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="solicitud_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="solicitud",
+            index=models.Index(
+                fields=["usuario", "-created_at", "-id"],
+                name="solicitud_usuario_keyset_idx",
+            ),
+        ),
+    ]
@@ -141,6 +141,9 @@ class Solicitud(models.Model):
             models.Index(fields=['tipo', 'estado']),
             models.Index(fields=['lote', 'estado']),
             models.Index(fields=['prioridad', '-created_at']),
+            # ✅ Paginación keyset (created_at, id) global y por usuario
+            models.Index(fields=['-created_at', '-id'], name='solicitud_keyset_idx'),
+            models.Index(fields=['usuario', '-created_at', '-id'], name='solicitud_usuario_keyset_idx'),
         ]
     
     def __str__(self):
@@ -0,0 +1,63 @@
+"""
+Servicios para solicitudes
+"""
+from django.db.models import Count
+import logging
+
+from apps.common.cache import CacheService
+from .models import Solicitud
+
+logger = logging.getLogger(__name__)
+
+
+class SolicitudResumenService:
+    """
+    Resumen de solicitudes por estado.
+
+    Se calcula con una sola consulta agrupada y se cachea por usuario (y uno
+    global para staff). Las vistas lo invalidan al crear, editar, eliminar o
+    cambiar el estado de una solicitud.
+    """
+
+    CACHE_NAMESPACE = 'solicitudes_resumen'
+    CACHE_TIMEOUT = 300
+
+    @classmethod
+    def cache_key(cls, usuario_id=None):
+        return f"{cls.CACHE_NAMESPACE}:{usuario_id or 'all'}"
+
+    @staticmethod
+    def calcular(usuario_id=None):
+        """Conteo por estado (1 consulta)"""
+        solicitudes = Solicitud.objects.order_by()
+        if usuario_id:
+            solicitudes = solicitudes.filter(usuario_id=usuario_id)
+
+        por_estado = {estado: 0 for estado, _ in Solicitud.ESTADO_CHOICES}
+        for estado, count in solicitudes.values_list('estado').annotate(count=Count('id')):
+            por_estado[estado] = count
+
+        return {
+            'total': sum(por_estado.values()),
+            'pendientes': por_estado.get('pendiente', 0),
+            'completadas': por_estado.get('completado', 0),
+            'por_estado': por_estado,
+        }
+
+    @classmethod
+    def get_resumen(cls, user):
+        """Resumen del usuario (o de todas las solicitudes si es staff)"""
+        usuario_id = None if user.is_staff else user.pk
+        return CacheService.get_or_set(
+            cls.cache_key(usuario_id),
+            lambda: cls.calcular(usuario_id),
+            timeout=cls.CACHE_TIMEOUT,
+            raise_errors=True
+        )
+
+    @classmethod
+    def invalidar(cls, usuario_id):
+        """Invalidar el resumen del usuario y el global"""
+        CacheService.delete(cls.cache_key(usuario_id))
+        CacheService.delete(cls.cache_key())
+        logger.debug(f"🔄 Resumen de solicitudes invalidado: {usuario_id}")
@@ -5,6 +5,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 import logging
@@ -15,11 +16,24 @@ from .serializers import (
     SolicitudCreateSerializer,
     SolicitudUpdateSerializer
 )
+from .services import SolicitudResumenService
 from apps.notifications.services import NotificationService
 
 logger = logging.getLogger(__name__)
 
 
+class SolicitudCursorPagination(CursorPagination):
+    """
+    Paginación keyset: WHERE created_at < cursor en lugar de OFFSET, sin
+    COUNT(*) por página. El orden lo define OrderingFilter (por defecto
+    -created_at, -id).
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
 class SolicitudViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar solicitudes
@@ -31,7 +45,8 @@ class SolicitudViewSet(viewsets.ModelViewSet):
     filterset_fields = ['tipo', 'estado', 'prioridad']
     search_fields = ['titulo', 'descripcion']
     ordering_fields = ['created_at', 'updated_at', 'prioridad']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = SolicitudCursorPagination
     
     def get_queryset(self):
         """✅ CRÍTICO: Incluir select_related para evitar N+1 queries"""
@@ -42,36 +57,14 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             'usuario',
             'revisor',
             'lote'
-        ).order_by('-created_at')
-        
-        # ✅ NUEVO: Logging detallado
-        logger.info("="*60)
-        logger.info(f"[SolicitudViewSet] User: {user.email}")
-        logger.info(f"[SolicitudViewSet] Role: {user.role}")
+        )
         
-        # Admin ve todas
-        if user.is_staff:
-            total = queryset.count()
-            logger.info(f"[SolicitudViewSet] Admin viewing all: {total} solicitudes")
-            
-            # ✅ NUEVO: Mostrar primeras solicitudes para debug
-            if total > 0:
-                first = queryset.first()
-                logger.info(f"[SolicitudViewSet] First solicitud:")
-                logger.info(f"  - ID: {first.id}")
-                logger.info(f"  - Titulo: {first.titulo}")
-                logger.info(f"  - Usuario: {first.usuario.email}")
-                logger.info(f"  - Estado: {first.estado}")
-                logger.info(f"  - Notas: {first.notas_revision}")
-            
-            logger.info("="*60)
-            return queryset
+        # Admin ve todas; usuario regular solo ve las suyas
+        if not user.is_staff:
+            queryset = queryset.filter(usuario=user)
         
-        # Usuario regular solo ve las suyas
-        filtered = queryset.filter(usuario=user)
-        logger.info(f"[SolicitudViewSet] User viewing own: {filtered.count()} solicitudes")
-        logger.info("="*60)
-        return filtered
+        logger.debug(f"[SolicitudViewSet] {self.action} by {user.email} (staff: {user.is_staff})")
+        return queryset
     
     def get_serializer_class(self):
         """Seleccionar serializer según acción"""
@@ -84,71 +77,43 @@ class SolicitudViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Crear solicitud"""
         solicitud = serializer.save(usuario=self.request.user)
+        SolicitudResumenService.invalidar(solicitud.usuario_id)
         logger.info(f"Solicitud creada: {solicitud.id} por {self.request.user.email}")
     
+    def perform_update(self, serializer):
+        solicitud = serializer.save()
+        SolicitudResumenService.invalidar(solicitud.usuario_id)
+    
+    def perform_destroy(self, instance):
+        usuario_id = instance.usuario_id
+        instance.delete()
+        SolicitudResumenService.invalidar(usuario_id)
+    
     @action(detail=False, methods=['get'])
     def mis_solicitudes(self, request):
         """
-        Obtener solicitudes del usuario actual
-        ✅ MEJORADO: Con logging detallado y select_related
+        Obtener solicitudes del usuario actual (paginación keyset)
+        ✅ MEJORADO: select_related y sin consultas de diagnóstico
         """
-        logger.info("="*60)
-        logger.info(f"[mis_solicitudes] User: {request.user.email}")
-        
-        # ✅ CRÍTICO: Usar select_related
         solicitudes = Solicitud.objects.filter(
             usuario=request.user
-        ).select_related('usuario', 'revisor', 'lote').order_by('-created_at')
-        
-        count = solicitudes.count()
-        logger.info(f"[mis_solicitudes] Found {count} solicitudes")
-        
-        if count > 0:
-            first = solicitudes.first()
-            logger.info(f"[mis_solicitudes] First solicitud:")
-            logger.info(f"  - ID: {first.id}")
-            logger.info(f"  - Titulo: {first.titulo}")
-            logger.info(f"  - Estado: {first.estado}")
-            logger.info(f"  - Revisor: {first.revisor}")
-            logger.info(f"  - Notas revision: {first.notas_revision}")
+        ).select_related('usuario', 'revisor', 'lote')
         
-        # ✅ Serializar con contexto
+        page = self.paginate_queryset(solicitudes)
         serializer = SolicitudSerializer(
-            solicitudes,
+            page,
             many=True,
             context={'request': request}
         )
-        
-        # ✅ NUEVO: Log de datos serializados
-        if serializer.data:
-            first_data = serializer.data[0]
-            logger.info(f"[mis_solicitudes] First serialized:")
-            logger.info(f"  - notas_revision: {first_data.get('notas_revision')}")
-            logger.info(f"  - revisor_info: {first_data.get('revisor_info')}")
-        
-        logger.info("="*60)
-        
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def resumen(self, request):
-        """Obtener resumen de solicitudes del usuario"""
-        user = request.user
-        
-        if user.is_staff:
-            solicitudes = Solicitud.objects.all()
-        else:
-            solicitudes = Solicitud.objects.filter(usuario=user)
-        
-        total = solicitudes.count()
-        pendientes = solicitudes.filter(estado='pendiente').count()
-        completadas = solicitudes.filter(estado='completado').count()
-        
-        return Response({
-            'total': total,
-            'pendientes': pendientes,
-            'completadas': completadas
-        })
+        """
+        Obtener resumen de solicitudes del usuario
+        ✅ Una consulta agrupada por estado, cacheada por usuario
+        """
+        return Response(SolicitudResumenService.get_resumen(request.user))
     
     @action(detail=True, methods=['post'])
     def cambiar_estado(self, request, pk=None):
@@ -181,6 +146,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             solicitud.notas_revision = notas
         
         solicitud.save()
+        SolicitudResumenService.invalidar(solicitud.usuario_id)
         
         logger.info(
             f"Solicitud {solicitud.id} estado cambiado: "
@@ -10,6 +10,7 @@ from django.urls import reverse
 from django.db.models import Count
 
 from .models import User, UserProfile, UserRequest, PasswordResetToken
+from .services import RequestStatusService
 
 
 @admin.register(User)
@@ -255,9 +256,17 @@ class UserRequestAdmin(admin.ModelAdmin):
         )
     get_status_badge.short_description = 'Estado'
     
+    def _actualizar_estado(self, queryset, new_status, reviewer):
+        """update() masivo + nueva versión del resumen de cada usuario afectado"""
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        updated = queryset.update(status=new_status, reviewer=reviewer)
+        for user_id in user_ids:
+            RequestStatusService.invalidate_user_summary(user_id)
+        return updated
+    
     def mark_as_approved(self, request, queryset):
         """Acción para aprobar solicitudes"""
-        updated = queryset.update(status='approved', reviewer=request.user)
+        updated = self._actualizar_estado(queryset, 'approved', request.user)
         self.message_user(
             request,
             f'{updated} solicitud(es) aprobada(s) exitosamente.'
@@ -266,7 +275,7 @@ class UserRequestAdmin(admin.ModelAdmin):
     
     def mark_as_rejected(self, request, queryset):
         """Acción para rechazar solicitudes"""
-        updated = queryset.update(status='rejected', reviewer=request.user)
+        updated = self._actualizar_estado(queryset, 'rejected', request.user)
         self.message_user(
             request,
             f'{updated} solicitud(es) rechazada(s).'
@@ -275,7 +284,7 @@ class UserRequestAdmin(admin.ModelAdmin):
     
     def mark_as_in_review(self, request, queryset):
         """Acción para poner en revisión"""
-        updated = queryset.update(status='in_review', reviewer=request.user)
+        updated = self._actualizar_estado(queryset, 'in_review', request.user)
         self.message_user(
             request,
             f'{updated} solicitud(es) puesta(s) en revisión.'
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:52
+
+import apps.users.models
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_remove_user_users_user_role_36d76d_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", apps.users.models.UserManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["ciudades_interes"],
+                name="user_ciudades_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["usos_preferidos"],
+                name="user_usos_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["modelos_pago"],
+                name="user_modelos_pago_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_perfil_inversion_gin"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userrequest",
+            index=models.Index(
+                fields=["user", "-updated_at"], name="userrequest_user_updated_idx"
+            ),
+        ),
+    ]
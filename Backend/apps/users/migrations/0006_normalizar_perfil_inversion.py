@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:48
+
+import unicodedata
+
+from django.db import migrations
+
+CAMPOS = ("ciudades_interes", "usos_preferidos", "modelos_pago")
+
+
+def normalizar(valor):
+    # Misma regla que users.models.normalizar_valor_perfil (copiada: las
+    # migraciones no dependen del código vivo)
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return "_".join(texto.lower().split())
+
+
+def normalizar_perfiles(apps, schema_editor):
+    """Perfiles de inversión existentes en forma canónica (ej. 'Medellín' → 'medellin')"""
+    User = apps.get_model("users", "User")
+    cambiados = []
+    for user in User.objects.only("id", *CAMPOS).iterator(chunk_size=2000):
+        cambio = False
+        for campo in CAMPOS:
+            valores = getattr(user, campo)
+            if not isinstance(valores, list):
+                # JSON null o escalar: lista vacía
+                normalizados = []
+            else:
+                normalizados = list(dict.fromkeys(normalizar(v) for v in valores if v))
+            if normalizados != valores:
+                setattr(user, campo, normalizados)
+                cambio = True
+        if cambio:
+            cambiados.append(user)
+
+    User.objects.bulk_update(cambiados, CAMPOS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_userrequest_user_updated_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_perfiles, migrations.RunPython.noop),
+    ]
@@ -3,19 +3,103 @@ Modelos de usuario para Lateral 360°
 Define el usuario personalizado y modelos relacionados
 """
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as AuthUserManager
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import Func, Q
 from django.core.exceptions import ValidationError
 import logging
 import secrets
+import unicodedata
 from datetime import timedelta
 from django.utils import timezone
 import uuid
 
+from apps.common.dirty_fields import DirtyFieldsMixin
+
 logger = logging.getLogger(__name__)
 
 
-class User(AbstractUser):
+class JSONBArrayLength(Func):
+    """
+    jsonb_array_length(campo) (PostgreSQL), 0 si el valor no es un arreglo:
+    jsonb_array_length lanza error con un JSON null o un escalar.
+    """
+    template = (
+        "CASE WHEN jsonb_typeof(%(expressions)s) = 'array' "
+        "THEN jsonb_array_length(%(expressions)s) ELSE 0 END"
+    )
+    output_field = models.IntegerField()
+
+
+def normalizar_valor_perfil(valor):
+    """
+    Forma canónica de un valor del perfil de inversión ('Santa Marta' →
+    'santa_marta', 'Medellín' → 'medellin'): la misma de CIUDADES_INTERES,
+    USOS_PREFERIDOS y MODELOS_PAGO, que es la que busca `interesados_en`.
+    """
+    texto = unicodedata.normalize('NFKD', str(valor))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return '_'.join(texto.lower().split())
+
+
+class UserQuerySet(models.QuerySet):
+    """Consultas de perfiles de inversión sobre los campos JSON (índices GIN)"""
+    
+    def update(self, **kwargs):
+        """
+        update() no dispara post_save: si escribe columnas del usuario
+        cacheado para la autenticación (role, is_active, ...) se invalida la
+        versión de token de cada usuario afectado al confirmar.
+        """
+        from django.db import transaction
+        from apps.authentication.authentication import CachedJWTAuthentication
+        
+        if not set(kwargs) & set(CachedJWTAuthentication.get_fields()):
+            return super().update(**kwargs)
+        
+        user_ids = list(self.values_list('pk', flat=True))
+        filas = super().update(**kwargs)
+        transaction.on_commit(
+            lambda: [CachedJWTAuthentication.invalidate(user_id) for user_id in user_ids]
+        )
+        return filas
+    
+    def con_perfil_inversion(self):
+        """Developers con al menos una ciudad, uso o modelo de pago configurado"""
+        return self.filter(role='developer').alias(
+            n_ciudades=JSONBArrayLength('ciudades_interes'),
+            n_usos=JSONBArrayLength('usos_preferidos'),
+            n_modelos=JSONBArrayLength('modelos_pago'),
+        ).filter(Q(n_ciudades__gt=0) | Q(n_usos__gt=0) | Q(n_modelos__gt=0))
+    
+    def interesados_en(self, ciudades=(), usos=(), modelos_pago=()):
+        """
+        Usuarios cuyo perfil contiene alguna de las ciudades, usos o modelos
+        de pago dados (`@>` sobre jsonb, resuelto con los índices GIN).
+        
+        La comparación es exacta: los perfiles se guardan normalizados
+        (`normalizar_valor_perfil`, en User.save y migración 0006) y los
+        valores buscados se normalizan igual.
+        """
+        condicion = Q()
+        for campo, valores in (
+            ('ciudades_interes', ciudades),
+            ('usos_preferidos', usos),
+            ('modelos_pago', modelos_pago),
+        ):
+            for valor in valores:
+                condicion |= Q(**{f'{campo}__contains': [normalizar_valor_perfil(valor)]})
+        if not condicion:
+            return self.none()
+        return self.filter(condicion)
+
+
+class UserManager(AuthUserManager.from_queryset(UserQuerySet)):
+    """UserManager de Django con los métodos de UserQuerySet"""
+
+
+class User(DirtyFieldsMixin, AbstractUser):
     """
     Modelo de usuario personalizado para Lateral 360°
     Extiende AbstractUser con campos específicos para la plataforma
@@ -47,6 +131,18 @@ class User(AbstractUser):
         ('natural', 'Persona Natural'),
         ('juridica', 'Persona Jurídica'),
     ]
+    
+    # Valores válidos del perfil de inversión
+    CIUDADES_INTERES = [
+        'medellin', 'bogota', 'cali', 'barranquilla', 'cartagena',
+        'cucuta', 'bucaramanga', 'pereira', 'santa_marta', 'ibague',
+        'pasto', 'manizales', 'neiva', 'villavicencio', 'armenia',
+        'valledupar', 'monteria', 'sincelejo', 'popayan', 'tunja'
+    ]
+    USOS_PREFERIDOS = ['residencial', 'comercial', 'industrial', 'logistico']
+    MODELOS_PAGO = ['contado', 'aporte', 'hitos']
+    
+    objects = UserManager()
 
     # Campos base
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -172,6 +268,10 @@ class User(AbstractUser):
             models.Index(fields=['role', 'is_active'], name='user_role_active_idx'),
             models.Index(fields=['created_at'], name='user_created_at_idx'),
             models.Index(fields=['is_verified'], name='user_verified_idx'),
+            # ✅ GIN (jsonb_path_ops) para búsquedas por contención (@>) en el perfil de inversión
+            GinIndex(fields=['ciudades_interes'], opclasses=['jsonb_path_ops'], name='user_ciudades_gin'),
+            GinIndex(fields=['usos_preferidos'], opclasses=['jsonb_path_ops'], name='user_usos_gin'),
+            GinIndex(fields=['modelos_pago'], opclasses=['jsonb_path_ops'], name='user_modelos_pago_gin'),
         ]
         
     def __str__(self):
@@ -220,8 +320,27 @@ class User(AbstractUser):
                     'legal_name': 'El nombre legal o empresa es obligatorio para desarrolladores'
                 })
     
+    def normalizar_perfil_inversion(self):
+        """Valores del perfil en forma canónica y sin repetidos (solo campos cargados)"""
+        for campo in ('ciudades_interes', 'usos_preferidos', 'modelos_pago'):
+            valores = self.__dict__.get(campo)
+            if isinstance(valores, list):
+                self.__dict__[campo] = list(dict.fromkeys(
+                    normalizar_valor_perfil(valor) for valor in valores if valor
+                ))
+    
     def save(self, *args, **kwargs):
-        """Override save para validar y loggear"""
+        """
+        Override save para validar y loggear.
+        Solo escribe las columnas modificadas (DirtyFieldsMixin); sin cambios
+        no valida ni escribe.
+        """
+        self.normalizar_perfil_inversion()
+        
+        # ✅ Sin cambios no hay nada que validar ni escribir
+        if not self.is_dirty() and kwargs.get('update_fields') is None:
+            return
+        
         # ✅ CRÍTICO: Solo validar si NO es creación O si ya tiene password hasheada
         is_new = self.pk is None
         
@@ -240,6 +359,18 @@ class User(AbstractUser):
         else:
             logger.debug(f"User updated: {self.email}")
     
+    def refresh_from_db(self, using=None, fields=None):
+        """
+        Al leer un campo diferido cargar todos los diferidos en una sola
+        consulta: el usuario autenticado llega con columnas mínimas
+        (ver CachedJWTAuthentication).
+        """
+        if fields is not None:
+            deferred = self.get_deferred_fields()
+            if deferred and set(fields) <= deferred:
+                fields = deferred
+        super().refresh_from_db(using=using, fields=fields)
+    
     def get_full_name(self):
         """Retorna nombre completo del usuario"""
         full_name = f"{self.first_name} {self.last_name}".strip()
@@ -412,7 +543,7 @@ class VerificationCode(models.Model):
         logger.info(f"Verification code {self.code} marked as used for {self.user.email}")
 
 
-class UserProfile(models.Model):
+class UserProfile(DirtyFieldsMixin, models.Model):
     """
     Perfil extendido del usuario con información adicional
     """
@@ -608,6 +739,7 @@ class UserRequest(models.Model):
             models.Index(fields=['lote', 'status']),  # ✅ NUEVO índice
             models.Index(fields=['priority', '-updated_at']),  # ✅ NUEVO índice
             models.Index(fields=['-updated_at']),
+            models.Index(fields=['user', '-updated_at'], name='userrequest_user_updated_idx'),
         ]
     
     def __str__(self):
@@ -326,35 +326,24 @@ class PerfilInversionSerializer(serializers.Serializer):
     
     def validate_ciudades_interes(self, value):
         """Validar que las ciudades sean válidas"""
-        ciudades_validas = [
-            'medellin', 'bogota', 'cali', 'barranquilla', 'cartagena',
-            'cucuta', 'bucaramanga', 'pereira', 'santa_marta', 'ibague',
-            'pasto', 'manizales', 'neiva', 'villavicencio', 'armenia',
-            'valledupar', 'monteria', 'sincelejo', 'popayan', 'tunja'
-        ]
-        
         for ciudad in value:
-            if ciudad not in ciudades_validas:
+            if ciudad not in User.CIUDADES_INTERES:
                 raise serializers.ValidationError(f"Ciudad no válida: {ciudad}")
         
         return value
     
     def validate_usos_preferidos(self, value):
         """Validar que los usos sean válidos"""
-        usos_validos = ['residencial', 'comercial', 'industrial', 'logistico']
-        
         for uso in value:
-            if uso not in usos_validos:
+            if uso not in User.USOS_PREFERIDOS:
                 raise serializers.ValidationError(f"Uso de suelo no válido: {uso}")
         
         return value
     
     def validate_modelos_pago(self, value):
         """Validar que los modelos de pago sean válidos"""
-        modelos_validos = ['contado', 'aporte', 'hitos']
-        
         for modelo in value:
-            if modelo not in modelos_validos:
+            if modelo not in User.MODELOS_PAGO:
                 raise serializers.ValidationError(f"Modelo de pago no válido: {modelo}")
         
         return value
@@ -8,6 +8,7 @@ from datetime import timedelta
 import logging
 import hashlib
 
+from apps.common.cache import CacheService
 from .models import UserRequest  # ✅ Solo importar UserRequest aquí (evitar import circular)
 
 logger = logging.getLogger(__name__)
@@ -17,8 +18,26 @@ class RequestStatusService:
     """
     Servicio para gestionar y recuperar estados de solicitudes de usuario.
     Proporciona métodos para consultar, filtrar y obtener estadísticas de solicitudes.
+    
+    El resumen por usuario se calcula con una sola consulta agrupada y se
+    cachea con una versión por usuario: `invalidate_user_summary` (llamado
+    desde `update_request_status` y las vistas) la incrementa y el resumen
+    anterior deja de usarse.
     """
     
+    SUMMARY_NAMESPACE = 'user_requests'
+    SUMMARY_TIMEOUT = 300
+    
+    @classmethod
+    def summary_cache_key(cls, user_id):
+        """Clave del resumen atada a la versión actual del usuario"""
+        return CacheService.versioned_key(f'{cls.SUMMARY_NAMESPACE}:{user_id}', 'summary')
+    
+    @classmethod
+    def invalidate_user_summary(cls, user_id):
+        """Nueva versión del resumen de solicitudes del usuario"""
+        CacheService.bump_generation(f'{cls.SUMMARY_NAMESPACE}:{user_id}')
+    
     @staticmethod
     def get_user_requests(user, request_type=None, status=None):
         """
@@ -41,45 +60,18 @@ class RequestStatusService:
             ... )
         """
         try:
-            # ✅ CORREGIDO: Obtener el ID o usar el objeto directamente
-            user_id = user.id if hasattr(user, 'id') else user
-            
             # ✅ CRÍTICO: Filtrar por 'user' no 'user_id'
             queryset = UserRequest.objects.filter(
                 user=user  # ✅ Usar el objeto user o user_id
-            ).select_related('reviewer', 'lote').order_by('-created_at')
-            
-            logger.info(f"🔍 Base queryset count: {queryset.count()}")
+            ).select_related('user', 'reviewer', 'lote').order_by('-created_at')
 
             if request_type:
                 queryset = queryset.filter(request_type=request_type)
-                logger.debug(f"Filtering by request_type: {request_type}")
 
             if status:
                 queryset = queryset.filter(status=status)
-                logger.debug(f"Filtering by status: {status}")
 
-            count = queryset.count()
-            logger.info(f"✅ Retrieved {count} requests for user {user_id}")
-            
-            # ✅ NUEVO: Log detallado si no encuentra nada
-            if count == 0:
-                # Verificar si existen solicitudes en la BD para este usuario
-                total_in_db = UserRequest.objects.filter(user=user).count()
-                logger.warning(
-                    f"⚠️ No requests found after filters. "
-                    f"Total in DB for user {user_id}: {total_in_db}"
-                )
-                
-                # Mostrar todas las solicitudes del usuario sin filtros
-                all_requests = UserRequest.objects.filter(user=user)
-                logger.info(f"📋 All user requests ({all_requests.count()}):")
-                for req in all_requests[:5]:  # Mostrar max 5
-                    logger.info(
-                        f"  - ID: {req.id}, Type: {req.request_type}, "
-                        f"Status: {req.status}, Title: {req.title}"
-                    )
-            
+            # Sin count() ni consultas de diagnóstico: el queryset se evalúa al paginar
             return queryset
 
         except Exception as e:
@@ -120,9 +112,33 @@ class RequestStatusService:
             return None
     
     @staticmethod
-    def get_request_status_summary(user):
+    def _calcular_summary(user_id):
+        """Conteos por estado y tipo con una sola consulta agrupada"""
+        rows = UserRequest.objects.filter(user_id=user_id).order_by().values(
+            'status', 'request_type'
+        ).annotate(count=Count('id'))
+        
+        status_dict = {}
+        by_type = {}
+        for row in rows:
+            status_dict[row['status']] = status_dict.get(row['status'], 0) + row['count']
+            by_type[row['request_type']] = by_type.get(row['request_type'], 0) + row['count']
+        
+        return {
+            'total': sum(status_dict.values()),
+            'pending': status_dict.get('pending', 0),
+            'in_review': status_dict.get('in_review', 0),
+            'approved': status_dict.get('approved', 0),
+            'rejected': status_dict.get('rejected', 0),
+            'completed': status_dict.get('completed', 0),
+            'by_type': by_type
+        }
+    
+    @classmethod
+    def get_request_status_summary(cls, user):
         """
         Obtiene un resumen de estados de solicitudes para un usuario.
+        ✅ Una consulta agrupada, cacheada hasta el siguiente cambio de estado
         
         Args:
             user: Objeto User o ID de usuario
@@ -145,30 +161,12 @@ class RequestStatusService:
         """
         try:
             user_id = user.id if hasattr(user, 'id') else user
-            
-            # Obtener todas las solicitudes del usuario
-            requests = UserRequest.objects.filter(user_id=user_id)
-            
-            # Contar por estado
-            status_counts = requests.values('status').annotate(count=Count('id'))
-            status_dict = {item['status']: item['count'] for item in status_counts}
-            
-            # Contar por tipo
-            type_counts = requests.values('request_type').annotate(count=Count('id'))
-            by_type = {item['request_type']: item['count'] for item in type_counts}
-            
-            summary = {
-                'total': requests.count(),
-                'pending': status_dict.get('pending', 0),
-                'in_review': status_dict.get('in_review', 0),
-                'approved': status_dict.get('approved', 0),
-                'rejected': status_dict.get('rejected', 0),
-                'completed': status_dict.get('completed', 0),
-                'by_type': by_type
-            }
-            
-            logger.info(f"Generated status summary for user {user_id}: {summary['total']} total requests")
-            return summary
+            return CacheService.get_or_set(
+                cls.summary_cache_key(user_id),
+                lambda: cls._calcular_summary(user_id),
+                timeout=cls.SUMMARY_TIMEOUT,
+                raise_errors=True
+            )
             
         except Exception as e:
             logger.error(f"Error generating status summary: {str(e)}", exc_info=True)
@@ -201,18 +199,11 @@ class RequestStatusService:
             # Calcular fecha de inicio
             start_date = timezone.now() - timedelta(days=days)
             
-            # Obtener solicitudes actualizadas recientemente
-            recent_updates = UserRequest.objects.filter(
+            # Obtener solicitudes actualizadas recientemente (índice user, -updated_at)
+            return UserRequest.objects.filter(
                 user_id=user_id,
                 updated_at__gte=start_date
-            ).order_by('-updated_at')[:limit]
-            
-            logger.info(
-                f"Retrieved {recent_updates.count()} recent updates "
-                f"for user {user_id} (last {days} days)"
-            )
-            
-            return recent_updates
+            ).select_related('user').order_by('-updated_at')[:limit]
             
         except Exception as e:
             logger.error(f"Error getting recent updates: {str(e)}", exc_info=True)
@@ -246,6 +237,7 @@ class RequestStatusService:
                 request.review_notes = review_notes
             
             request.save()
+            RequestStatusService.invalidate_user_summary(request.user_id)
             
             logger.info(
                 f"Request {request_id} status updated: "
@@ -265,8 +257,8 @@ class RequestStatusService:
             logger.error(f"Error updating request status: {str(e)}", exc_info=True)
             return (False, f"Error al actualizar: {str(e)}", None)
     
-    @staticmethod
-    def get_pending_requests_count(user):
+    @classmethod
+    def get_pending_requests_count(cls, user):
         """
         Obtiene el conteo de solicitudes pendientes de un usuario.
         
@@ -277,15 +269,8 @@ class RequestStatusService:
             int: Número de solicitudes pendientes
         """
         try:
-            user_id = user.id if hasattr(user, 'id') else user
-            
-            count = UserRequest.objects.filter(
-                user_id=user_id,
-                status='pending'
-            ).count()
-            
-            logger.debug(f"User {user_id} has {count} pending requests")
-            return count
+            # Sale del resumen cacheado (sin consulta en los aciertos)
+            return cls.get_request_status_summary(user)['pending']
             
         except Exception as e:
             logger.error(f"Error counting pending requests: {str(e)}", exc_info=True)
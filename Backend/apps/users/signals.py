@@ -30,22 +30,25 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, created, **kwargs):
     """
     Guarda el perfil del usuario cuando el usuario se actualiza.
     
+    Solo si el perfil ya está cargado en la instancia y tiene cambios: no se
+    consulta ni se reescribe el perfil en cada save() del usuario.
+    
     Args:
         sender: Modelo que envía la señal (User)
         instance: Instancia del usuario
+        created: Boolean indicando si es una creación nueva
     """
+    if created or not User.profile.is_cached(instance):
+        return
+    
     try:
-        # Verificar si el perfil existe antes de guardarlo
-        if hasattr(instance, 'profile'):
-            instance.profile.save()
+        profile = instance.profile
+        if profile is not None and profile.is_dirty():
+            profile.save()
             logger.debug(f"Profile saved for user: {instance.email}")
-    except UserProfile.DoesNotExist:
-        # Si no existe el perfil, crearlo
-        logger.warning(f"Profile didn't exist for user {instance.email}, creating it")
-        UserProfile.objects.create(user=instance)
     except Exception as e:
         logger.error(f"Error saving profile for user {instance.email}: {str(e)}")
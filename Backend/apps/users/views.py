@@ -6,8 +6,10 @@ from rest_framework import generics, status, permissions, viewsets, filters, ser
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from django.http import Http404
 from django.db import IntegrityError
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
 import logging
 
@@ -392,17 +394,25 @@ class UserRequestViewSet(viewsets.ModelViewSet):
             headers=headers
         )
     
+    def perform_create(self, serializer):
+        user_request = serializer.save()
+        RequestStatusService.invalidate_user_summary(user_request.user_id)
+    
+    def perform_update(self, serializer):
+        user_request = serializer.save()
+        RequestStatusService.invalidate_user_summary(user_request.user_id)
+    
+    def perform_destroy(self, instance):
+        user_id = instance.user_id
+        instance.delete()
+        RequestStatusService.invalidate_user_summary(user_id)
+    
     @action(detail=False, methods=['get'])
     def my_requests(self, request):
         """Obtener todas las solicitudes del usuario actual (con info de revisión)"""
         request_type = request.query_params.get('type')
         request_status = request.query_params.get('status')
 
-        # ✅ NUEVO: Logging detallado
-        logger.info("="*60)
-        logger.info(f"[my_requests] User: {request.user.email}")
-        logger.info(f"[my_requests] Filters - type: {request_type}, status: {request_status}")
-
         # Obtener queryset enriquecido (select_related ya en el servicio)
         requests_qs = RequestStatusService.get_user_requests(
             user=request.user,
@@ -410,49 +420,15 @@ class UserRequestViewSet(viewsets.ModelViewSet):
             status=request_status
         )
 
-        # ✅ NUEVO: Log de cantidad y datos de primera solicitud
-        logger.info(f"[my_requests] Found {requests_qs.count()} requests")
-        
-        if requests_qs.exists():
-            first_req = requests_qs.first()
-            logger.info(f"[my_requests] First request:")
-            logger.info(f"  - ID: {first_req.id}")
-            logger.info(f"  - Title: {first_req.title}")
-            logger.info(f"  - Status: {first_req.status}")
-            logger.info(f"  - Reviewer: {first_req.reviewer}")
-            logger.info(f"  - Review notes: {first_req.review_notes}")
-            logger.info(f"  - Reviewer info exists: {first_req.reviewer is not None}")
-            if first_req.reviewer:
-                logger.info(f"  - Reviewer email: {first_req.reviewer.email}")
-                logger.info(f"  - Reviewer full_name: {first_req.reviewer.get_full_name()}")
-
         page = self.paginate_queryset(requests_qs)
         # Usar el serializer detallado para incluir reviewer/review_notes en la lista
         serializer_class = UserRequestDetailSerializer
 
         if page is not None:
             serializer = serializer_class(page, many=True, context={'request': request})
-            
-            # ✅ NUEVO: Log de datos serializados
-            logger.info(f"[my_requests] Serialized {len(serializer.data)} items")
-            if serializer.data:
-                first_item = serializer.data[0]
-                logger.info(f"[my_requests] First serialized item keys: {list(first_item.keys())}")
-                logger.info(f"[my_requests] reviewer_info: {first_item.get('reviewer_info')}")
-                logger.info(f"[my_requests] review_notes: {first_item.get('review_notes')}")
-            
-            logger.info("="*60)
             return self.get_paginated_response(serializer.data)
 
         serializer = serializer_class(requests_qs, many=True, context={'request': request})
-        
-        # ✅ NUEVO: Log para respuesta sin paginación
-        logger.info(f"[my_requests] Non-paginated response with {len(serializer.data)} items")
-        if serializer.data:
-            logger.info(f"[my_requests] First item reviewer_info: {serializer.data[0].get('reviewer_info')}")
-            logger.info(f"[my_requests] First item review_notes: {serializer.data[0].get('review_notes')}")
-        logger.info("="*60)
-        
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -1308,6 +1284,122 @@ def soft_delete_user(request, user_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _calcular_admin_statistics():
+    """Estadísticas generales del sistema (sin cache)"""
+    from apps.lotes.models import Lote
+    from apps.documents.models import Document
+    from apps.solicitudes.models import Solicitud
+    from django.db.models import Count, Q, Sum
+    from datetime import datetime, timedelta
+    from django.utils import timezone  # ✅ AGREGADO
+    
+    # ✅ CORREGIDO: Usar timezone.now() en lugar de datetime.now()
+    now = timezone.now()
+    today = now.date()
+    thirty_days_ago = now - timedelta(days=30)
+    seven_days_ago = now - timedelta(days=7)
+    
+    # Estadísticas de Usuarios
+    usuarios_stats = {
+        'total': User.objects.count(),
+        'activos': User.objects.filter(is_active=True).count(),
+        'inactivos': User.objects.filter(is_active=False).count(),
+        'por_rol': dict(
+            User.objects.values('role').annotate(count=Count('id'))
+            .values_list('role', 'count')
+        ),
+        'verificados': User.objects.filter(is_verified=True).count(),
+        'nuevos_mes': User.objects.filter(
+            created_at__gte=thirty_days_ago  # ✅ CORREGIDO: usar variable con timezone
+        ).count()
+    }
+    
+    # Estadísticas de Lotes
+    lotes_stats = {
+        'total': Lote.objects.count(),
+        'por_estado': dict(
+            Lote.objects.values('status').annotate(count=Count('id'))
+            .values_list('status', 'count')
+        ),
+        'area_total': Lote.objects.aggregate(Sum('area'))['area__sum'] or 0,
+        'verificados': Lote.objects.filter(is_verified=True).count(),
+        'nuevos_mes': Lote.objects.filter(
+            created_at__gte=thirty_days_ago  # ✅ CORREGIDO
+        ).count()
+    }
+    
+    # ✅ CORREGIDO: Estadísticas de Documentos - usar created_at en lugar de uploaded_at
+    documentos_stats = {
+        'total': Document.objects.count(),
+        'validados': Document.objects.filter(
+            metadata__status='validado'
+        ).count(),
+        'pendientes': Document.objects.filter(
+            Q(metadata__status='pendiente') | Q(metadata__status__isnull=True)
+        ).count(),
+        'rechazados': Document.objects.filter(
+            metadata__status='rechazado'
+        ).count(),
+        'nuevos_semana': Document.objects.filter(
+            created_at__gte=seven_days_ago  # ✅ CORREGIDO: uploaded_at → created_at
+        ).count()
+    }
+    
+    # Estadísticas de Solicitudes
+    solicitudes_stats = {
+        'total': Solicitud.objects.count(),
+        'por_estado': dict(
+            Solicitud.objects.values('estado').annotate(count=Count('id'))
+            .values_list('estado', 'count')
+        ),
+        'por_tipo': dict(
+            Solicitud.objects.values('tipo').annotate(count=Count('id'))
+            .values_list('tipo', 'count')
+        ),
+        'nuevas_semana': Solicitud.objects.filter(
+            created_at__gte=seven_days_ago  # ✅ CORREGIDO
+        ).count()
+    }
+    
+    # Actividad Reciente - ✅ CORREGIDO: usar created_at con timezone
+    actividad_reciente = {
+        'usuarios_registrados_hoy': User.objects.filter(
+            created_at__date=today  # ✅ CORREGIDO: usar today (date object)
+        ).count(),
+        'lotes_registrados_hoy': Lote.objects.filter(
+            created_at__date=today  # ✅ CORREGIDO
+        ).count(),
+        'documentos_subidos_hoy': Document.objects.filter(
+            created_at__date=today  # ✅ CORREGIDO: uploaded_at → created_at
+        ).count(),
+        'solicitudes_creadas_hoy': Solicitud.objects.filter(
+            created_at__date=today  # ✅ CORREGIDO
+        ).count(),
+    }
+    
+    # Top Usuarios por Lotes
+    top_usuarios = User.objects.filter(
+        role='owner',
+        is_active=True
+    ).annotate(
+        lotes_count=Count('lotes_owned')
+    ).order_by('-lotes_count')[:5].only(
+        'id', 'email', 'first_name', 'last_name'
+    ).values(
+        'id', 'email', 'first_name', 'last_name', 'lotes_count'
+    )
+    
+    return {
+        'usuarios': usuarios_stats,
+        'lotes': lotes_stats,
+        'documentos': documentos_stats,
+        'solicitudes': solicitudes_stats,
+        'actividad_reciente': actividad_reciente,
+        'top_usuarios': list(top_usuarios),
+        'timestamp': now.isoformat()  # ✅ CORREGIDO: usar now con timezone
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def admin_statistics(request):
@@ -1315,142 +1407,29 @@ def admin_statistics(request):
     Obtener estadísticas generales del sistema (solo admin).
     ✅ CORREGIDO: Campo uploaded_at → created_at
     """
-    # Intentar obtener del cache
     from apps.common.cache import CacheService
-    cache_key = 'admin_statistics'
-    cached_stats = CacheService.get(cache_key)
     
-    if cached_stats:
-        logger.info("📦 Returning cached admin statistics")
-        return Response({
-            'success': True,
-            'data': cached_stats,
-            'cached': True
-        })
+    calculado = []
+    
+    def _calcular():
+        calculado.append(True)
+        return _calcular_admin_statistics()
     
     try:
-        from apps.lotes.models import Lote
-        from apps.documents.models import Document
-        from apps.solicitudes.models import Solicitud
-        from django.db.models import Count, Q, Sum
-        from datetime import datetime, timedelta
-        from django.utils import timezone  # ✅ AGREGADO
-        
-        # ✅ CORREGIDO: Usar timezone.now() en lugar de datetime.now()
-        now = timezone.now()
-        today = now.date()
-        thirty_days_ago = now - timedelta(days=30)
-        seven_days_ago = now - timedelta(days=7)
-        
-        # Estadísticas de Usuarios
-        usuarios_stats = {
-            'total': User.objects.count(),
-            'activos': User.objects.filter(is_active=True).count(),
-            'inactivos': User.objects.filter(is_active=False).count(),
-            'por_rol': dict(
-                User.objects.values('role').annotate(count=Count('id'))
-                .values_list('role', 'count')
-            ),
-            'verificados': User.objects.filter(is_verified=True).count(),
-            'nuevos_mes': User.objects.filter(
-                created_at__gte=thirty_days_ago  # ✅ CORREGIDO: usar variable con timezone
-            ).count()
-        }
-        
-        # Estadísticas de Lotes
-        lotes_stats = {
-            'total': Lote.objects.count(),
-            'por_estado': dict(
-                Lote.objects.values('status').annotate(count=Count('id'))
-                .values_list('status', 'count')
-            ),
-            'area_total': Lote.objects.aggregate(Sum('area'))['area__sum'] or 0,
-            'verificados': Lote.objects.filter(is_verified=True).count(),
-            'nuevos_mes': Lote.objects.filter(
-                created_at__gte=thirty_days_ago  # ✅ CORREGIDO
-            ).count()
-        }
-        
-        # ✅ CORREGIDO: Estadísticas de Documentos - usar created_at en lugar de uploaded_at
-        documentos_stats = {
-            'total': Document.objects.count(),
-            'validados': Document.objects.filter(
-                metadata__status='validado'
-            ).count(),
-            'pendientes': Document.objects.filter(
-                Q(metadata__status='pendiente') | Q(metadata__status__isnull=True)
-            ).count(),
-            'rechazados': Document.objects.filter(
-                metadata__status='rechazado'
-            ).count(),
-            'nuevos_semana': Document.objects.filter(
-                created_at__gte=seven_days_ago  # ✅ CORREGIDO: uploaded_at → created_at
-            ).count()
-        }
-        
-        # Estadísticas de Solicitudes
-        solicitudes_stats = {
-            'total': Solicitud.objects.count(),
-            'por_estado': dict(
-                Solicitud.objects.values('estado').annotate(count=Count('id'))
-                .values_list('estado', 'count')
-            ),
-            'por_tipo': dict(
-                Solicitud.objects.values('tipo').annotate(count=Count('id'))
-                .values_list('tipo', 'count')
-            ),
-            'nuevas_semana': Solicitud.objects.filter(
-                created_at__gte=seven_days_ago  # ✅ CORREGIDO
-            ).count()
-        }
-        
-        # Actividad Reciente - ✅ CORREGIDO: usar created_at con timezone
-        actividad_reciente = {
-            'usuarios_registrados_hoy': User.objects.filter(
-                created_at__date=today  # ✅ CORREGIDO: usar today (date object)
-            ).count(),
-            'lotes_registrados_hoy': Lote.objects.filter(
-                created_at__date=today  # ✅ CORREGIDO
-            ).count(),
-            'documentos_subidos_hoy': Document.objects.filter(
-                created_at__date=today  # ✅ CORREGIDO: uploaded_at → created_at
-            ).count(),
-            'solicitudes_creadas_hoy': Solicitud.objects.filter(
-                created_at__date=today  # ✅ CORREGIDO
-            ).count(),
-        }
-        
-        # Top Usuarios por Lotes
-        top_usuarios = User.objects.filter(
-            role='owner',
-            is_active=True
-        ).annotate(
-            lotes_count=Count('lotes_owned')
-        ).order_by('-lotes_count')[:5].only(
-            'id', 'email', 'first_name', 'last_name'
-        ).values(
-            'id', 'email', 'first_name', 'last_name', 'lotes_count'
+        # ✅ Cache protegido contra estampidas: un solo recálculo por expiración
+        statistics_data = CacheService.get_or_set(
+            'admin_statistics', _calcular, timeout=60, raise_errors=True
         )
         
-        statistics_data = {
-            'usuarios': usuarios_stats,
-            'lotes': lotes_stats,
-            'documentos': documentos_stats,
-            'solicitudes': solicitudes_stats,
-            'actividad_reciente': actividad_reciente,
-            'top_usuarios': list(top_usuarios),
-            'timestamp': now.isoformat()  # ✅ CORREGIDO: usar now con timezone
-        }
-        
-        # Guardar en cache por 1 minuto
-        CacheService.set(cache_key, statistics_data, timeout=60)
-        
-        logger.info(f"Admin statistics retrieved by {request.user.email}")
+        if calculado:
+            logger.info(f"Admin statistics retrieved by {request.user.email}")
+        else:
+            logger.info("📦 Returning cached admin statistics")
         
         return Response({
             'success': True,
             'data': statistics_data,
-            'cached': False
+            'cached': not calculado
         })
         
     except Exception as e:
@@ -1463,45 +1442,85 @@ def admin_statistics(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class PerfilesInversionPagination(CursorPagination):
+    """Paginación por cursor (created_at, id): sin OFFSET ni saltos al insertar"""
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def listar_perfiles_inversion(request):
     """
-    Listar todos los perfiles de inversión (solo admin).
+    Listar los perfiles de inversión (solo admin).
     Endpoint para dashboard de administrador.
+    
+    ✅ Filtrado en SQL (jsonb_array_length y contención @> con índices GIN)
+    y paginación por cursor.
+    
+    Query params:
+        ciudad, uso, modelo_pago: perfiles que contienen el valor (repetibles)
+        perfil_completo: true/false
+        cursor, page_size: paginación
     """
     try:
-        # Obtener todos los desarrolladores
-        desarrolladores = User.objects.filter(
-            role='developer'
-        ).select_related().order_by('-created_at')
-        
-        profiles = []
-        for dev in desarrolladores:
-            # Solo incluir si tiene al menos un campo de perfil configurado
-            if dev.ciudades_interes or dev.usos_preferidos or dev.modelos_pago:
-                profiles.append({
-                    'id': dev.id,
-                    'developer': {
-                        'id': str(dev.id),
-                        'email': dev.email,
-                        'name': dev.get_full_name() or dev.email,
-                    },
-                    'ciudades_interes': dev.ciudades_interes or [],
-                    'usos_preferidos': dev.usos_preferidos or [],
-                    'modelos_pago': dev.modelos_pago or [],
-                    'volumen_ventas_min': dev.volumen_ventas_min or '',
-                    'ticket_inversion_min': dev.ticket_inversion_min,
-                    'perfil_completo': dev.perfil_completo,
-                    'created_at': dev.created_at.isoformat(),
-                })
-        
-        logger.info(f"📋 Admin viewing {len(profiles)} investment profiles")
+        desarrolladores = User.objects.con_perfil_inversion()
+        
+        ciudades = request.query_params.getlist('ciudad')
+        usos = request.query_params.getlist('uso')
+        modelos = request.query_params.getlist('modelo_pago')
+        if ciudades or usos or modelos:
+            desarrolladores = desarrolladores.interesados_en(ciudades, usos, modelos)
+        
+        perfil_completo = request.query_params.get('perfil_completo')
+        if perfil_completo in ('true', 'false'):
+            desarrolladores = desarrolladores.filter(perfil_completo=perfil_completo == 'true')
+        
+        totales = desarrolladores.aggregate(
+            total=Count('id'),
+            completos=Count('id', filter=Q(perfil_completo=True)),
+        )
+        
+        paginator = PerfilesInversionPagination()
+        pagina = paginator.paginate_queryset(
+            desarrolladores.only(
+                'id', 'email', 'first_name', 'last_name', 'username',
+                'ciudades_interes', 'usos_preferidos', 'modelos_pago',
+                'volumen_ventas_min', 'ticket_inversion_min', 'perfil_completo', 'created_at',
+            ),
+            request
+        )
+        
+        profiles = [
+            {
+                'id': dev.id,
+                'developer': {
+                    'id': str(dev.id),
+                    'email': dev.email,
+                    'name': dev.get_full_name() or dev.email,
+                },
+                'ciudades_interes': dev.ciudades_interes or [],
+                'usos_preferidos': dev.usos_preferidos or [],
+                'modelos_pago': dev.modelos_pago or [],
+                'volumen_ventas_min': dev.volumen_ventas_min or '',
+                'ticket_inversion_min': dev.ticket_inversion_min,
+                'perfil_completo': dev.perfil_completo,
+                'created_at': dev.created_at.isoformat(),
+            }
+            for dev in pagina
+        ]
+        
+        logger.info(f"📋 Admin viewing {len(profiles)} of {totales['total']} investment profiles")
         
         return Response({
             'success': True,
             'profiles': profiles,
-            'total': len(profiles)
+            'total': totales['total'],
+            'completos': totales['completos'],
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
         })
         
     except Exception as e:
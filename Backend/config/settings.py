@@ -98,6 +98,12 @@ if DEBUG:
 # Agregar middleware de logging de API
 MIDDLEWARE.append('apps.common.middleware.api_logging.APILoggingMiddleware')
 
+# ✅ Métricas por ruta (latencia, consultas SQL); se expone en /api/common/metrics/
+MIDDLEWARE.insert(0, 'apps.common.middleware.metrics.MetricsMiddleware')
+
+# ✅ Detección de N+1 (solo desarrollo, ver QUERY_INSPECTOR_ENABLED)
+MIDDLEWARE.append('apps.common.middleware.query_inspector.QueryInspectorMiddleware')
+
 # =============================================================================
 # URLS & WSGI
 # =============================================================================
@@ -172,13 +178,17 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# ✅ Usuario autenticado cacheado por id y versión de token (CachedJWTAuthentication)
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+
 # =============================================================================
 # REST FRAMEWORK
 # =============================================================================
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT con el usuario resuelto desde cache (apps/authentication/authentication.py)
+        'apps.authentication.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -346,10 +356,60 @@ logger = logging.getLogger(__name__)
 logger.info(f"📦 Cache backend: {CACHES['default']['BACKEND']}")
 logger.info(f"📦 Redis host: {REDIS_HOST}:{REDIS_PORT}")
 
+# ✅ Cache L1 en proceso delante de Redis (apps/common/local_cache.py)
+# Por defecto cubre los aliases django_redis; la invalidación entre workers
+# viaja por pub/sub y el TTL del L1 acota la desactualización.
+CACHE_L1_ENABLED = os.getenv('CACHE_L1_ENABLED', 'True') == 'True'
+CACHE_L1_MAXSIZE = 512   # entradas por namespace
+CACHE_L1_TTL = 10        # segundos
+CACHE_L1_NAMESPACES = {
+    'generation': {'maxsize': 4096, 'ttl': 30},  # incluye la versión de token por usuario
+    'auth_user': {'maxsize': 2048, 'ttl': 30},
+    'admin_statistics': {'maxsize': 1, 'ttl': 10},
+    'analisis_estadisticas': {'maxsize': 8, 'ttl': 30},
+    'parametros_snapshot': {'maxsize': 1, 'ttl': 30},
+    'gemini_respuesta': {'maxsize': 0},  # respuestas grandes: solo en Redis
+    'default': {'maxsize': 1024, 'ttl': 5},
+}
+
+# ✅ Protección contra estampidas (CacheService.get_or_set / @cache_result)
+CACHE_XFETCH_BETA = 1.0               # >1 recalcula antes
+CACHE_STALE_TTL = 60                  # segundos que se sirve el valor anterior
+CACHE_NEGATIVE_TTL = 30               # TTL máximo para resultados vacíos
+CACHE_RECOMPUTE_LOCK_TIMEOUT = 30
+CACHE_RECOMPUTE_WAIT = 5
+
 # =============================================================================
 # LOGGING
 # =============================================================================
 
+# ✅ Métricas (MetricsMiddleware, /api/common/metrics/)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+# Segundos entre volcados de cada worker al hash compartido en Redis
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))
+# Token Bearer para el scraper; sin token el endpoint solo responde en DEBUG
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# ✅ Detección de N+1 (QueryInspectorMiddleware): avisa cuando una misma
+# forma de SQL se repite QUERY_INSPECTOR_THRESHOLD veces en una petición
+QUERY_INSPECTOR_ENABLED = os.getenv('QUERY_INSPECTOR_ENABLED', str(DEBUG)) == 'True'
+QUERY_INSPECTOR_THRESHOLD = int(os.getenv('QUERY_INSPECTOR_THRESHOLD', '5'))
+
+# ✅ Logging de API (APILoggingMiddleware)
+# Errores (>=400) y peticiones lentas siempre se registran; las exitosas se
+# muestrean por prefijo de ruta (el prefijo más largo gana).
+API_LOG_SAMPLE_RATES = {
+    'default': 1.0 if DEBUG else 0.2,
+    '/api/lotes/': 1.0 if DEBUG else 0.05,
+    '/api/users/': 1.0 if DEBUG else 0.1,
+}
+API_LOG_SLOW_MS = int(os.getenv('API_LOG_SLOW_MS', '1000'))
+API_LOG_MAX_BODY_LENGTH = 5000
+# Una línea JSON por petición en lugar de texto
+API_LOG_STRUCTURED = os.getenv('API_LOG_STRUCTURED', 'False' if DEBUG else 'True') == 'True'
+# Registros en cola antes de descartar (la escritura ocurre en otro hilo)
+API_LOG_QUEUE_SIZE = int(os.getenv('API_LOG_QUEUE_SIZE', '10000'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -362,6 +422,9 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'apps.common.log_handlers.JSONFormatter',
+        },
     },
     'handlers': {
         'console': {
@@ -369,6 +432,13 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple' if DEBUG else 'verbose',
         },
+        # ✅ Escritura fuera del hilo de la petición, con cola acotada
+        'api_queue': {
+            'level': 'INFO',
+            'class': 'apps.common.log_handlers.BoundedQueueHandler',
+            'maxsize': API_LOG_QUEUE_SIZE,
+            'formatter': 'json' if API_LOG_STRUCTURED else 'verbose',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -402,6 +472,11 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': False,
         },
+        'api.requests': {
+            'handlers': ['api_queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -579,6 +654,40 @@ if DEBUG:
 # ✅ NUEVO: Configuración de Gemini AI
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', None)
 
+# Modelo local sin llamadas a la API (desarrollo y pruebas)
+GEMINI_USE_FAKE_MODEL = os.getenv('GEMINI_USE_FAKE_MODEL', 'True' if DJANGO_ENV == 'testing' else 'False').lower() == 'true'
+
+# Cache de respuestas por contenido del prompt (apps.analisis.services.PromptResponseCache)
+GEMINI_RESPONSE_CACHE_ENABLED = os.getenv('GEMINI_RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+GEMINI_RESPONSE_CACHE_TTL = int(os.getenv('GEMINI_RESPONSE_CACHE_TTL', 7 * 24 * 3600))
+
+# Trabajos de IA en segundo plano (apps.analisis.jobs)
+# INLINE=True: pool de hilos dentro del proceso web
+# INLINE=False: ejecutar `python manage.py procesar_trabajos_ia`
+ANALISIS_IA_INLINE = os.getenv('ANALISIS_IA_INLINE', 'True').lower() == 'true'
+ANALISIS_IA_WORKERS = int(os.getenv('ANALISIS_IA_WORKERS', 2))
+# Minutos sin latido para dar por abandonado un trabajo 'ejecutando'
+ANALISIS_IA_STALE_MINUTES = int(os.getenv('ANALISIS_IA_STALE_MINUTES', 10))
+
+# Límite compartido de llamadas a Gemini (apps.analisis.usage.GeminiRateLimiter)
+# Las solicitudes que superan el límite esperan en cola hasta QUEUE_TIMEOUT segundos
+GEMINI_MAX_CONCURRENT = int(os.getenv('GEMINI_MAX_CONCURRENT', 4))
+GEMINI_MAX_RPM = int(os.getenv('GEMINI_MAX_RPM', 30))
+GEMINI_QUEUE_TIMEOUT = int(os.getenv('GEMINI_QUEUE_TIMEOUT', 120))
+
+# =============================================================================
+# NOTIFICATIONS
+# =============================================================================
+
+# Stream SSE (apps.notifications.realtime). En producción servir con ASGI:
+# gunicorn -k uvicorn.workers.UvicornWorker config.asgi:application
+NOTIFICATIONS_STREAM_HEARTBEAT = int(os.getenv('NOTIFICATIONS_STREAM_HEARTBEAT', 15))
+NOTIFICATIONS_STREAM_MAX_SECONDS = int(os.getenv('NOTIFICATIONS_STREAM_MAX_SECONDS', 300))
+
+# Retención (apps.notifications.retention): las leídas más antiguas se archivan
+NOTIFICATIONS_RETENTION_DAYS = int(os.getenv('NOTIFICATIONS_RETENTION_DAYS', 90))
+NOTIFICATIONS_ARCHIVE_BATCH_SIZE = int(os.getenv('NOTIFICATIONS_ARCHIVE_BATCH_SIZE', 1000))
+
 # =============================================================================
 # GOOGLE MAPS CONFIGURATION
 # =============================================================================
@@ -10,6 +10,7 @@ from django.http import JsonResponse
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from apps.common import views as common_views
 
 import logging
 logger = logging.getLogger(__name__)
@@ -99,6 +100,9 @@ urlpatterns = [
     # Notificaciones
     path('api/notifications/', include('apps.notifications.urls')),
     
+    # Métricas (formato Prometheus)
+    path('api/common/metrics/', common_views.metrics, name='metrics'),
+    
     # Health check
     path('health/', include(('apps.common.urls', 'common'), namespace='health')),
     
@@ -0,0 +1,231 @@
+"""
+Benchmark: lotes que coinciden con criterios de inversión.
+
+Compara el filtrado anterior (OR de barrio__icontains, OFFSET + count() por
+página) con el plan compilado de CriteriaMatcher (predicado único, paginación
+keyset y conteo cacheado) sobre una tabla grande de lotes sintéticos.
+
+También compara, para una muestra de lotes, evaluar todos los criterios
+activos contra el índice invertido de CriteriaPercolator.
+
+Además verifica que el predicado SQL (`CriteriaPlan.as_q`) y la evaluación en
+memoria (`CriteriaPlan.matches`) den el mismo resultado, y en PostgreSQL
+muestra el plan de ejecución de una consulta.
+
+Todo se ejecuta dentro de una transacción que se revierte al final, así
+que no deja datos.
+
+Uso:
+    python scripts/benchmark_criteria_matching.py
+    python scripts/benchmark_criteria_matching.py --lotes 100000 --paginas 50
+    python scripts/benchmark_criteria_matching.py --criterios 2000 --muestra 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Configurar Django
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+try:
+    import django
+    django.setup()
+except Exception as e:
+    print(f"[ERROR] ❌ Error configurando Django: {e}")
+    sys.exit(1)
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.investment_criteria.models import InvestmentCriteria
+from apps.investment_criteria.services import CriteriaMatcher, CriteriaPercolator
+from apps.investment_criteria.views import MatchingLotesPagination
+from apps.lotes.models import Lote
+from apps.users.models import User
+
+
+BARRIOS = ['Laureles', 'El Poblado', 'Belén', 'Envigado Centro', 'Robledo', 'Buenos Aires', 'La América', 'Castilla']
+TRATAMIENTOS = ['Consolidación Nivel 1', 'Consolidación Nivel 2', 'Redesarrollo', 'Renovación Urbana', 'Desarrollo']
+USOS = ['Residencial', 'Comercial', 'Mixto residencial y comercial', 'Industrial', 'Dotacional']
+
+
+def crear_datos(cantidad_lotes, cantidad_criterios, rng):
+    """Owner, developer, lotes y criterios temporales (se revierten)"""
+    sufijo = int(time.time())
+    owner, developer = User.objects.bulk_create([
+        User(email=f'bench-criteria-owner-{sufijo}@lateral360.test', username=f'bench-co-{sufijo}', role='owner'),
+        User(email=f'bench-criteria-dev-{sufijo}@lateral360.test', username=f'bench-cd-{sufijo}', role='developer'),
+    ])
+    lotes = [
+        Lote(
+            owner=owner,
+            nombre=f'Bench {i}',
+            direccion=f'Calle {i}',
+            barrio=rng.choice(BARRIOS),
+            estrato=rng.randint(1, 6),
+            area=Decimal(rng.randint(80, 5000)),
+            valor=None if rng.random() < 0.2 else Decimal(rng.randint(100, 20000)) * 1_000_000,
+            tratamiento_pot=rng.choice(TRATAMIENTOS),
+            uso_suelo=rng.choice(USOS),
+            status='active' if rng.random() < 0.8 else 'pending',
+            is_verified=rng.random() < 0.85,
+        )
+        for i in range(cantidad_lotes)
+    ]
+    Lote.objects.bulk_create(lotes, batch_size=1000)
+
+    criterios = []
+    for i in range(cantidad_criterios):
+        area_min = rng.randint(80, 2000)
+        budget_min = rng.randint(0, 5000) * 1_000_000
+        criterios.append(InvestmentCriteria.objects.create(
+            developer=developer,
+            name=f'Bench {i}',
+            area_min=area_min,
+            area_max=area_min + rng.randint(200, 3000),
+            budget_min=budget_min,
+            budget_max=budget_min + rng.randint(500, 15000) * 1_000_000,
+            zones=rng.sample(BARRIOS, rng.randint(0, 3)),
+            estratos=rng.sample(range(1, 7), rng.randint(0, 3)),
+            treatments=[t.lower() for t in rng.sample(TRATAMIENTOS, rng.randint(0, 2))],
+            uso_suelo_preferido=[u.split()[0].lower() for u in rng.sample(USOS, rng.randint(0, 2))],
+        ))
+    return owner, criterios
+
+
+def queryset_anterior(criteria):
+    """Filtrado anterior: ignora presupuesto, tratamientos y usos"""
+    queryset = Lote.objects.filter(
+        status='active',
+        is_verified=True,
+        area__gte=criteria.area_min,
+        area__lte=criteria.area_max
+    )
+    if criteria.zones:
+        zone_filters = Q()
+        for zone in criteria.zones:
+            zone_filters |= Q(barrio__icontains=zone)
+        queryset = queryset.filter(zone_filters)
+    if criteria.estratos:
+        queryset = queryset.filter(estrato__in=criteria.estratos)
+    return queryset
+
+
+def paginar_offset(criteria, paginas, page_size):
+    queryset = queryset_anterior(criteria).order_by('-created_at')
+    filas = 0
+    for page in range(1, paginas + 1):
+        start = (page - 1) * page_size
+        queryset.count()
+        filas += len(queryset[start:start + page_size])
+    return filas
+
+
+def paginar_keyset(criteria, paginas, page_size):
+    factory = APIRequestFactory()
+    url = f'/api/investment-criteria/{criteria.pk}/matching_lotes/?page_size={page_size}'
+    filas = 0
+    for _ in range(paginas):
+        paginator = MatchingLotesPagination()
+        filas += len(paginator.paginate_queryset(CriteriaMatcher.lotes(criteria), Request(factory.get(url))))
+        CriteriaMatcher.count(criteria)
+        url = paginator.get_next_link()
+        if not url:
+            break
+    return filas
+
+
+def medir(nombre, criterios, funcion):
+    # El log de consultas tiene un máximo: vaciarlo para que el conteo sea exacto
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as queries:
+        inicio = time.perf_counter()
+        filas = sum(funcion(criteria) for criteria in criterios)
+        segundos = time.perf_counter() - inicio
+    print(f"  {nombre:<36} {segundos:8.3f} s  {len(queries):6d} queries  {filas:7d} filas")
+    return segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lotes', type=int, default=20000)
+    parser.add_argument('--criterios', type=int, default=20)
+    parser.add_argument('--paginas', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=MatchingLotesPagination.page_size)
+    parser.add_argument('--muestra', type=int, default=200, help='Lotes para comparar el percolator')
+    parser.add_argument('--seed', type=int, default=360)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print("=" * 80)
+    print(f"📊 Lotes por criterio ({args.lotes} lotes, {args.criterios} criterios, {connection.vendor})")
+    print("=" * 80)
+
+    with transaction.atomic():
+        owner, criterios = crear_datos(args.lotes, args.criterios, rng)
+
+        # Consistencia SQL <-> memoria en todos los lotes del benchmark
+        lotes = list(Lote.objects.filter(owner=owner))
+        diferencias = 0
+        for criteria in criterios:
+            en_sql = set(CriteriaMatcher.lotes(criteria).filter(owner=owner).values_list('id', flat=True))
+            plan = CriteriaMatcher.plan(criteria)
+            en_memoria = {lote.id for lote in lotes if plan.matches(lote)}
+            diferencias += len(en_sql ^ en_memoria)
+        print(f"  {'as_q() vs matches()':<36} {'✅ iguales' if not diferencias else f'❌ {diferencias} diferencias'}")
+
+        # El plan aplica también presupuesto, tratamientos y usos: devuelve menos filas
+        print(f"\n  Primeras {args.paginas} páginas de {args.page_size} por criterio:")
+        t_offset = medir('OFFSET + count() (anterior)', criterios,
+                         lambda c: paginar_offset(c, args.paginas, args.page_size))
+        t_keyset = medir('keyset + count cacheado (plan)', criterios,
+                         lambda c: paginar_keyset(c, args.paginas, args.page_size))
+
+        # Criterios que cumple cada lote: todos los criterios vs percolator
+        muestra = rng.sample(lotes, min(args.muestra, len(lotes)))
+
+        def todos(lote):
+            return sum(
+                CriteriaMatcher.matches(criteria, lote)
+                for criteria in InvestmentCriteria.objects.filter(status='active')
+            )
+
+        def percolator(lote):
+            ids = CriteriaPercolator.candidatos(lote)
+            return sum(
+                CriteriaMatcher.matches(criteria, lote)
+                for criteria in InvestmentCriteria.objects.filter(id__in=ids, status='active')
+            )
+
+        print(f"\n  Criterios que cumple cada lote ({len(muestra)} lotes):")
+        t_todos = medir('todos los criterios activos', muestra, todos)
+        t_percolator = medir('percolator (índice invertido)', muestra, percolator)
+
+        if connection.vendor == 'postgresql':
+            sql, params = CriteriaMatcher.lotes(criterios[0]).order_by('-created_at', '-id')[:args.page_size].query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN {sql}', params)
+                print("\n  EXPLAIN (plan compilado, primera página):")
+                for (linea,) in cursor.fetchall():
+                    print(f"    {linea}")
+
+        transaction.set_rollback(True)
+
+    print("-" * 80)
+    print(f"  Aceleración listado: {t_offset / t_keyset:.1f}x")
+    print(f"  Aceleración percolator: {t_todos / t_percolator:.1f}x")
+    if diferencias:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Benchmark: búsqueda geográfica de lotes (radio y bbox).
+
+Compara, sobre una tabla grande de lotes sintéticos en el Valle de Aburrá:
+
+- radio: recorrer todos los lotes con coordenadas y calcular haversine
+  contra los prefijos geohash + refinamiento de LoteGeoSearch.cercanos
+- bbox: rangos de latitud/longitud sin índice contra prefijos geohash +
+  los mismos rangos (LoteGeoSearch.en_bbox)
+
+Verifica que ambos métodos devuelvan exactamente los mismos lotes y en
+PostgreSQL muestra el plan de ejecución de una consulta por bbox.
+
+También mide los clusters del mapa (LoteClusters) por zoom: tiempo con los
+tiles sin cache y en cache, y tamaño de la respuesta frente a enviar todos
+los lotes del área visible.
+
+Todo se ejecuta dentro de una transacción que se revierte al final, así
+que no deja datos.
+
+Uso:
+    python scripts/benchmark_geo_search.py
+    python scripts/benchmark_geo_search.py --puntos 100000 --consultas 200
+    python scripts/benchmark_geo_search.py --radio 2500 --lado 3000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Configurar Django
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+try:
+    import django
+    django.setup()
+except Exception as e:
+    print(f"[ERROR] ❌ Error configurando Django: {e}")
+    sys.exit(1)
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.lotes.clusters import LoteClusters
+from apps.lotes.geo import LoteGeoSearch, bbox_de_radio, encode, haversine_m
+from apps.lotes.models import Lote
+from apps.users.models import User
+
+
+# Valle de Aburrá (aprox.)
+SUR, NORTE = 6.10, 6.40
+OESTE, ESTE = -75.70, -75.45
+
+# Pantalla de 1920x1080: grados visibles en el zoom z (tiles de 256 px)
+ANCHO_PANTALLA_TILES, ALTO_PANTALLA_TILES = 7.5, 4.2
+
+
+def crear_datos(cantidad, rng):
+    """Owner y lotes temporales con coordenadas (se revierten)"""
+    sufijo = int(time.time())
+    owner = User.objects.bulk_create([
+        User(email=f'bench-geo-owner-{sufijo}@lateral360.test', username=f'bench-geo-{sufijo}', role='owner'),
+    ])[0]
+
+    lotes = []
+    for i in range(cantidad):
+        latitud = Decimal(f'{rng.uniform(SUR, NORTE):.8f}')
+        longitud = Decimal(f'{rng.uniform(OESTE, ESTE):.8f}')
+        lotes.append(Lote(
+            owner=owner,
+            nombre=f'Bench geo {i}',
+            direccion=f'Calle {i}',
+            area=Decimal(rng.randint(80, 5000)),
+            latitud=latitud,
+            longitud=longitud,
+            # bulk_create no pasa por save(): geohash explícito
+            geohash=encode(latitud, longitud),
+            status='active',
+            is_verified=True,
+        ))
+    Lote.objects.bulk_create(lotes, batch_size=2000)
+    return owner
+
+
+def radio_escaneo(queryset, lat, lon, radio):
+    """Sin índice: todas las coordenadas y haversine en Python"""
+    return {
+        lote_id
+        for lote_id, lote_lat, lote_lon in queryset.filter(status='active').exclude(latitud=None).values_list(
+            'id', 'latitud', 'longitud'
+        )
+        if haversine_m(lat, lon, lote_lat, lote_lon) <= radio
+    }
+
+
+def radio_geohash(queryset, lat, lon, radio):
+    return {lote.id for lote, _ in LoteGeoSearch.cercanos(queryset, lat, lon, radio, limite=10**9)}
+
+
+def bbox_escaneo(queryset, sur, oeste, norte, este):
+    """Sin índice: rangos de latitud/longitud"""
+    return set(queryset.filter(
+        status='active',
+        latitud__gte=sur, latitud__lte=norte, longitud__gte=oeste, longitud__lte=este
+    ).values_list('id', flat=True))
+
+
+def bbox_geohash(queryset, sur, oeste, norte, este):
+    return set(LoteGeoSearch.en_bbox(queryset, sur, oeste, norte, este).values_list('id', flat=True))
+
+
+def viewport(lat, lon, zoom):
+    """(sur, oeste, norte, este) de una pantalla centrada en (lat, lon)"""
+    grados_tile = 360 / 2 ** zoom
+    medio_ancho = ANCHO_PANTALLA_TILES * grados_tile / 2
+    medio_alto = ALTO_PANTALLA_TILES * grados_tile / 2
+    return lat - medio_alto, lon - medio_ancho, lat + medio_alto, lon + medio_ancho
+
+
+def descartar_tiles(caja, zoom):
+    """Invalidar solo los tiles del viewport (no vaciar el cache compartido)"""
+    precision = LoteClusters.precision_cluster(zoom)
+    LoteClusters.invalidar_tiles([
+        LoteClusters.namespace(precision, tile) for tile in LoteClusters.tiles_bbox(*caja, precision)
+    ])
+
+
+def medir_clusters(queryset, centros, zooms):
+    print(f"\n  Clusters por zoom (pantalla 1920x1080, {len(centros)} centros):")
+    print(f"  {'zoom':>4} {'tiles':>6} {'clusters':>9} {'sin cache':>11} {'en cache':>10} "
+          f"{'JSON clusters':>14} {'JSON lotes':>12}")
+    diferencias = 0
+    for zoom in zooms:
+        tiles = clusters = lotes_bytes = clusters_bytes = 0
+        frio = caliente = 0.0
+        for lat, lon in centros:
+            caja = viewport(lat, lon, zoom)
+            descartar_tiles(caja, zoom)
+            inicio = time.perf_counter()
+            _, tiles_zoom, resultado, _ = LoteClusters.en_bbox(*caja, zoom)
+            frio += time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            LoteClusters.en_bbox(*caja, zoom)
+            caliente += time.perf_counter() - inicio
+
+            tiles += len(tiles_zoom)
+            clusters += len(resultado)
+            clusters_bytes += len(json.dumps(resultado))
+            lotes = list(LoteGeoSearch.en_bbox(queryset, *caja).values('id', 'latitud', 'longitud', 'area'))
+            lotes_bytes += len(json.dumps(lotes, default=str))
+
+            # Cada lote del área visible está en algún cluster
+            if sum(c['count'] for c in resultado) < len(lotes):
+                diferencias += 1
+            # Los tiles tienen lotes que se revierten al final
+            descartar_tiles(caja, zoom)
+        n = len(centros)
+        print(f"  {zoom:>4} {tiles / n:6.0f} {clusters / n:9.0f} {frio * 1000 / n:8.2f} ms {caliente * 1000 / n:7.2f} ms "
+              f"{clusters_bytes / n / 1024:11.1f} KB {lotes_bytes / n / 1024:9.1f} KB")
+    return diferencias
+
+
+def medir(nombre, consultas, funcion):
+    # El log de consultas tiene un máximo: vaciarlo para que el conteo sea exacto
+    connection.queries_log.clear()
+    resultados = []
+    with CaptureQueriesContext(connection) as queries:
+        inicio = time.perf_counter()
+        for argumentos in consultas:
+            resultados.append(funcion(*argumentos))
+        segundos = time.perf_counter() - inicio
+    filas = sum(len(r) for r in resultados)
+    print(f"  {nombre:<36} {segundos * 1000 / len(consultas):8.2f} ms/consulta  "
+          f"{len(queries):5d} queries  {filas:7d} lotes")
+    return segundos, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puntos', type=int, default=100000)
+    parser.add_argument('--consultas', type=int, default=100)
+    parser.add_argument('--radio', type=float, default=1000, help='Radio en metros')
+    parser.add_argument('--lado', type=float, default=2000, help='Lado del bbox en metros')
+    parser.add_argument('--seed', type=int, default=360)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print("=" * 80)
+    print(f"📊 Búsqueda geográfica ({args.puntos} lotes, {args.consultas} consultas, {connection.vendor})")
+    print("=" * 80)
+
+    with transaction.atomic():
+        inicio = time.perf_counter()
+        crear_datos(args.puntos, rng)
+        print(f"  Datos creados en {time.perf_counter() - inicio:.1f} s")
+        # Lotes visibles, como en /api/lotes/near/ y /api/lotes/in-bbox/
+        # (LoteGeoSearch agrega status='active' dentro de cada rango del índice)
+        queryset = Lote.objects.filter(is_verified=True).order_by()
+
+        centros = [(rng.uniform(SUR, NORTE), rng.uniform(OESTE, ESTE)) for _ in range(args.consultas)]
+
+        print(f"\n  Radio de {args.radio:.0f} m:")
+        t_escaneo, r_escaneo = medir('escaneo completo + haversine', [(queryset, lat, lon, args.radio) for lat, lon in centros], radio_escaneo)
+        t_geohash, r_geohash = medir('geohash + haversine', [(queryset, lat, lon, args.radio) for lat, lon in centros], radio_geohash)
+        diferencias = sum(len(a ^ b) for a, b in zip(r_escaneo, r_geohash))
+
+        cajas = [bbox_de_radio(lat, lon, args.lado / 2) for lat, lon in centros]
+        print(f"\n  Bbox de {args.lado:.0f} m de lado:")
+        t_bbox_escaneo, b_escaneo = medir('rangos lat/lon (sin índice)', [(queryset, *caja) for caja in cajas], bbox_escaneo)
+        t_bbox_geohash, b_geohash = medir('prefijos geohash + rangos', [(queryset, *caja) for caja in cajas], bbox_geohash)
+        diferencias += sum(len(a ^ b) for a, b in zip(b_escaneo, b_geohash))
+
+        diferencias += medir_clusters(queryset, centros[:10], zooms=(11, 13, 15, 17))
+
+        print(f"\n  {'Resultados iguales':<36} {'✅ sí' if not diferencias else f'❌ {diferencias} diferencias'}")
+
+        if connection.vendor == 'postgresql':
+            sql, params = LoteGeoSearch.en_bbox(queryset, *cajas[0]).values('id').query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN {sql}', params)
+                print("\n  EXPLAIN (bbox):")
+                for (linea,) in cursor.fetchall():
+                    print(f"    {linea}")
+
+        transaction.set_rollback(True)
+
+    print("-" * 80)
+    print(f"  Aceleración radio: {t_escaneo / t_geohash:.1f}x")
+    print(f"  Aceleración bbox: {t_bbox_escaneo / t_bbox_geohash:.1f}x")
+    if diferencias:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
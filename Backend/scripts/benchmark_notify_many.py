@@ -0,0 +1,105 @@
+"""
+Benchmark: notificar a N usuarios con create_notification en bucle
+vs NotificationService.notify_many (bulk_create por lotes).
+
+Todo se ejecuta dentro de una transacción que se revierte al final, así
+que no deja datos. Los callbacks on_commit (contadores y pub/sub) no llegan
+a ejecutarse: se mide el costo en base de datos y serialización.
+
+Uso:
+    python scripts/benchmark_notify_many.py
+    python scripts/benchmark_notify_many.py --recipients 1000 --batch-size 500
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Configurar Django
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+try:
+    import django
+    django.setup()
+except Exception as e:
+    print(f"[ERROR] ❌ Error configurando Django: {e}")
+    sys.exit(1)
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.notifications.models import Notification
+from apps.notifications.services import NotificationService
+from apps.users.models import User
+
+
+CONTENIDO = {
+    'type': 'sistema',
+    'title': 'Benchmark',
+    'message': 'Notificación de prueba para el benchmark de notify_many',
+    'priority': 'normal',
+    'action_url': '/benchmark',
+    'data': {'benchmark': True},
+}
+
+
+def crear_destinatarios(cantidad):
+    """Usuarios temporales (se revierten con la transacción)"""
+    sufijo = int(time.time())
+    usuarios = [
+        User(
+            email=f'bench-{sufijo}-{i}@lateral360.test',
+            username=f'bench-{sufijo}-{i}',
+            role='developer',
+        )
+        for i in range(cantidad)
+    ]
+    User.objects.bulk_create(usuarios, batch_size=500)
+    return User.objects.filter(email__startswith=f'bench-{sufijo}-')
+
+
+def medir(nombre, funcion):
+    with CaptureQueriesContext(connection) as queries:
+        inicio = time.perf_counter()
+        creadas = funcion()
+        segundos = time.perf_counter() - inicio
+    print(f"  {nombre:<28} {segundos:8.3f} s  {len(queries):6d} queries  {creadas} notificaciones")
+    return segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=NotificationService.BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"📊 notify_many vs create_notification ({args.recipients} destinatarios, {connection.vendor})")
+    print("=" * 80)
+
+    with transaction.atomic():
+        destinatarios = crear_destinatarios(args.recipients)
+
+        def bucle():
+            for usuario in destinatarios:
+                NotificationService.create_notification(user=usuario, **CONTENIDO)
+            return Notification.objects.filter(user__in=destinatarios).count()
+
+        def masivo():
+            return NotificationService.notify_many(destinatarios, batch_size=args.batch_size, **CONTENIDO)
+
+        t_bucle = medir('create_notification (bucle)', bucle)
+        Notification.objects.filter(user__in=destinatarios).delete()
+        t_masivo = medir('notify_many', masivo)
+
+        transaction.set_rollback(True)
+
+    print("-" * 80)
+    print(f"  Aceleración: {t_bucle / t_masivo:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
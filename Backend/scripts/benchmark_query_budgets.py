@@ -0,0 +1,204 @@
+"""
+Benchmark de presupuestos de consultas (detección de N+1).
+
+Cada escenario se ejecuta dos veces, con N y con 2N filas. Falla si:
+- el número de consultas crece con las filas (N+1), o
+- supera el presupuesto fijo del escenario.
+
+Todo se ejecuta dentro de una transacción que se revierte al final, así que
+no deja datos. Sale con código 1 si algún escenario falla, para usarlo en CI.
+
+Uso:
+    python scripts/benchmark_query_budgets.py
+    python scripts/benchmark_query_budgets.py --filas 10 --verbose
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Configurar Django
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+try:
+    import django
+    django.setup()
+except Exception as e:
+    print(f"[ERROR] ❌ Error configurando Django: {e}")
+    sys.exit(1)
+
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIClient
+
+from apps.common.query_budget import recording_queries
+from apps.documents.models import Document
+from apps.lotes.models import Lote
+from apps.users.models import User
+
+
+# Escenario -> consultas máximas (independientes del número de filas)
+PRESUPUESTOS = {
+    'GET /api/lotes/ (LoteSerializer)': 4,
+    'GET /api/lotes/<id>/developers/': 3,
+    'GET /api/documents/documents/ (DocumentSerializer)': 3,
+    'GET /api/documents/user/': 2,
+    'GET /api/documents/lote/<id>/': 3,
+    'GET /api/documents/validation/grouped/': 4,
+    'post_save Lote (notificar_lote_match)': 5,
+    'GET /api/lotes/stats/ (sin fila, la crea)': 8,
+    'GET /api/lotes/stats/ (fila existente)': 1,
+    'GET /api/lotes/favorites/check-many/ (página)': 1,
+}
+
+
+class Datos:
+    """Usuarios, lotes y documentos de un tamaño dado"""
+
+    def __init__(self, filas, sufijo):
+        self.sufijo = sufijo
+        self.admin = self.usuario('admin', role='admin', is_staff=True, is_superuser=True)
+        self.owner = self.usuario('owner', role='owner')
+        self.developers = [
+            self.usuario(
+                f'dev{i}', role='developer', perfil_completo=True,
+                ciudades_interes=['Laureles'], usos_preferidos=['residencial']
+            )
+            for i in range(filas)
+        ]
+        # bulk_create: sin las validaciones de registro de User.save
+        User.objects.bulk_create([self.admin, self.owner] + self.developers)
+
+        self.lotes = []
+        for i in range(filas):
+            lote = self.crear_lote(i)
+            lote.desarrolladores.set(self.developers)
+            self.lotes.append(lote)
+
+        Document.objects.bulk_create([
+            Document(
+                title=f'Documento {i}',
+                file=f'documents/benchmark-{sufijo}-{i}.pdf',
+                user=self.owner,
+                lote=self.lotes[i % filas],
+                metadata={'validation_status': 'pendiente'},
+            )
+            for i in range(filas * 2)
+        ])
+
+    def usuario(self, nombre, **extra):
+        return User(
+            email=f'bench-{self.sufijo}-{nombre}@lateral360.test',
+            username=f'bench-{self.sufijo}-{nombre}',
+            first_name='Bench',
+            last_name=nombre,
+            **extra
+        )
+
+    def crear_lote(self, i):
+        return Lote.objects.create(
+            owner=self.owner,
+            nombre=f'Lote benchmark {i}',
+            cbml=f'{self.sufijo % 10**6:06d}{i:05d}',
+            direccion=f'Calle {i}',
+            barrio='Laureles',
+            area=Decimal('500'),
+            estrato=4,
+            uso_suelo='residencial',
+            status='active',
+            is_verified=True,
+        )
+
+
+def escenarios(datos):
+    """{nombre: función} para un conjunto de datos"""
+    admin = APIClient()
+    admin.force_authenticate(datos.admin)
+    owner = APIClient()
+    owner.force_authenticate(datos.owner)
+    lote = datos.lotes[0]
+
+    def get(client, url):
+        def _get():
+            response = client.get(url)
+            assert response.status_code == 200, f"{url} -> {response.status_code}"
+        return _get
+
+    return {
+        'GET /api/lotes/ (LoteSerializer)': get(admin, '/api/lotes/'),
+        'GET /api/lotes/<id>/developers/': get(owner, f'/api/lotes/{lote.id}/developers/'),
+        'GET /api/documents/documents/ (DocumentSerializer)': get(admin, '/api/documents/documents/'),
+        'GET /api/documents/user/': get(owner, '/api/documents/user/'),
+        'GET /api/documents/lote/<id>/': get(owner, f'/api/documents/lote/{lote.id}/'),
+        'GET /api/documents/validation/grouped/': get(admin, '/api/documents/validation/grouped/'),
+        'post_save Lote (notificar_lote_match)': lambda: datos.crear_lote(len(datos.lotes)),
+        'GET /api/lotes/stats/ (sin fila, la crea)': get(owner, '/api/lotes/stats/'),
+        'GET /api/lotes/stats/ (fila existente)': get(owner, '/api/lotes/stats/'),
+        'GET /api/lotes/favorites/check-many/ (página)': get(
+            owner, '/api/lotes/favorites/check-many/?lote_ids=' + ','.join(str(l.id) for l in datos.lotes[:20])
+        ),
+    }
+
+
+def medir(filas, sufijo):
+    """{escenario: (consultas, recorder)}"""
+    datos = Datos(filas, sufijo)
+    resultado = {}
+    for nombre, funcion in escenarios(datos).items():
+        with recording_queries() as recorder:
+            funcion()
+        resultado[nombre] = recorder
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=5, help='N (el segundo pase usa 2N)')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar las consultas repetidas')
+    args = parser.parse_args()
+
+    setup_test_environment()
+
+    print("=" * 80)
+    print(f"📊 Presupuestos de consultas ({args.filas} vs {args.filas * 2} filas, {connection.vendor})")
+    print("=" * 80)
+
+    fallos = []
+    with transaction.atomic():
+        sufijo = int(time.time())
+        pequeno = medir(args.filas, sufijo)
+        grande = medir(args.filas * 2, sufijo + 1)
+        transaction.set_rollback(True)
+
+    for nombre, presupuesto in PRESUPUESTOS.items():
+        n, n2 = pequeno[nombre].count, grande[nombre].count
+        problemas = []
+        if n2 > n:
+            problemas.append(f"crece con las filas ({n} -> {n2})")
+        if n2 > presupuesto:
+            problemas.append(f"supera el presupuesto ({n2} > {presupuesto})")
+
+        estado = '❌' if problemas else '✅'
+        print(f"  {estado} {nombre:<52} {n:4d} / {n2:4d}  (máx {presupuesto})")
+        if problemas:
+            fallos.append(nombre)
+            print(f"       {'; '.join(problemas)}")
+        if problemas or args.verbose:
+            resumen = grande[nombre].resumen()
+            if resumen:
+                print(resumen)
+
+    print("-" * 80)
+    if fallos:
+        print(f"  {len(fallos)} escenario(s) fuera de presupuesto")
+        sys.exit(1)
+    print("  Todos los escenarios dentro de presupuesto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark de escrituras en los flujos de usuario.
+
+Cuenta las sentencias INSERT/UPDATE/DELETE por tabla en el registro, el
+login, la primera sesión, la edición de perfil y el perfil de inversión.
+Detecta la amplificación de escrituras (p. ej. reescribir users_userprofile
+en cada save() de User, o un UPDATE de todas las columnas para cambiar una).
+
+Todo se ejecuta dentro de una transacción que se revierte al final. Sale con
+código 1 si algún flujo supera su presupuesto de escrituras.
+
+Uso:
+    python scripts/benchmark_user_writes.py
+    python scripts/benchmark_user_writes.py --verbose
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Configurar Django
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(backend_dir))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+try:
+    import django
+    django.setup()
+except Exception as e:
+    print(f"[ERROR] ❌ Error configurando Django: {e}")
+    sys.exit(1)
+
+from django.db import connection, transaction
+from django.test.utils import override_settings, setup_test_environment
+from rest_framework.test import APIClient
+
+from apps.common.query_budget import recording_queries
+from apps.users.models import User
+
+_ESCRITURA = re.compile(r'^\s*(INSERT INTO|UPDATE|DELETE FROM)\s+"?(\w+)"?', re.IGNORECASE)
+_SET = re.compile(r'\bSET\s+(.*?)\s+WHERE\b', re.IGNORECASE | re.DOTALL)
+
+# Flujo -> escrituras máximas
+PRESUPUESTOS = {
+    'POST /api/auth/register/': 2,
+    'POST /api/auth/login/': 1,
+    'POST /api/users/first-login-completed/': 1,
+    'PATCH /api/users/me/update/': 1,
+    'PUT /api/users/perfil-inversion/': 1,
+    'User.save() sin cambios': 0,
+}
+
+
+def escrituras(recorder):
+    """[(verbo, tabla, columnas)] de las sentencias de escritura del bloque"""
+    resultado = []
+    for sql, _ in recorder.queries:
+        match = _ESCRITURA.match(sql)
+        if not match:
+            continue
+        verbo, tabla = match.group(1).split()[0].upper(), match.group(2)
+        columnas = None
+        if verbo == 'UPDATE':
+            set_match = _SET.search(sql)
+            columnas = set_match.group(1).count('=') if set_match else None
+        resultado.append((verbo, tabla, columnas))
+    return resultado
+
+
+def flujos(sufijo):
+    """{nombre: función} ejecutados en orden sobre el mismo usuario"""
+    email = f'bench-writes-{sufijo}@lateral360.test'
+    password = 'BenchPass123!'
+    anonimo = APIClient()
+    estado = {}
+
+    def registro():
+        response = anonimo.post('/api/auth/register/', {
+            'email': email,
+            'password': password,
+            'password_confirm': password,
+            'first_name': 'Bench',
+            'last_name': 'Writes',
+            'role': 'developer',
+            'developer_type': 'constructora',
+            'person_type': 'juridica',
+            'legal_name': 'Bench Writes SAS',
+            'document_type': 'NIT',
+            'document_number': f'{sufijo % 10**9:09d}',
+        }, format='json')
+        assert response.status_code == 201, f"registro -> {response.status_code} {response.data}"
+        estado['client'] = APIClient()
+        estado['client'].force_authenticate(User.objects.get(email=email))
+
+    def login():
+        response = anonimo.post('/api/auth/login/', {'email': email, 'password': password}, format='json')
+        assert response.status_code == 200, f"login -> {response.status_code}"
+
+    def post(url, data=None, method='post'):
+        def _llamar():
+            # Usuario recién leído en cada petición, como en la autenticación
+            estado['client'].force_authenticate(User.objects.get(email=email))
+            response = getattr(estado['client'], method)(url, data or {}, format='json')
+            assert response.status_code == 200, f"{url} -> {response.status_code}"
+        return _llamar
+
+    def save_sin_cambios():
+        User.objects.get(email=email).save()
+
+    return {
+        'POST /api/auth/register/': registro,
+        'POST /api/auth/login/': login,
+        'POST /api/users/first-login-completed/': post('/api/users/first-login-completed/'),
+        'PATCH /api/users/me/update/': post('/api/users/me/update/', {'phone': '3001234567'}, 'patch'),
+        'PUT /api/users/perfil-inversion/': post('/api/users/perfil-inversion/', {
+            'ciudades_interes': ['medellin'],
+            'usos_preferidos': ['residencial'],
+            'modelos_pago': ['contado'],
+            'volumen_ventas_min': 'entre_150_350',
+        }, 'put'),
+        'User.save() sin cambios': save_sin_cambios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verbose', action='store_true', help='Mostrar cada escritura')
+    args = parser.parse_args()
+
+    setup_test_environment()
+
+    print("=" * 80)
+    print(f"📊 Escrituras por flujo de usuario ({connection.vendor})")
+    print("=" * 80)
+
+    fallos = []
+    with override_settings(RATELIMIT_ENABLE=False), transaction.atomic():
+        for nombre, funcion in flujos(int(time.time())).items():
+            with recording_queries() as recorder:
+                funcion()
+            writes = escrituras(recorder)
+            presupuesto = PRESUPUESTOS[nombre]
+            por_tabla = Counter(f"{verbo} {tabla}" for verbo, tabla, _ in writes)
+
+            estado = '❌' if len(writes) > presupuesto else '✅'
+            print(f"  {estado} {nombre:<45} {len(writes):3d} escrituras (máx {presupuesto})")
+            if len(writes) > presupuesto:
+                fallos.append(nombre)
+            if len(writes) > presupuesto or args.verbose:
+                for clave, n in por_tabla.most_common():
+                    print(f"       {n}x {clave}")
+                for verbo, tabla, columnas in writes:
+                    if columnas:
+                        print(f"       UPDATE {tabla}: {columnas} columnas")
+        transaction.set_rollback(True)
+
+    print("-" * 80)
+    if fallos:
+        print(f"  {len(fallos)} flujo(s) fuera de presupuesto")
+        sys.exit(1)
+    print("  Todos los flujos dentro de presupuesto")
+
+
+if __name__ == "__main__":
+    main()
@@ -105,15 +105,52 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
         });
     };
 
-    // ✅ Polling cada 30 segundos
+    // ✅ Tiempo real con SSE; polling cada 30 segundos solo si el stream falla
     useEffect(() => {
         fetchNotifications();
         
-        const interval = setInterval(() => {
-            fetchNotifications();
-        }, 30000); // 30 segundos
-
-        return () => clearInterval(interval);
+        let interval: ReturnType<typeof setInterval> | null = null;
+        const startPolling = () => {
+            if (!interval) {
+                interval = setInterval(fetchNotifications, 30000);
+            }
+        };
+        const stopPolling = () => {
+            if (interval) {
+                clearInterval(interval);
+                interval = null;
+            }
+        };
+        
+        if (typeof EventSource === 'undefined') {
+            startPolling();
+            return stopPolling;
+        }
+        
+        const source = new EventSource('/api/notifications/stream');
+        
+        source.addEventListener('open', stopPolling);
+        source.addEventListener('error', startPolling);
+        
+        source.addEventListener('notification', (event) => {
+            const notification = JSON.parse((event as MessageEvent).data) as Notification;
+            setNotifications(prev =>
+                prev.some(n => n.id === notification.id) ? prev : [notification, ...prev]
+            );
+            if (!notification.is_read) {
+                setUnreadCount(prev => prev + 1);
+            }
+        });
+        
+        source.addEventListener('unread_count', (event) => {
+            const data = JSON.parse((event as MessageEvent).data);
+            setUnreadCount(data.count || 0);
+        });
+        
+        return () => {
+            source.close();
+            stopPolling();
+        };
     }, []);
 
     return (
@@ -1,11 +1,16 @@
 import { json, redirect } from "@remix-run/node";
 import { useLoaderData, useNavigate, Form, useActionData, useFetcher } from "@remix-run/react";
+import type { ShouldRevalidateFunction } from "@remix-run/react";
 import { useState, useEffect } from "react";
 import type { LoaderFunctionArgs, ActionFunctionArgs } from "@remix-run/node";
 import { requireUser, fetchWithAuth } from "~/utils/auth.server";
 import { API_URL } from "~/utils/env.server";
 import ReactMarkdown from 'react-markdown';
 
+// ✅ Consulta del trabajo IA desde el cliente: cada 2 s, hasta 10 minutos
+const INTERVALO_ESTADO_IA_MS = 2000;
+const MAX_CONSULTAS_ESTADO_IA = 300;
+
 export async function loader({ request, params }: LoaderFunctionArgs) {
     const user = await requireUser(request);
 
@@ -32,6 +37,14 @@ export async function loader({ request, params }: LoaderFunctionArgs) {
     }
 }
 
+// ✅ Las consultas de estado del trabajo IA no recargan el análisis
+export const shouldRevalidate: ShouldRevalidateFunction = ({ formData, defaultShouldRevalidate }) => {
+    if (formData?.get("intent") === "estado_ia") {
+        return false;
+    }
+    return defaultShouldRevalidate;
+};
+
 export async function action({ request, params }: ActionFunctionArgs) {
     const user = await requireUser(request);
 
@@ -128,15 +141,12 @@ export async function action({ request, params }: ActionFunctionArgs) {
             }
 
             const data = await res.json();
-            console.log("[Action] ✅ Respuesta IA generada exitosamente");
-            console.log("[Action] Data keys:", Object.keys(data));
-            console.log("[Action] Data.data keys:", data.data ? Object.keys(data.data) : 'no data.data');
-            console.log("[Action] Respuesta preview:", data.data?.respuesta?.substring(0, 100));
             
+            // ✅ La generación corre en segundo plano: el cliente consulta el estado (intent estado_ia)
             return json({ 
                 success: true, 
                 intent: 'generar_ia',
-                data: data.data 
+                trabajo: data.trabajo
             });
 
         } catch (error) {
@@ -148,6 +158,38 @@ export async function action({ request, params }: ActionFunctionArgs) {
         }
     }
 
+    // ✅ Estado del trabajo IA (una consulta; el cliente repite mientras no termine)
+    if (intent === "estado_ia") {
+        try {
+            const trabajoId = formData.get("trabajo");
+            
+            const { res } = await fetchWithAuth(
+                request,
+                `${API_URL}/api/analisis/${params.id}/estado_ia/?trabajo=${trabajoId}`
+            );
+            
+            if (!res.ok) {
+                console.error("[Action] Estado IA error - Status:", res.status);
+                return json({ 
+                    success: false, 
+                    intent: 'estado_ia',
+                    error: "Error consultando el estado del análisis IA" 
+                });
+            }
+            
+            const data = await res.json();
+            return json({ success: true, intent: 'estado_ia', trabajo: data.trabajo });
+
+        } catch (error) {
+            console.error("[Action] Estado IA catch error:", error);
+            return json({ 
+                success: false, 
+                intent: 'estado_ia',
+                error: "Error consultando el estado del análisis IA" 
+            });
+        }
+    }
+
     if (intent === "rechazar") {
         try {
             const motivo = formData.get("motivo");
@@ -264,12 +306,16 @@ export default function AdminAnalisisDetalle() {
     const actionData = useActionData<any>();
     const navigate = useNavigate();
     const fetcher = useFetcher();  // ✅ NUEVO: Usar fetcher de Remix
+    const estadoFetcher = useFetcher<any>();  // ✅ Consulta del trabajo IA en segundo plano
 
     const [showRejectModal, setShowRejectModal] = useState(false);
     const [motivoRechazo, setMotivoRechazo] = useState("");
     const [showIAModal, setShowIAModal] = useState(false);
     const [notasRevision, setNotasRevision] = useState("");
     const [isGenerating, setIsGenerating] = useState(false);
+    const [trabajoIA, setTrabajoIA] = useState<any>(null);
+    const [consultasIA, setConsultasIA] = useState(0);
+    const [errorIA, setErrorIA] = useState("");
     
     // ✅ Estados para respuesta IA editable
     const [respuestaIA, setRespuestaIA] = useState("");
@@ -287,15 +333,6 @@ export default function AdminAnalisisDetalle() {
         console.log("ActionData:", actionData);
     }, [analisis, actionData]);
 
-    // ✅ NUEVO: Mostrar modal cuando llega la respuesta IA
-    useEffect(() => {
-        if (actionData?.success && actionData?.intent === 'generar_ia' && actionData?.data) {
-            console.log("[Component] Mostrando modal IA con datos:", actionData.data);
-            setShowIAModal(true);
-            setIsGenerating(false);
-        }
-    }, [actionData]);
-
     // ✅ NUEVO: Reset generating cuando hay error
     useEffect(() => {
         if (actionData?.error) {
@@ -320,6 +357,9 @@ export default function AdminAnalisisDetalle() {
         setIsGenerating(true);
         setRespuestaIA("");
         setMetadataIA(null);
+        setErrorIA("");
+        setTrabajoIA(null);
+        setConsultasIA(0);
 
         // ✅ CRÍTICO: Usar fetcher.submit con Form
         fetcher.submit(
@@ -328,31 +368,89 @@ export default function AdminAnalisisDetalle() {
         );
     };
 
-    // ✅ NUEVO: Detectar cuando fetcher completa
+    // ✅ Trabajo IA finalizado: mostrar la respuesta o el error
+    const finalizarTrabajoIA = (trabajo: any) => {
+        setTrabajoIA(null);
+        setIsGenerating(false);
+        
+        if (trabajo.estado !== 'completado') {
+            console.error("[Component] Generar IA terminó en estado:", trabajo.estado, trabajo.error);
+            setErrorIA(trabajo.error || `La generación con IA terminó en estado: ${trabajo.estado_display}`);
+            return;
+        }
+        
+        console.log("[Component] ✅ Respuesta IA recibida");
+        
+        // Guardar respuesta editable
+        setRespuestaIA(trabajo.respuesta);
+        setRespuestaIAOriginal(trabajo.respuesta);
+        setMetadataIA({
+            modelo: trabajo.modelo,
+            tokens_usados: trabajo.tokens_usados,
+            tiempo_respuesta: trabajo.tiempo_respuesta
+        });
+
+        // Mostrar modal
+        setShowIAModal(true);
+    };
+
+    // ✅ NUEVO: Detectar cuando fetcher completa (trabajo encolado)
     useEffect(() => {
         if (fetcher.state === 'idle' && fetcher.data) {
-            if (fetcher.data.success && fetcher.data.intent === 'generar_ia' && fetcher.data.data) {
-                console.log("[Component] ✅ Respuesta IA recibida via fetcher");
-                
-                // Guardar respuesta editable
-                setRespuestaIA(fetcher.data.data.respuesta);
-                setRespuestaIAOriginal(fetcher.data.data.respuesta);
-                setMetadataIA({
-                    modelo: fetcher.data.data.modelo,
-                    tokens_usados: fetcher.data.data.tokens_usados,
-                    tiempo_respuesta: fetcher.data.data.tiempo_respuesta
-                });
-
-                // Mostrar modal
-                setShowIAModal(true);
-                setIsGenerating(false);
+            if (fetcher.data.success && fetcher.data.intent === 'generar_ia' && fetcher.data.trabajo) {
+                const trabajo = fetcher.data.trabajo;
+                if (trabajo.esta_finalizado) {
+                    finalizarTrabajoIA(trabajo);
+                } else {
+                    setTrabajoIA(trabajo);
+                }
             } else if (fetcher.data.error) {
                 console.error("[Component] Error en fetcher:", fetcher.data.error);
+                setErrorIA(fetcher.data.error);
                 setIsGenerating(false);
             }
         }
     }, [fetcher.state, fetcher.data]);
 
+    // ✅ Consultar el estado del trabajo mientras no termine (con tope de consultas)
+    useEffect(() => {
+        if (!trabajoIA || estadoFetcher.state !== 'idle') {
+            return;
+        }
+        
+        if (consultasIA >= MAX_CONSULTAS_ESTADO_IA) {
+            setTrabajoIA(null);
+            setIsGenerating(false);
+            setErrorIA("El análisis IA sigue en proceso. Vuelve a consultar en unos minutos.");
+            return;
+        }
+        
+        const timer = setTimeout(() => {
+            setConsultasIA((consultas) => consultas + 1);
+            estadoFetcher.submit(
+                { intent: "estado_ia", trabajo: trabajoIA.id },
+                { method: "post" }
+            );
+        }, INTERVALO_ESTADO_IA_MS);
+        
+        return () => clearTimeout(timer);
+    }, [trabajoIA, estadoFetcher.state, consultasIA]);
+
+    // ✅ Resultado de cada consulta de estado
+    useEffect(() => {
+        if (estadoFetcher.state !== 'idle' || !estadoFetcher.data || !trabajoIA) {
+            return;
+        }
+        
+        if (!estadoFetcher.data.success) {
+            setTrabajoIA(null);
+            setIsGenerating(false);
+            setErrorIA(estadoFetcher.data.error);
+        } else if (estadoFetcher.data.trabajo?.esta_finalizado) {
+            finalizarTrabajoIA(estadoFetcher.data.trabajo);
+        }
+    }, [estadoFetcher.state, estadoFetcher.data]);
+
     // ✅ CORREGIDO: Guardar respuesta editada con fetcher
     const handleGuardarRespuestaIA = () => {
         console.log("[Component] 💾 Guardando respuesta IA editada...");
@@ -433,6 +531,12 @@ export default function AdminAnalisisDetalle() {
                 </div>
             )}
 
+            {errorIA && (
+                <div className="mb-6 bg-red-50 border-l-4 border-red-500 p-4 rounded-r-lg">
+                    <p className="text-red-700">{errorIA}</p>
+                </div>
+            )}
+
             <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
                 {/* Información Principal */}
                 <div className="lg:col-span-2 space-y-6">
@@ -25,6 +25,16 @@ type InvestmentCriteria = {
   created_at: string;
 };
 
+// ✅ perfiles-inversion pagina por cursor: extraer el cursor de las URLs next/previous
+function cursorDe(url?: string | null): string | null {
+  if (!url) return null;
+  try {
+    return new URL(url).searchParams.get('cursor');
+  } catch {
+    return null;
+  }
+}
+
 export async function loader({ request }: LoaderFunctionArgs) {
   const user = await getUser(request);
 
@@ -33,10 +43,15 @@ export async function loader({ request }: LoaderFunctionArgs) {
   }
 
   try {
-    // ✅ Obtener todos los perfiles de inversión
+    // ✅ Obtener los perfiles de inversión (página indicada por ?cursor=)
+    const cursor = new URL(request.url).searchParams.get('cursor');
+    const params = new URLSearchParams();
+    if (cursor) params.set('cursor', cursor);
+    const query = params.toString();
+
     const { res, setCookieHeaders } = await fetchWithAuth(
       request,
-      `${API_URL}/api/users/perfiles-inversion/`
+      `${API_URL}/api/users/perfiles-inversion/${query ? `?${query}` : ''}`
     );
 
     if (!res.ok) {
@@ -48,7 +63,10 @@ export async function loader({ request }: LoaderFunctionArgs) {
     return json({
       user,
       profiles: data.profiles || [],
-      total: data.total || 0
+      total: data.total || 0,
+      completos: data.completos || 0,
+      nextCursor: cursorDe(data.next),
+      previousCursor: cursorDe(data.previous)
     }, {
       headers: setCookieHeaders
     });
@@ -57,13 +75,16 @@ export async function loader({ request }: LoaderFunctionArgs) {
     return json({
       user,
       profiles: [],
-      total: 0
+      total: 0,
+      completos: 0,
+      nextCursor: null,
+      previousCursor: null
     });
   }
 }
 
 export default function AdminInvestments() {
-  const { user, profiles, total } = useLoaderData<typeof loader>();
+  const { user, profiles, total, completos, nextCursor, previousCursor } = useLoaderData<typeof loader>();
   const [searchQuery, setSearchQuery] = useState('');
   const [filterCompleto, setFilterCompleto] = useState<'all' | 'completo' | 'incompleto'>('all');
   // ✅ NUEVO: Estado para modal de recomendación
@@ -187,7 +208,7 @@ export default function AdminInvestments() {
             <div>
               <p className="text-sm text-gray-600">Perfiles Completos</p>
               <p className="text-2xl font-bold text-green-600">
-                {profiles.filter((p: InvestmentCriteria) => p.perfil_completo).length}
+                {completos}
               </p>
             </div>
             <div className="p-3 bg-green-100 rounded-full">
@@ -203,7 +224,7 @@ export default function AdminInvestments() {
             <div>
               <p className="text-sm text-gray-600">Perfiles Incompletos</p>
               <p className="text-2xl font-bold text-orange-600">
-                {profiles.filter((p: InvestmentCriteria) => !p.perfil_completo).length}
+                {total - completos}
               </p>
             </div>
             <div className="p-3 bg-orange-100 rounded-full">
@@ -219,7 +240,7 @@ export default function AdminInvestments() {
             <div>
               <p className="text-sm text-gray-600">% Completitud</p>
               <p className="text-2xl font-bold text-indigo-600">
-                {total > 0 ? Math.round((profiles.filter((p: InvestmentCriteria) => p.perfil_completo).length / total) * 100) : 0}%
+                {total > 0 ? Math.round((completos / total) * 100) : 0}%
               </p>
             </div>
             <div className="p-3 bg-indigo-100 rounded-full">
@@ -399,6 +420,28 @@ export default function AdminInvestments() {
         </div>
       </div>
 
+      {/* ✅ Paginación por cursor */}
+      {(previousCursor || nextCursor) && (
+        <div className="flex justify-between items-center">
+          {previousCursor ? (
+            <Link
+              to={`?cursor=${encodeURIComponent(previousCursor)}`}
+              className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-md hover:bg-gray-50"
+            >
+              ← Más recientes
+            </Link>
+          ) : <span />}
+          {nextCursor && (
+            <Link
+              to={`?cursor=${encodeURIComponent(nextCursor)}`}
+              className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-md hover:bg-gray-50"
+            >
+              Más antiguos →
+            </Link>
+          )}
+        </div>
+      )}
+
       {/* ✅ NUEVO: Modal de recomendación de lote */}
       {showRecommendModal && selectedProfile && (
         <RecommendLotModal
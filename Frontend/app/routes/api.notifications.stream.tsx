@@ -0,0 +1,21 @@
+/**
+ * Proxy del stream SSE de notificaciones (GET /api/notifications/stream)
+ */
+import { type LoaderFunctionArgs } from "@remix-run/node";
+import { openNotificationStream } from "~/services/notifications.server";
+
+export async function loader({ request }: LoaderFunctionArgs) {
+    const { res, setCookieHeaders } = await openNotificationStream(request);
+    
+    if (!res.ok || !res.body) {
+        return new Response(null, { status: res.status || 502, headers: setCookieHeaders });
+    }
+    
+    const headers = new Headers(setCookieHeaders);
+    headers.set('Content-Type', 'text/event-stream');
+    headers.set('Cache-Control', 'no-cache');
+    headers.set('Connection', 'keep-alive');
+    headers.set('X-Accel-Buffering', 'no');
+    
+    return new Response(res.body, { status: 200, headers });
+}
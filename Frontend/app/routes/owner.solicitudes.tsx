@@ -12,6 +12,8 @@ type LoaderData = {
     user: any;
     view: 'list' | 'create' | 'detail';
     requests?: any[];
+    nextCursor?: string | null;
+    previousCursor?: string | null;
     lotes?: any[];
     selectedRequest?: any;
     success?: boolean;
@@ -28,6 +30,16 @@ type ActionData = {
 // LOADER
 // ============================================================================
 
+// ✅ mis_solicitudes pagina por cursor: extraer el cursor de las URLs next/previous
+function cursorDe(url?: string | null): string | null {
+    if (!url) return null;
+    try {
+        return new URL(url).searchParams.get("cursor");
+    } catch {
+        return null;
+    }
+}
+
 export async function loader({ request }: LoaderFunctionArgs) {
     const user = await requireUser(request);
 
@@ -36,17 +48,28 @@ export async function loader({ request }: LoaderFunctionArgs) {
     }
 
     try {
-        // ✅ Usar endpoint de solicitudes
+        // ✅ Usar endpoint de solicitudes (página indicada por ?cursor=)
+        const cursor = new URL(request.url).searchParams.get("cursor");
+        const params = new URLSearchParams();
+        if (cursor) params.set("cursor", cursor);
+        const query = params.toString();
+
         const { res: requestsRes, setCookieHeaders } = await fetchWithAuth(
             request,
-            `${API_URL}/api/solicitudes/mis_solicitudes/`,
+            `${API_URL}/api/solicitudes/mis_solicitudes/${query ? `?${query}` : ""}`,
             { method: "GET" }
         );
 
         let requests = [];
+        let nextCursor: string | null = null;
+        let previousCursor: string | null = null;
         if (requestsRes.ok) {
             const data = await requestsRes.json();
             requests = Array.isArray(data) ? data : (data.results || data.solicitudes || []);
+            if (!Array.isArray(data)) {
+                nextCursor = cursorDe(data.next);
+                previousCursor = cursorDe(data.previous);
+            }
             
             console.log(`[owner.solicitudes] Loaded ${requests.length} requests for ${user.email}`);
             
@@ -70,6 +93,8 @@ export async function loader({ request }: LoaderFunctionArgs) {
             {
                 user,
                 requests,
+                nextCursor,
+                previousCursor,
             },
             {
                 headers: setCookieHeaders || new Headers()
@@ -80,6 +105,8 @@ export async function loader({ request }: LoaderFunctionArgs) {
         return json({
             user,
             requests: [],
+            nextCursor: null,
+            previousCursor: null,
         });
     }
 }
@@ -157,7 +184,7 @@ export async function action({ request }: ActionFunctionArgs) {
 // ============================================================================
 
 export default function OwnerSolicitudes() {
-    const { user, requests } = useLoaderData<typeof loader>();
+    const { user, requests, nextCursor, previousCursor } = useLoaderData<typeof loader>();
     const actionData = useActionData<any>();
     const navigation = useNavigation();
     
@@ -503,6 +530,28 @@ export default function OwnerSolicitudes() {
                 </div>
             )}
 
+            {/* Paginación por cursor */}
+            {!isLoading && (previousCursor || nextCursor) && (
+                <div className="flex justify-between items-center mt-6">
+                    {previousCursor ? (
+                        <Link
+                            to={`?cursor=${encodeURIComponent(previousCursor)}`}
+                            className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-md hover:bg-gray-50"
+                        >
+                            ← Más recientes
+                        </Link>
+                    ) : <span />}
+                    {nextCursor && (
+                        <Link
+                            to={`?cursor=${encodeURIComponent(nextCursor)}`}
+                            className="px-4 py-2 text-sm font-medium text-gray-700 bg-white border border-gray-300 rounded-md hover:bg-gray-50"
+                        >
+                            Más antiguas →
+                        </Link>
+                    )}
+                </div>
+            )}
+
             {/* Estilos para animaciones */}
             <style>{`
                 @keyframes slide-down {
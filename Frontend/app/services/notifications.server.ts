@@ -136,3 +136,20 @@ export async function getRecentNotifications(request: Request): Promise<Notifica
     const data = await res.json();
     return data;
 }
+
+/**
+ * Abrir el stream SSE de notificaciones en el backend
+ * (el navegador no puede enviar el header Authorization con EventSource)
+ */
+export async function openNotificationStream(request: Request) {
+    const lastEventId = request.headers.get('Last-Event-ID');
+    
+    return fetchWithAuth(request, `${API_URL}/api/notifications/stream/`, {
+        method: 'GET',
+        headers: {
+            Accept: 'text/event-stream',
+            ...(lastEventId ? { 'Last-Event-ID': lastEventId } : {}),
+        },
+        signal: request.signal,
+    });
+}